@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import random
+import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Dict, List, Optional
+
+
+@dataclass
+class Alert:
+    recipient: str
+    subject: str
+    body: str
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+
+class AlertDispatcher:
+    """Queues alert emails and sends them over one persistent SMTP connection off the event loop"""
+
+    def __init__(
+        self,
+        server: str,
+        port: int = 587,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        sender: Optional[str] = None,
+        use_tls: bool = True,
+        queue_size: int = 1000,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        digest_window: float = 0.0,
+        idle_timeout: float = 60.0
+    ):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.use_tls = use_tls
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # Alerts for the same recipient arriving within this window are sent as one digest
+        self.digest_window = digest_window
+        self.idle_timeout = idle_timeout
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # A single thread owns the SMTP connection so it is never shared across threads
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='smtp')
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._digests: Dict[str, List[Alert]] = {}
+        self._digest_deadlines: Dict[str, float] = {}
+
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.digests_sent = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the dispatcher worker if it is not already running"""
+        if self.running:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, flush: bool = True):
+        """Stop the worker, optionally sending everything still queued first"""
+        if self._task is not None:
+            if flush:
+                await self._queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            if flush:
+                await self._flush_digests(force=True)
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._disconnect)
+
+    def submit(self, recipient: str, subject: str, body: str) -> bool:
+        """Queue an alert without waiting; returns False if the queue is full"""
+        self.start()
+        try:
+            self._queue.put_nowait(Alert(recipient, subject, body))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logging.warning(f"Alert queue full, dropping alert for {recipient}: {subject}")
+            return False
+
+    def stats(self) -> Dict:
+        return {
+            'queued': self._queue.qsize() if self._queue else 0,
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'digests_sent': self.digests_sent,
+            'pending_digests': sum(len(alerts) for alerts in self._digests.values())
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            timeout = self._next_timeout(loop.time())
+            try:
+                alert = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                await self._flush_digests()
+                if not self._digests:
+                    # Servers drop idle sessions, so close ours before they do
+                    await loop.run_in_executor(self._executor, self._disconnect)
+                continue
+
+            try:
+                if self.digest_window > 0:
+                    self._digests.setdefault(alert.recipient, []).append(alert)
+                    self._digest_deadlines.setdefault(alert.recipient, loop.time() + self.digest_window)
+                else:
+                    await self._deliver(alert.recipient, alert.subject, alert.body)
+                await self._flush_digests()
+            finally:
+                self._queue.task_done()
+
+    def _next_timeout(self, now: float) -> Optional[float]:
+        if self._digest_deadlines:
+            return max(0.0, min(self._digest_deadlines.values()) - now)
+        return self.idle_timeout if self._smtp is not None else None
+
+    async def _flush_digests(self, force: bool = False):
+        now = asyncio.get_running_loop().time()
+        due = [
+            recipient for recipient, deadline in self._digest_deadlines.items()
+            if force or deadline <= now
+        ]
+        for recipient in due:
+            alerts = self._digests.pop(recipient, [])
+            del self._digest_deadlines[recipient]
+            if len(alerts) == 1:
+                await self._deliver(recipient, alerts[0].subject, alerts[0].body)
+            elif alerts:
+                subject, body = self._build_digest(alerts)
+                if await self._deliver(recipient, subject, body):
+                    self.digests_sent += 1
+
+    def _build_digest(self, alerts: List[Alert]):
+        subject = f"Alert Digest: {len(alerts)} alerts"
+        body = f"{len(alerts)} alerts since {alerts[0].created_at.isoformat()}:\n\n"
+        for alert in alerts:
+            body += f"=== {alert.subject} ({alert.created_at.isoformat()}) ===\n"
+            body += f"{alert.body}\n\n"
+        return subject, body
+
+    async def _deliver(self, recipient: str, subject: str, body: str) -> bool:
+        msg = MIMEMultipart()
+        msg['Subject'] = subject
+        msg['From'] = self.sender
+        msg['To'] = recipient
+        msg.attach(MIMEText(body, 'plain'))
+
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            try:
+                await loop.run_in_executor(self._executor, self._send_blocking, msg)
+                self.sent += 1
+                return True
+            except Exception as e:
+                await loop.run_in_executor(self._executor, self._disconnect)
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    logging.error(f"Failed to send alert to {recipient} after {attempt + 1} attempts: {e}")
+                    return False
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                delay *= random.uniform(0.5, 1.0)
+                logging.warning(f"Alert send failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        return False
+
+    def _send_blocking(self, msg: MIMEMultipart):
+        if self._smtp is None:
+            self._connect()
+        try:
+            self._smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # The pooled connection went stale; reconnect once before counting a retry
+            self._connect()
+            self._smtp.send_message(msg)
+
+    def _connect(self):
+        self._disconnect()
+        started = time.monotonic()
+        server = smtplib.SMTP(self.server, self.port, timeout=30)
+        if self.use_tls:
+            server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+        self._smtp = server
+        logging.info(f"SMTP connection to {self.server}:{self.port} opened in {time.monotonic() - started:.2f}s")
+
+    def _disconnect(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            pass
+        self._smtp = None
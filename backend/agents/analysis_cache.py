@@ -0,0 +1,106 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from eth_utils import keccak
+
+
+def code_hash(code: bytes) -> str:
+    """keccak256 of runtime bytecode, the same value as the account's codeHash"""
+    return '0x' + keccak(bytes(code)).hex()
+
+
+class AnalysisCache:
+    """Security scan results keyed by code hash: in-memory LRU in front of a SQLite store"""
+
+    def __init__(self, path: Optional[str] = 'security_scans.db', max_entries: int = 4096, version: int = 1):
+        self.max_entries = max_entries
+        # Results from an older scanner version are ignored so detector changes take effect
+        self.version = version
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute('PRAGMA journal_mode=WAL')
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS scans ('
+                    'code_hash TEXT PRIMARY KEY, '
+                    'version INTEGER NOT NULL, '
+                    'result TEXT NOT NULL, '
+                    'created_at REAL NOT NULL)'
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logging.error(f"Failed to open analysis cache at {path}, using memory only: {e}")
+                self._db = None
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Look up a cached result by code hash"""
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return result
+
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT result FROM scans WHERE code_hash = ? AND version = ?',
+                    (key, self.version)
+                ).fetchone()
+                if row is not None:
+                    result = json.loads(row[0])
+                    self._remember(key, result)
+                    self.disk_hits += 1
+                    return result
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, result: Dict):
+        """Store a result in memory and on disk"""
+        with self._lock:
+            self._remember(key, result)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO scans (code_hash, version, result, created_at) VALUES (?, ?, ?, ?)',
+                    (key, self.version, json.dumps(result), time.time())
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logging.error(f"Failed to persist analysis for {key}: {e}")
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'memory_entries': len(self._memory),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key: str, result: Dict):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
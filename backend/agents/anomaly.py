@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Optional
+
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+REFIT = 'refit'  # fit_predict on the latest window every tick (original behaviour)
+SCHEDULED = 'scheduled'  # fit on a rolling window every N ticks / T seconds, score in between
+ONLINE = 'online'  # exponentially weighted z-scores, no model at all
+
+
+class AnomalyDetector:
+    """Price/volume anomaly scoring that returns 1 (normal) or -1 (anomaly) like IsolationForest"""
+
+    def __init__(
+        self,
+        mode: str = SCHEDULED,
+        contamination: float = 0.1,
+        train_window: int = 100,
+        min_samples: int = 20,
+        refit_every: int = 50,
+        refit_seconds: Optional[float] = None,
+        z_threshold: float = 3.0,
+        halflife: int = 20
+    ):
+        if mode not in (REFIT, SCHEDULED, ONLINE):
+            raise ValueError(f"Unknown anomaly detection mode: {mode}")
+        self.mode = mode
+        self.contamination = contamination
+        self.train_window = train_window
+        self.min_samples = min_samples
+        self.refit_every = refit_every
+        self.refit_seconds = refit_seconds
+
+        self.model: Optional[IsolationForest] = None
+        self.ticks_since_fit = 0
+        self.fitted_at = 0.0
+        self.fit_count = 0
+        self._refit_task: Optional[asyncio.Task] = None
+
+        # Online mode state: EW mean/variance of log returns and of volume
+        self.z_threshold = z_threshold
+        self._alpha = 1 - math.exp(math.log(0.5) / halflife)
+        self._last_price: Optional[float] = None
+        self._return_mean = 0.0
+        self._return_var = 0.0
+        self._volume_mean: Optional[float] = None
+        self._volume_var = 0.0
+        self._observations = 0
+
+    def update(self, price: float, volume: float, prices: np.ndarray, volumes: np.ndarray) -> int:
+        """Score the newest observation; prices/volumes are the history including it"""
+        if self.mode == ONLINE:
+            return self._score_online(price, volume)
+
+        if len(prices) < self.min_samples:
+            return 0
+
+        if self.mode == REFIT:
+            features = self._features(prices, volumes, self.min_samples)
+            return int(IsolationForest(contamination=self.contamination).fit_predict(features)[-1])
+
+        self.ticks_since_fit += 1
+        if self.needs_refit():
+            self.fit(self._features(prices, volumes, self.train_window))
+        return self.score(price, volume)
+
+    async def update_offloaded(
+        self,
+        price: float,
+        volume: float,
+        prices: np.ndarray,
+        volumes: np.ndarray,
+        executor
+    ) -> int:
+        """Like update(), but fits run on a ComputeExecutor instead of the event loop"""
+        from agents.compute import fit_isolation_forest, fit_predict_isolation_forest
+
+        if self.mode == ONLINE:
+            return self._score_online(price, volume)
+
+        if len(prices) < self.min_samples:
+            return 0
+
+        if self.mode == REFIT:
+            features = self._features(prices, volumes, self.min_samples)
+            labels = await executor.run(fit_predict_isolation_forest, features, self.contamination)
+            return int(labels[-1])
+
+        self.ticks_since_fit += 1
+        if self.needs_refit() and self._refit_task is None:
+            features = self._features(prices, volumes, self.train_window).copy()
+            self._refit_task = asyncio.create_task(
+                executor.run(fit_isolation_forest, features, self.contamination)
+            )
+            self._refit_task.add_done_callback(self._install_refit)
+
+        if self.model is None:
+            # Nothing to score against until the first fit lands
+            try:
+                await asyncio.shield(self._refit_task)
+            except Exception:
+                return 0
+        return self.score(price, volume)
+
+    def _install_refit(self, task: asyncio.Task):
+        self._refit_task = None
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logging.error(f"Anomaly model refit failed: {task.exception()}")
+            return
+        self.install(task.result())
+
+    def warm_up(self, prices: np.ndarray, volumes: np.ndarray):
+        """Replay stored history; only ONLINE mode carries state beyond the history window"""
+        if self.mode == ONLINE:
+            for price, volume in zip(prices.tolist(), volumes.tolist()):
+                self._score_online(price, volume)
+
+    def needs_refit(self) -> bool:
+        if self.model is None or self.ticks_since_fit >= self.refit_every:
+            return True
+        return self.refit_seconds is not None and time.monotonic() - self.fitted_at >= self.refit_seconds
+
+    def fit(self, features: np.ndarray):
+        self.install(IsolationForest(contamination=self.contamination).fit(features))
+
+    def install(self, model: IsolationForest):
+        """Swap in a freshly fitted model"""
+        self.model = model
+        self.ticks_since_fit = 0
+        self.fitted_at = time.monotonic()
+        self.fit_count += 1
+
+    def score(self, price: float, volume: float) -> int:
+        return int(self.model.predict([[price, volume]])[0])
+
+    def _features(self, prices: np.ndarray, volumes: np.ndarray, window: int) -> np.ndarray:
+        return np.column_stack([prices[-window:], volumes[-window:]])
+
+    def _score_online(self, price: float, volume: float) -> int:
+        alpha = self._alpha
+        anomalous = False
+
+        if self._last_price and price > 0:
+            log_return = math.log(price / self._last_price)
+            deviation = log_return - self._return_mean
+            if self._observations >= self.min_samples and self._return_var > 0:
+                anomalous = abs(deviation) > self.z_threshold * math.sqrt(self._return_var)
+            self._return_mean += alpha * deviation
+            self._return_var = (1 - alpha) * (self._return_var + alpha * deviation * deviation)
+
+        if self._volume_mean is None:
+            self._volume_mean = volume
+        else:
+            deviation = volume - self._volume_mean
+            if self._observations >= self.min_samples and self._volume_var > 0:
+                anomalous = anomalous or abs(deviation) > self.z_threshold * math.sqrt(self._volume_var)
+            self._volume_mean += alpha * deviation
+            self._volume_var = (1 - alpha) * (self._volume_var + alpha * deviation * deviation)
+
+        self._last_price = price
+        self._observations += 1
+        if self._observations < self.min_samples:
+            return 0
+        return -1 if anomalous else 1
+
+
+class MultiOnlineDetector:
+    """ONLINE-mode scoring for many tokens at once; returns an array of 1 / -1 / 0"""
+
+    def __init__(self, rows: int, min_samples: int = 20, z_threshold: float = 3.0, halflife: int = 20):
+        self.min_samples = min_samples
+        self.z_threshold = z_threshold
+        self._alpha = 1 - math.exp(math.log(0.5) / halflife)
+        self._last_price = np.full(rows, np.nan)
+        self._return_mean = np.zeros(rows)
+        self._return_var = np.zeros(rows)
+        self._volume_mean = np.zeros(rows)
+        self._volume_var = np.zeros(rows)
+        self._observations = 0
+
+    def update(self, prices: np.ndarray, volumes: np.ndarray) -> np.ndarray:
+        alpha = self._alpha
+        warm = self._observations >= self.min_samples
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_returns = np.log(prices / self._last_price)
+        has_return = np.isfinite(log_returns)
+        deviation = np.where(has_return, log_returns - self._return_mean, 0.0)
+        anomalous = warm & has_return & (self._return_var > 0) & (
+            np.abs(deviation) > self.z_threshold * np.sqrt(self._return_var)
+        )
+        self._return_mean += alpha * deviation
+        self._return_var = np.where(
+            has_return,
+            (1 - alpha) * (self._return_var + alpha * deviation * deviation),
+            self._return_var
+        )
+
+        if self._observations == 0:
+            self._volume_mean = volumes.astype(np.float64).copy()
+        else:
+            deviation = volumes - self._volume_mean
+            anomalous |= warm & (self._volume_var > 0) & (
+                np.abs(deviation) > self.z_threshold * np.sqrt(self._volume_var)
+            )
+            self._volume_mean += alpha * deviation
+            self._volume_var = (1 - alpha) * (self._volume_var + alpha * deviation * deviation)
+
+        self._last_price = prices.astype(np.float64)
+        self._observations += 1
+        if self._observations < self.min_samples:
+            return np.zeros(len(prices), dtype=np.int64)
+        return np.where(anomalous, -1, 1)
+
+    def reset_rows(self, rows: np.ndarray, prices: np.ndarray, volumes: np.ndarray):
+        """Start some rows over from their first real quote; zero variance keeps them unflagged until data arrives"""
+        self._last_price[rows] = prices
+        self._return_mean[rows] = 0.0
+        self._return_var[rows] = 0.0
+        self._volume_mean[rows] = volumes
+        self._volume_var[rows] = 0.0
+
+
+def benchmark(ticks: int = 300, seed: int = 0):
+    """Compare per-tick latency of each mode on a synthetic random-walk feed"""
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, ticks)))
+    volumes = rng.lognormal(10, 0.5, ticks)
+
+    results = {}
+    for mode in (REFIT, SCHEDULED, ONLINE):
+        detector = AnomalyDetector(mode=mode)
+        latencies = []
+        for i in range(ticks):
+            window_start = max(0, i + 1 - 100)
+            started = time.perf_counter()
+            detector.update(prices[i], volumes[i], prices[window_start:i + 1], volumes[window_start:i + 1])
+            latencies.append(time.perf_counter() - started)
+        latencies = np.array(latencies[detector.min_samples:]) * 1000
+        results[mode] = {
+            'mean_ms': float(latencies.mean()),
+            'p99_ms': float(np.percentile(latencies, 99))
+        }
+    return results
+
+
+if __name__ == "__main__":
+    for mode, result in benchmark().items():
+        print(f"{mode:>10}: mean {result['mean_ms']:.3f} ms/tick, p99 {result['p99_ms']:.3f} ms/tick")
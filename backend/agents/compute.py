@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+
+def fit_isolation_forest(features: np.ndarray, contamination: float):
+    """Fit an IsolationForest; module level so it can run in a worker process"""
+    from sklearn.ensemble import IsolationForest
+    return IsolationForest(contamination=contamination).fit(features)
+
+
+def fit_predict_isolation_forest(features: np.ndarray, contamination: float) -> np.ndarray:
+    from sklearn.ensemble import IsolationForest
+    return IsolationForest(contamination=contamination).fit_predict(features)
+
+
+def fit_arima(history: np.ndarray, order: Tuple[int, int, int]):
+    """Fit ARIMA on a price window; the results object is pickled back to the caller"""
+    from statsmodels.tsa.arima.model import ARIMA
+    return ARIMA(history, order=order).fit()
+
+
+class ComputeExecutor:
+    """Process pool for CPU-heavy model fits, awaited from the event loop"""
+
+    def __init__(self, max_workers: Optional[int] = None, start_method: str = 'spawn'):
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        # spawn avoids forking a process that already has an event loop and threads running
+        self.start_method = start_method
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+        self.tasks = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.busy_seconds = 0.0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(self.start_method)
+            )
+        return self._pool
+
+    async def run(self, fn: Callable, *args):
+        """Run fn(*args) in a worker process without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self.in_flight += 1
+        try:
+            try:
+                return await loop.run_in_executor(self._get_pool(), fn, *args)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM); start a fresh pool and retry once
+                logging.error("Compute pool broken, restarting workers")
+                self._pool = None
+                return await loop.run_in_executor(self._get_pool(), fn, *args)
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.tasks += 1
+            self.busy_seconds += time.perf_counter() - started
+
+    def stats(self) -> Dict:
+        return {
+            'max_workers': self.max_workers,
+            'tasks': self.tasks,
+            'failures': self.failures,
+            'in_flight': self.in_flight,
+            'mean_task_seconds': self.busy_seconds / self.tasks if self.tasks else 0.0
+        }
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+
+_shared_executor: Optional[ComputeExecutor] = None
+
+
+def get_compute_executor(max_workers: Optional[int] = None) -> ComputeExecutor:
+    """Process-wide executor shared by all agents; max_workers only applies on first use"""
+    global _shared_executor
+    if _shared_executor is None:
+        _shared_executor = ComputeExecutor(max_workers=max_workers)
+    return _shared_executor
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a periodic timer, i.e. how long it was blocked"""
+
+    def __init__(self, interval: float = 0.1, warn_threshold: float = 0.25, history: int = 1000):
+        self.interval = interval
+        self.warn_threshold = warn_threshold
+        self.lags = deque(maxlen=history)
+        self.max_lag = 0.0
+        self.blocked_seconds = 0.0
+        self.samples = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, loop.time() - expected))
+
+    def record(self, lag: float):
+        self.lags.append(lag)
+        self.samples += 1
+        self.max_lag = max(self.max_lag, lag)
+        self.blocked_seconds += lag
+        if lag >= self.warn_threshold:
+            logging.warning(f"Event loop blocked for {lag * 1000:.0f} ms")
+
+    def stats(self) -> Dict:
+        lags = np.array(self.lags) * 1000 if self.lags else np.zeros(1)
+        return {
+            'samples': self.samples,
+            'mean_lag_ms': float(lags.mean()),
+            'p99_lag_ms': float(np.percentile(lags, 99)),
+            'max_lag_ms': self.max_lag * 1000,
+            'blocked_seconds': self.blocked_seconds
+        }
@@ -1,14 +1,22 @@
 import numpy as np
 from typing import List, Dict, Optional
-import pandas as pd
 from datetime import datetime, timedelta
 import logging
 from dataclasses import dataclass
 from web3 import Web3
-from statsmodels.tsa.arima.model import ARIMA
-from sklearn.ensemble import IsolationForest
 import asyncio
-import aiohttp
+from agents.anomaly import SCHEDULED, AnomalyDetector, MultiOnlineDetector
+from agents.compute import ComputeExecutor, LoopLagMonitor, get_compute_executor
+from agents.event_columns import EventColumns
+from agents.event_indexer import EventIndexer
+from agents.forecaster import ARIMAForecaster
+from agents.http_client import get_http_client
+from agents.indicators import IndicatorEngine, MultiIndicatorEngine
+from agents.nonce_manager import NonceManager
+from agents.price_store import PriceStore
+from agents.receipt_tracker import ReceiptTracker, TransactionReplaced, TransactionTimeout
+from agents.rule_engine import RuleEngine, RuleHit
+from agents.rpc_batch import BatchRPC, Multicall, contract_call
 
 @dataclass
 class MarketCondition:
@@ -20,41 +28,68 @@ class MarketCondition:
     anomaly_score: float
 
 class AIStrategyEngine:
-    def __init__(self):
-        self.price_history: List[float] = []
-        self.volume_history: List[float] = []
+    def __init__(
+        self,
+        history_size: int = 100,
+        anomaly_mode: str = SCHEDULED,
+        anomaly_refit_every: int = 50,
+        anomaly_refit_seconds: Optional[float] = None,
+        forecast_refit_every: int = 50,
+        forecast_drift_threshold: float = 4.0,
+        closed_form_forecast: bool = False,
+        compute: Optional[ComputeExecutor] = None
+    ):
+        # When set, model fits run in worker processes instead of on the event loop
+        self.compute = compute
+        # Fixed-size ring buffers with incrementally maintained EMAs and rolling volatility
+        self.indicators = IndicatorEngine(history_size=history_size)
         self.market_conditions: List[MarketCondition] = []
-        self.model_arima = None
-        self.anomaly_detector = IsolationForest(contamination=0.1)
+        # Extends the fitted ARIMA with each new price and only refits on a cadence or on drift
+        self.forecaster = ARIMAForecaster(
+            order=(5, 1, 0),
+            min_observations=30,
+            refit_every=forecast_refit_every,
+            drift_threshold=forecast_drift_threshold,
+            closed_form=closed_form_forecast
+        )
+        # Trains on the whole history window on a schedule and only scores new ticks in between
+        self.anomaly_detector = AnomalyDetector(
+            mode=anomaly_mode,
+            contamination=0.1,
+            train_window=history_size,
+            refit_every=anomaly_refit_every,
+            refit_seconds=anomaly_refit_seconds
+        )
+
+    @property
+    def price_history(self) -> np.ndarray:
+        return self.indicators.prices.view()
+
+    @property
+    def volume_history(self) -> np.ndarray:
+        return self.indicators.volumes.view()
         
     async def analyze_market_data(self, new_price: float, new_volume: float) -> MarketCondition:
-        self.price_history.append(new_price)
-        self.volume_history.append(new_volume)
-        
-        if len(self.price_history) > 100:
-            self.price_history.pop(0)
-            self.volume_history.pop(0)
-            
-        volatility = np.std(self.price_history[-20:]) if len(self.price_history) >= 20 else 0
-        
-        # Detect trend using exponential moving averages
-        if len(self.price_history) >= 20:
-            ema_short = pd.Series(self.price_history).ewm(span=7).mean().iloc[-1]
-            ema_long = pd.Series(self.price_history).ewm(span=20).mean().iloc[-1]
-            trend = 'bullish' if ema_short > ema_long else 'bearish'
-        else:
-            trend = 'neutral'
+        indicators = self.indicators.update(new_price, new_volume)
+        self.forecaster.observe(new_price)
+        volatility, trend = self._describe(indicators)
             
         # Anomaly detection
-        if len(self.price_history) >= 20:
-            features = np.column_stack([
-                self.price_history[-20:],
-                self.volume_history[-20:]
-            ])
-            anomaly_scores = self.anomaly_detector.fit_predict(features)
-            anomaly_score = anomaly_scores[-1]
+        if self.compute:
+            anomaly_score = await self.anomaly_detector.update_offloaded(
+                new_price,
+                new_volume,
+                self.price_history,
+                self.volume_history,
+                self.compute
+            )
         else:
-            anomaly_score = 0
+            anomaly_score = self.anomaly_detector.update(
+                new_price,
+                new_volume,
+                self.price_history,
+                self.volume_history
+            )
             
         condition = MarketCondition(
             price=new_price,
@@ -68,86 +103,320 @@ class AIStrategyEngine:
         self.market_conditions.append(condition)
         return condition
 
+    def _describe(self, indicators: Dict) -> tuple[float, str]:
+        history_length = len(self.indicators)
+            
+        volatility = indicators['volatility'] if history_length >= 20 else 0
+        
+        # Detect trend using exponential moving averages
+        if history_length >= 20:
+            trend = 'bullish' if indicators['ema_short'] > indicators['ema_long'] else 'bearish'
+        else:
+            trend = 'neutral'
+        return volatility, trend
+
+    def warm_up(self, timestamps: np.ndarray, prices: np.ndarray, volumes: np.ndarray):
+        """Rebuild the history window and recent market conditions from stored ticks"""
+        size = self.indicators.prices.capacity
+        for timestamp, price, volume in zip(
+            timestamps[-size:].tolist(),
+            prices[-size:].tolist(),
+            volumes[-size:].tolist()
+        ):
+            volatility, trend = self._describe(self.indicators.update(price, volume))
+            self.market_conditions.append(MarketCondition(
+                price=price,
+                volume=volume,
+                volatility=volatility,
+                trend=trend,
+                timestamp=datetime.fromtimestamp(timestamp),
+                anomaly_score=0
+            ))
+        # The forecaster and a scheduled anomaly model fit from the window on first use
+        self.anomaly_detector.warm_up(prices[-size:], volumes[-size:])
+
     async def predict_next_price(self) -> tuple[float, float]:
-        if len(self.price_history) < 30:
-            return self.price_history[-1], 0.5
+        # Without a usable forecast the last price is returned with zero confidence, which never trades
+        if len(self.price_history) < self.forecaster.min_observations:
+            return self.price_history[-1], 0.0
             
         try:
-            # Fit ARIMA model
-            model = ARIMA(self.price_history, order=(5,1,0))
-            model_fit = model.fit()
-            forecast = model_fit.forecast(steps=1)
-            predicted_price = forecast[0]
-            
-            # Calculate confidence based on model performance
-            confidence = 1 - min(1, model_fit.mse / np.mean(self.price_history))
-            
-            return predicted_price, confidence
+            # Cached until the next observation; otherwise a state update, refitting only when due
+            if self.compute:
+                return await self.forecaster.forecast_offloaded(self.price_history, self.compute)
+            return self.forecaster.forecast(self.price_history)
         except Exception as e:
             logging.error(f"Price prediction error: {e}")
-            return self.price_history[-1], 0.3
+            return self.price_history[-1], 0.0
+
+class MultiAssetStrategyEngine:
+    """AIStrategyEngine for many tokens: histories are (tokens x window) arrays updated in one pass"""
+
+    def __init__(self, tokens: List[str], history_size: int = 100, anomaly_z_threshold: float = 3.0):
+        self.tokens = list(tokens)
+        self.index = {token: i for i, token in enumerate(self.tokens)}
+        self.indicators = MultiIndicatorEngine(len(self.tokens), history_size=history_size)
+        # IsolationForest does not vectorise across tokens, so anomalies use EW z-scores
+        self.anomaly_detector = MultiOnlineDetector(len(self.tokens), z_threshold=anomaly_z_threshold)
+        self.latest: Dict[str, MarketCondition] = {}
+        # Tokens that have had a real quote, and the last quote of each for carrying gaps forward
+        self.seen = np.zeros(len(self.tokens), dtype=bool)
+        self._last_price = np.full(len(self.tokens), np.nan)
+        self._last_volume = np.full(len(self.tokens), np.nan)
+
+    @property
+    def price_history(self) -> np.ndarray:
+        return self.indicators.prices.view()
+
+    @property
+    def volume_history(self) -> np.ndarray:
+        return self.indicators.volumes.view()
+
+    def update(self, prices: np.ndarray, volumes: np.ndarray) -> Dict[str, MarketCondition]:
+        """One tick for every token; prices/volumes are aligned with self.tokens, NaN for no quote.
+        Tokens without any quote yet are left out of the result."""
+        prices = np.asarray(prices, dtype=np.float64)
+        volumes = np.asarray(volumes, dtype=np.float64)
+        quoted = ~np.isnan(prices)
+
+        first = quoted & ~self.seen
+        if first.any():
+            rows = np.flatnonzero(first)
+            first_volumes = np.nan_to_num(volumes[rows])
+            if len(self.indicators):
+                # Seed a late token's history from its first real quote instead of placeholders
+                self.indicators.seed_rows(rows, prices[rows], first_volumes)
+                self.anomaly_detector.reset_rows(rows, prices[rows], first_volumes)
+            self._last_volume[rows] = first_volumes
+            self.seen |= first
+
+        # Carry the last quote forward so every row stays on the same clock
+        prices = np.where(quoted, prices, self._last_price)
+        volumes = np.where(np.isnan(volumes), self._last_volume, volumes)
+        self._last_price = prices
+        self._last_volume = volumes
+        # Unseen rows hold a placeholder until seeded; NaN would poison their running sums for good
+        prices = np.where(self.seen, prices, 0.0)
+        volumes = np.where(self.seen, volumes, 0.0)
+
+        indicators = self.indicators.update(prices, volumes)
+        history_length = len(self.indicators)
+
+        if history_length >= 20:
+            volatility = indicators['volatility']
+            trends = np.where(indicators['ema_short'] > indicators['ema_long'], 'bullish', 'bearish')
+        else:
+            volatility = np.zeros(len(self.tokens))
+            trends = np.full(len(self.tokens), 'neutral')
+        anomaly_scores = self.anomaly_detector.update(prices, volumes)
+
+        timestamp = datetime.now()
+        self.latest = {
+            token: MarketCondition(
+                price=price,
+                volume=volume,
+                volatility=vol,
+                trend=trend,
+                timestamp=timestamp,
+                anomaly_score=score
+            )
+            for token, seen, price, volume, vol, trend, score in zip(
+                self.tokens,
+                self.seen.tolist(),
+                prices.tolist(),
+                volumes.tolist(),
+                volatility.tolist(),
+                trends.tolist(),
+                anomaly_scores.tolist()
+            )
+            if seen
+        }
+        return self.latest
+
+    async def analyze_market_data(
+        self,
+        prices: Dict[str, float],
+        volumes: Dict[str, float]
+    ) -> Dict[str, MarketCondition]:
+        """Dict-keyed wrapper around update(); tokens missing from the dicts carry forward"""
+        price_row = np.full(len(self.tokens), np.nan)
+        volume_row = np.full(len(self.tokens), np.nan)
+        for token, price in prices.items():
+            price_row[self.index[token]] = price
+        for token, volume in volumes.items():
+            volume_row[self.index[token]] = volume
+        return self.update(price_row, volume_row)
+
 
 class SmartContractMonitor:
-    def __init__(self, web3: Web3, contract_address: str, abi: List):
+    def __init__(
+        self,
+        web3: Web3,
+        contract_address: str,
+        abi: List,
+        multicall: Optional[Multicall] = None,
+        rpc: Optional[BatchRPC] = None,
+        checkpoint_path: Optional[str] = None,
+        window_blocks: int = 1000,
+        rules: Optional[RuleEngine] = None,
+        max_fresh_lookups: int = 200
+    ):
         self.web3 = web3
         self.contract = web3.eth.contract(address=contract_address, abi=abi)
         self.known_vulnerabilities = set()
+        self.multicall = multicall
+        self.rpc = rpc
+        # Streaming detectors; each event is fed exactly once, as it is indexed
+        self.rules = rules or RuleEngine()
+        self.max_fresh_lookups = max_fresh_lookups
+        # Only blocks past the saved cursor are fetched; the last window_blocks of events are kept as columns
+        self.indexer = None
+        if rpc is not None:
+            self.indexer = EventIndexer(
+                rpc,
+                self.contract,
+                checkpoint_path=checkpoint_path,
+                window_blocks=window_blocks
+            )
+
+    async def read_state(self, calls: List[tuple]) -> List:
+        """Read many view functions in one round trip, e.g. [('totalSupply',), ('balanceOf', addr)]"""
+        if self.multicall is None:
+            return [getattr(self.contract.functions, name)(*args).call() for name, *args in calls]
+        return await self.multicall.aggregate([
+            contract_call(self.contract, name, *args) for name, *args in calls
+        ])
         
     async def monitor_events(self):
-        latest_block = await self.web3.eth.get_block_number()
-        events = await self.contract.events.allEvents().get_logs(
-            fromBlock=latest_block - 1000
-        )
-        return self.analyze_events(events)
+        if self.indexer is None:
+            latest_block = await asyncio.to_thread(lambda: self.web3.eth.block_number)
+            events = await asyncio.to_thread(
+                self.contract.events.allEvents().get_logs,
+                from_block=latest_block - 1000
+            )
+            return self.analyze_events(events)
+        new_events = await self.indexer.sync()
+        await self.mark_fresh_addresses(new_events)
+        return self.analyze_window(self.indexer.columns, new_events, self.indexer.last_arrivals)
         
+    async def mark_fresh_addresses(self, events):
+        """Look up first-seen callers in one batch: no nonce, code or balance fresh_blocks ago means just created"""
+        field = self.rules.address_field
+        candidates = {}
+        for event in events:
+            address = event['args'].get(field)
+            if address and address not in candidates and not self.rules.is_known(address):
+                candidates[address] = event['blockNumber']
+                if len(candidates) >= self.max_fresh_lookups:
+                    break
+        if not candidates:
+            return
+
+        requests = []
+        for address, block in candidates.items():
+            before = hex(max(block - self.rules.fresh_blocks, 0))
+            requests += [
+                ('eth_getTransactionCount', [address, before]),
+                ('eth_getCode', [address, before]),
+                ('eth_getBalance', [address, before])
+            ]
+        try:
+            results = await self.rpc.request_many(requests)
+        except Exception as e:
+            logging.error(f"Fresh address lookup failed: {e}")
+            return
+
+        for i, (address, block) in enumerate(candidates.items()):
+            nonce, code, balance = results[3 * i:3 * i + 3]
+            # Nodes that pruned that state answer with errors; those addresses are left alone
+            if any(isinstance(result, Exception) for result in (nonce, code, balance)):
+                continue
+            if int(nonce, 16) == 0 and code in ('0x', '0x0') and int(balance, 16) == 0:
+                self.rules.mark_fresh(address, block)
+
     def analyze_events(self, events) -> Dict:
-        event_stats = {
-            'transaction_count': len(events),
-            'unique_addresses': len(set(event['args']['user'] for event in events if 'user' in event['args'])),
-            'total_value': sum(event['args']['value'] for event in events if 'value' in event['args']),
-            'suspicious_patterns': []
-        }
+        columns = EventColumns(self.contract.abi)
+        columns.append_events(events)
+        return self.analyze_window(columns, events)
+
+    def analyze_window(self, columns: EventColumns, new_events, arrivals: Optional[List[float]] = None) -> Dict:
+        """Window statistics are vectorised over the columns; only unseen events go through the rules"""
+        event_stats = columns.summary()
+        event_stats['suspicious_patterns'] = []
         
         # Detect suspicious patterns
-        for event in events:
-            if self.is_suspicious_transaction(event):
+        for i, event in enumerate(new_events):
+            hits = self.check_transaction(event, arrivals[i] if arrivals else None)
+            if hits:
                 event_stats['suspicious_patterns'].append({
                     'event': event,
-                    'reason': 'Unusual transaction pattern'
+                    'rules': [hit.rule for hit in hits],
+                    'reason': '; '.join(hit.detail for hit in hits)
                 })
                 
         return event_stats
+
+    def check_transaction(self, event, received_at: Optional[float] = None) -> List[RuleHit]:
+        """Feed an event through the streaming rules and return the rules it tripped"""
+        return self.rules.observe(event, received_at)
         
     def is_suspicious_transaction(self, event) -> bool:
-        # Add sophisticated transaction analysis logic here
-        return False
+        return bool(self.check_transaction(event))
 
 class AIAgent:
     def __init__(self, config: Dict):
         self.config = config
-        self.strategy_engine = AIStrategyEngine()
+        self.compute = get_compute_executor(config.get('compute_workers'))
+        self.loop_monitor = LoopLagMonitor(warn_threshold=config.get('loop_lag_warning', 0.25))
+        self.strategy_engine = AIStrategyEngine(compute=self.compute)
         self.web3 = Web3(Web3.HTTPProvider(config['rpc_url']))
+        # One keep-alive pool for the price/volume APIs and the RPC node
+        self.http = get_http_client(**config.get('http', {}))
+        self.rpc = BatchRPC(config['rpc_url'], http=self.http)
+        self.multicall = Multicall(self.rpc)
+        self.nonce_manager = NonceManager(rpc=self.rpc)
+        self.receipts = ReceiptTracker(self.rpc)
         self.contract_monitor = SmartContractMonitor(
             self.web3,
             config['contract_address'],
-            config['contract_abi']
+            config['contract_abi'],
+            multicall=self.multicall,
+            rpc=self.rpc,
+            checkpoint_path=config.get('event_checkpoint_path', 'event_checkpoint.json'),
+            rules=RuleEngine(**config.get('event_rules', {}))
         )
         self.last_trade_time = datetime.now()
         self.trade_cooldown = timedelta(minutes=5)
         self.min_confidence = 0.7
+        
+        # Ticks are persisted so a restart resumes with a full window instead of an empty one
+        self.price_series = None
+        if config.get('price_store_path'):
+            self.price_store = PriceStore(config['price_store_path'])
+            self.price_series = self.price_store.series(config.get('price_series', 'default'))
+            self.strategy_engine.warm_up(*self.price_series.tail(self.strategy_engine.indicators.prices.capacity))
 
     async def run(self):
+        self.loop_monitor.start()
         while True:
             try:
-                # Get market data
-                current_price = await self.fetch_price()
-                current_volume = await self.fetch_volume()
+                # Get market data; both endpoints are fetched concurrently over pooled connections
+                current_price, current_volume = await asyncio.gather(
+                    self.fetch_price(),
+                    self.fetch_volume()
+                )
                 
                 # Analyze market conditions
                 market_condition = await self.strategy_engine.analyze_market_data(
                     current_price, 
                     current_volume
                 )
+                if self.price_series is not None:
+                    self.price_series.append(
+                        market_condition.timestamp.timestamp(),
+                        current_price,
+                        current_volume
+                    )
                 
                 # Get contract monitoring data
                 contract_stats = await self.contract_monitor.monitor_events()
@@ -168,6 +437,15 @@ class AIAgent:
                 logging.error(f"Agent error: {e}")
                 await asyncio.sleep(30)
 
+    def runtime_stats(self) -> Dict:
+        """Event loop responsiveness, compute pool, HTTP pool and event rule usage"""
+        return {
+            'loop_lag': self.loop_monitor.stats(),
+            'compute': self.compute.stats(),
+            'http': self.http.stats(),
+            'event_rules': self.contract_monitor.rules.stats()
+        }
+
     async def should_trade(
         self,
         market_condition: MarketCondition,
@@ -184,7 +462,7 @@ class AIAgent:
             
         # Complex trading logic combining multiple factors
         price_signal = predicted_price > market_condition.price * 1.02
-        volume_signal = market_condition.volume > np.mean(self.strategy_engine.volume_history) * 1.5
+        volume_signal = market_condition.volume > self.strategy_engine.indicators.volume_mean * 1.5
         trend_signal = market_condition.trend == 'bullish'
         volatility_signal = market_condition.volatility < np.mean([mc.volatility for mc in self.strategy_engine.market_conditions[-20:]])
         
@@ -200,24 +478,20 @@ class AIAgent:
         ])
 
     async def fetch_price(self) -> float:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(self.config['price_api_url']) as response:
-                data = await response.json()
-                return float(data['price'])
+        data = await self.http.get_json(self.config['price_api_url'])
+        return float(data['price'])
 
     async def fetch_volume(self) -> float:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(self.config['volume_api_url']) as response:
-                data = await response.json()
-                return float(data['volume'])
+        # If both settings point at the same endpoint, the concurrent GETs share one request
+        data = await self.http.get_json(self.config['volume_api_url'])
+        return float(data['volume'])
 
     async def execute_trade(self, market_condition: MarketCondition):
+        account = self.config['account_address']
+        nonce = None
         try:
-            # Build transaction
-            nonce = await self.web3.eth.get_transaction_count(self.config['account_address'])
-            
             # Estimate gas
-            gas_price = await self.web3.eth.gas_price
+            gas_price = int(await self.rpc.request('eth_gasPrice'), 16)
             
             # Execute trade through smart contract
             contract = self.web3.eth.contract(
@@ -225,34 +499,44 @@ class AIAgent:
                 abi=self.config['contract_abi']
             )
             
-            # Build the transaction
-            tx = await contract.functions.executeTrade(
-                market_condition.price,
-                market_condition.trend == 'bullish'
-            ).build_transaction({
-                'from': self.config['account_address'],
+            # Build the transaction locally; the nonce comes from the local nonce manager
+            nonce = await self.nonce_manager.allocate(account)
+            tx = {
+                'from': account,
+                'to': contract.address,
+                'data': contract.encode_abi('executeTrade', args=[
+                    market_condition.price,
+                    market_condition.trend == 'bullish'
+                ]),
                 'gas': 2000000,
                 'gasPrice': gas_price,
                 'nonce': nonce,
-            })
+                'chainId': self.config.get('chain_id', 57054)
+            }
             
             # Sign and send transaction
             signed_tx = self.web3.eth.account.sign_transaction(
                 tx,
                 self.config['private_key']
             )
-            tx_hash = await self.web3.eth.send_raw_transaction(
-                signed_tx.rawTransaction
+            tx_hash = await self.rpc.request(
+                'eth_sendRawTransaction',
+                [signed_tx.raw_transaction.to_0x_hex()]
             )
+            sent_nonce, nonce = nonce, None
             
-            # Wait for transaction receipt
-            receipt = await self.web3.eth.wait_for_transaction_receipt(tx_hash)
+            # Wait for transaction receipt; the tracker polls all pending hashes once per block
+            receipt = await self.receipts.wait(tx_hash, sender=account, nonce=sent_nonce)
             
-            if receipt.status == 1:
+            if int(receipt['status'], 16) == 1:
                 self.last_trade_time = datetime.now()
-                logging.info(f"Trade executed successfully: {tx_hash.hex()}")
+                logging.info(f"Trade executed successfully: {tx_hash}")
             else:
                 logging.error(f"Trade failed: {receipt}")
                 
         except Exception as e:
+            if nonce is not None:
+                self.nonce_manager.handle_error(account, nonce, e)
+            elif isinstance(e, (TransactionTimeout, TransactionReplaced)):
+                self.nonce_manager.invalidate(account)
             logging.error(f"Trade execution error: {e}")
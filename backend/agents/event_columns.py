@@ -0,0 +1,267 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from eth_utils.abi import event_abi_to_log_topic
+from hexbytes import HexBytes
+
+# Two's complement is not handled by the vectorised word decoder
+NUMERIC_PREFIXES = ('uint',)
+
+# Where a field lives in a raw log: ('topic', index) or ('word', index into the data head)
+FieldLocation = Tuple[str, int]
+
+
+def words_to_float(words: Sequence[str]) -> np.ndarray:
+    """Parse 64-digit hex words (uint256) into float64, without a Python int per word"""
+    if not len(words):
+        return np.zeros(0)
+    limbs = np.frombuffer(bytes.fromhex(''.join(words)), dtype='>u8').reshape(-1, 4).astype(np.float64)
+    return ((limbs[:, 0] * 2.0 ** 64 + limbs[:, 1]) * 2.0 ** 64 + limbs[:, 2]) * 2.0 ** 64 + limbs[:, 3]
+
+
+def _is_single_word(abi_type: str) -> bool:
+    # Elementary types and dynamic arrays take one head slot; tuples and fixed arrays may take more
+    if '(' in abi_type:
+        return False
+    return not abi_type.endswith(']') or abi_type.endswith('[]')
+
+
+def _locate(event_abi: Dict, name: str, types: Tuple[str, ...]) -> Optional[FieldLocation]:
+    topic = 1
+    word = 0
+    for item in event_abi['inputs']:
+        if item['indexed']:
+            if item['name'] == name:
+                return ('topic', topic) if item['type'].startswith(types) else None
+            topic += 1
+        else:
+            if item['name'] == name:
+                return ('word', word) if item['type'].startswith(types) else None
+            if not _is_single_word(item['type']):
+                # A static tuple or fixed array before the field shifts it by an unknown width
+                return None
+            word += 1
+    return None
+
+
+class EventColumns:
+    """Sliding window of a contract's events as parallel numpy columns, decoded straight from raw logs"""
+
+    def __init__(
+        self,
+        abi: List[Dict],
+        address_field: str = 'user',
+        value_field: str = 'value',
+        capacity: int = 65536
+    ):
+        self.address_field = address_field
+        self.value_field = value_field
+
+        # topic0 -> (event id, address location, value location)
+        self.event_names: List[str] = []
+        self._layouts: Dict[str, Tuple[int, Optional[FieldLocation], Optional[FieldLocation]]] = {}
+        for event_abi in abi:
+            if event_abi.get('type') != 'event' or event_abi.get('anonymous'):
+                continue
+            topic = HexBytes(event_abi_to_log_topic(event_abi)).to_0x_hex()
+            address = _locate(event_abi, address_field, ('address',))
+            value = _locate(event_abi, value_field, NUMERIC_PREFIXES)
+            self._layouts[topic] = (len(self.event_names), address, value)
+            self.event_names.append(event_abi['name'])
+
+        self.blocks = np.zeros(capacity, dtype=np.int64)
+        self.log_indexes = np.zeros(capacity, dtype=np.int64)
+        self.events = np.zeros(capacity, dtype=np.int16)
+        self.addresses = np.zeros(capacity, dtype=np.int32)
+        self.values = np.zeros(capacity, dtype=np.float64)
+        # Rows [_start, _end) are live; rows are in (block, log index) order
+        self._start = 0
+        self._end = 0
+
+        # Interned addresses: column values are indexes into address_table (-1 when absent)
+        self.address_table: List[str] = []
+        self._address_ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def _columns(self) -> Tuple[np.ndarray, ...]:
+        return self.blocks, self.log_indexes, self.events, self.addresses, self.values
+
+    def _intern(self, hex_addresses: Sequence[str]) -> np.ndarray:
+        if not len(hex_addresses):
+            return np.zeros(0, dtype=np.int32)
+        unique, inverse = np.unique(np.asarray(hex_addresses), return_inverse=True)
+        ids = np.empty(len(unique), dtype=np.int32)
+        for i, address in enumerate(unique):
+            address_id = self._address_ids.get(address)
+            if address_id is None:
+                address_id = len(self.address_table)
+                self._address_ids[address] = address_id
+                self.address_table.append(str(address))
+            ids[i] = address_id
+        return ids[inverse]
+
+    def _field_words(self, logs: List[Dict], location: FieldLocation) -> List[str]:
+        kind, index = location
+        if kind == 'topic':
+            return [log['topics'][index][-64:] for log in logs]
+        start = 2 + 64 * index
+        return [log['data'][start:start + 64] for log in logs]
+
+    def append_logs(self, logs: List[Dict]):
+        """Append raw eth_getLogs results, already in chain order"""
+        logs = [log for log in logs if not log.get('removed') and log['topics'] and log['topics'][0] in self._layouts]
+        n = len(logs)
+        if not n:
+            return
+        # Compaction may renumber addresses, so it has to happen before this batch is interned
+        self._reserve(n)
+
+        blocks = np.fromiter((int(log['blockNumber'], 16) for log in logs), dtype=np.int64, count=n)
+        log_indexes = np.fromiter((int(log['logIndex'], 16) for log in logs), dtype=np.int64, count=n)
+        events = np.empty(n, dtype=np.int16)
+        addresses = np.full(n, -1, dtype=np.int32)
+        values = np.full(n, np.nan)
+
+        # Each event type has a fixed layout, so its fields are sliced out for the whole group at once
+        groups: Dict[str, List[int]] = {}
+        for i, log in enumerate(logs):
+            groups.setdefault(log['topics'][0], []).append(i)
+        for topic, rows in groups.items():
+            event_id, address_location, value_location = self._layouts[topic]
+            group = [logs[i] for i in rows]
+            rows = np.asarray(rows)
+            events[rows] = event_id
+            if address_location is not None:
+                words = self._field_words(group, address_location)
+                addresses[rows] = self._intern(['0x' + word[-40:].lower() for word in words])
+            if value_location is not None:
+                values[rows] = words_to_float(self._field_words(group, value_location))
+
+        self._append(blocks, log_indexes, events, addresses, values)
+
+    def append_events(self, events: List[Dict]):
+        """Append already decoded events (web3 EventData)"""
+        n = len(events)
+        if not n:
+            return
+        self._reserve(n)
+        names = {name: i for i, name in enumerate(self.event_names)}
+        args = [event['args'] for event in events]
+        addresses = np.full(n, -1, dtype=np.int32)
+        present = np.fromiter((self.address_field in a for a in args), dtype=bool, count=n)
+        addresses[present] = self._intern([a[self.address_field].lower() for a in args if self.address_field in a])
+        self._append(
+            np.fromiter((event['blockNumber'] for event in events), dtype=np.int64, count=n),
+            np.fromiter((event['logIndex'] for event in events), dtype=np.int64, count=n),
+            np.fromiter((names.get(event['event'], -1) for event in events), dtype=np.int16, count=n),
+            addresses,
+            np.fromiter(
+                (float(a[self.value_field]) if self.value_field in a else np.nan for a in args),
+                dtype=np.float64,
+                count=n
+            )
+        )
+
+    def _reserve(self, n: int):
+        if self._end + n > len(self.blocks):
+            self._compact(n)
+
+    def _append(self, *columns: np.ndarray):
+        n = len(columns[0])
+        for target, column in zip(self._columns(), columns):
+            target[self._end:self._end + n] = column
+        self._end += n
+
+    def _compact(self, incoming: int):
+        live = len(self)
+        capacity = len(self.blocks)
+        while capacity < 2 * (live + incoming):
+            capacity *= 2
+
+        columns = []
+        for column in self._columns():
+            resized = np.zeros(capacity, dtype=column.dtype) if capacity != len(column) else column
+            resized[:live] = column[self._start:self._end]
+            columns.append(resized)
+        self.blocks, self.log_indexes, self.events, self.addresses, self.values = columns
+        self._start, self._end = 0, live
+        self._reintern()
+
+    def _reintern(self):
+        # Drop addresses that left the window once they dominate the table
+        addresses = self.addresses[:self._end]
+        present = addresses >= 0
+        used, remapped = np.unique(addresses[present], return_inverse=True)
+        if len(self.address_table) < 2 * len(used) + 1024:
+            return
+        self.address_table = [self.address_table[i] for i in used]
+        self._address_ids = {address: i for i, address in enumerate(self.address_table)}
+        addresses[present] = remapped
+
+    def evict_before(self, block: int):
+        """Drop rows older than block"""
+        self._start += int(np.searchsorted(self.blocks[self._start:self._end], block, side='left'))
+
+    def truncate_after(self, block: int):
+        """Drop rows newer than block, e.g. after a reorg"""
+        self._end = self._start + int(np.searchsorted(self.blocks[self._start:self._end], block, side='right'))
+
+    def window(self) -> Dict[str, np.ndarray]:
+        """Live rows as read-only column views"""
+        columns = {
+            'block': self.blocks[self._start:self._end],
+            'log_index': self.log_indexes[self._start:self._end],
+            'event': self.events[self._start:self._end],
+            'address': self.addresses[self._start:self._end],
+            'value': self.values[self._start:self._end]
+        }
+        for column in columns.values():
+            column.setflags(write=False)
+        return columns
+
+    def volume_by_address(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(address ids, event counts, value totals) for every address in the window"""
+        addresses = self.addresses[self._start:self._end]
+        values = self.values[self._start:self._end]
+        present = addresses >= 0
+        counts = np.bincount(addresses[present], minlength=len(self.address_table))
+        totals = np.bincount(
+            addresses[present],
+            weights=np.nan_to_num(values[present]),
+            minlength=len(self.address_table)
+        )
+        active = np.flatnonzero(counts)
+        return active, counts[active], totals[active]
+
+    def summary(self, top: int = 5, percentiles: Sequence[float] = (50, 90, 99)) -> Dict:
+        """Window statistics from vectorised group-bys over the columns"""
+        values = self.values[self._start:self._end]
+        values = values[~np.isnan(values)]
+        active, counts, totals = self.volume_by_address()
+        events = self.events[self._start:self._end]
+        event_counts = np.bincount(events[events >= 0], minlength=len(self.event_names))
+
+        leaders = np.argpartition(-totals, top - 1)[:top] if len(totals) > top else np.arange(len(totals))
+        leaders = leaders[np.argsort(-totals[leaders])]
+        return {
+            'transaction_count': len(self),
+            'unique_addresses': len(active),
+            'total_value': float(values.sum()),
+            'value_percentiles': (
+                dict(zip((f'p{p:g}' for p in percentiles), np.percentile(values, percentiles).tolist()))
+                if len(values) else {}
+            ),
+            'event_counts': {
+                name: int(count) for name, count in zip(self.event_names, event_counts) if count
+            },
+            'top_addresses': [
+                {
+                    'address': self.address_table[active[i]],
+                    'events': int(counts[i]),
+                    'value': float(totals[i])
+                }
+                for i in leaders
+            ]
+        }
@@ -0,0 +1,274 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from eth_utils.abi import event_abi_to_log_topic
+from hexbytes import HexBytes
+from web3._utils.events import get_event_data
+from web3.datastructures import AttributeDict
+
+from agents.event_columns import EventColumns
+from agents.rpc_batch import BatchRPC
+
+# Node messages meaning the requested range returned too many logs or took too long
+RANGE_ERRORS = (
+    'query returned more than',
+    'too many',
+    'block range',
+    'range is too large',
+    'limit exceeded',
+    'timeout',
+    'timed out'
+)
+
+
+def is_range_error(error: Exception) -> bool:
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    message = str(error).lower()
+    return any(fragment in message for fragment in RANGE_ERRORS)
+
+
+class EventIndexer:
+    """Cursor over a contract's logs: fetches only blocks past the checkpoint, in adaptive chunks, with reorg rollback"""
+
+    def __init__(
+        self,
+        rpc: BatchRPC,
+        contract,
+        checkpoint_path: Optional[str] = None,
+        start_block: Optional[int] = None,
+        window_blocks: int = 1000,
+        confirmations: int = 0,
+        reorg_depth: int = 16,
+        initial_chunk: int = 500,
+        min_chunk: int = 1,
+        max_chunk: int = 10000,
+        target_logs: int = 5000
+    ):
+        self.rpc = rpc
+        self.contract = contract
+        self.address = contract.address
+        self.checkpoint_path = checkpoint_path
+        self.start_block = start_block
+        self.window_blocks = window_blocks
+        self.confirmations = confirmations
+        self.reorg_depth = reorg_depth
+        self.chunk = initial_chunk
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.target_logs = target_logs
+
+        codec = contract.w3.codec
+        self._decoders = {
+            HexBytes(event_abi_to_log_topic(abi)): (codec, abi)
+            for abi in contract.abi
+            if abi.get('type') == 'event' and not abi.get('anonymous')
+        }
+
+        # Last indexed block, plus the hashes of the last reorg_depth indexed blocks
+        self.cursor: Optional[int] = None
+        self._hashes: Deque[Tuple[int, str]] = deque(maxlen=reorg_depth)
+        # Events of the last window_blocks blocks, held column-wise for analytics
+        self.columns = EventColumns(contract.abi)
+        # perf_counter time each event returned by the last sync() arrived, for latency accounting
+        self.last_arrivals: List[float] = []
+
+        self.blocks_indexed = 0
+        self.logs_fetched = 0
+        self.requests = 0
+        self.reorgs = 0
+
+        self._backfill_pending = False
+        self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return
+        try:
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.error(f"Could not read event checkpoint {self.checkpoint_path}: {e}")
+            return
+        if checkpoint.get('address', '').lower() != self.address.lower():
+            logging.warning(f"Event checkpoint {self.checkpoint_path} is for another contract, ignoring it")
+            return
+        self.cursor = checkpoint['block']
+        self._hashes.extend((number, block_hash) for number, block_hash in checkpoint.get('hashes', []))
+        self.chunk = checkpoint.get('chunk', self.chunk)
+        # The window columns are not checkpointed; the first sync refills them from the node
+        self._backfill_pending = True
+
+    def _save_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        checkpoint = {
+            'address': self.address,
+            'block': self.cursor,
+            'hashes': list(self._hashes),
+            'chunk': self.chunk
+        }
+        # Write then rename, so a crash never leaves a half-written checkpoint
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    async def sync(self) -> List[AttributeDict]:
+        """Index every block since the checkpoint; returns the newly decoded events"""
+        # Head and the checkpoint block's current hash in one round trip
+        requests = [('eth_blockNumber', [])]
+        if self._hashes:
+            requests.append(('eth_getBlockByNumber', [hex(self._hashes[-1][0]), False]))
+        results = await self.rpc.request_many(requests)
+        if isinstance(results[0], Exception):
+            raise results[0]
+        head = int(results[0], 16) - self.confirmations
+
+        if self.cursor is None:
+            first = self.start_block if self.start_block is not None else head - self.window_blocks
+            self.cursor = max(first, 0) - 1
+        elif self._hashes and not isinstance(results[1], Exception):
+            if results[1] is None or results[1]['hash'] != self._hashes[-1][1]:
+                await self._rollback()
+
+        if self._backfill_pending:
+            await self._backfill(head)
+
+        new_events = []
+        arrivals = []
+        while self.cursor < head:
+            from_block = self.cursor + 1
+            try:
+                to_block, logs, hashes = await self._fetch_chunk(from_block, head)
+            except Exception as e:
+                if not new_events:
+                    raise
+                # Earlier chunks are already checkpointed; hand their events off and resume from here next time
+                logging.error(f"Event sync stopped after block {self.cursor}: {e}")
+                break
+
+            received = time.perf_counter()
+            for log in logs:
+                event = self._decode(log) if not log.get('removed') else None
+                if event is not None:
+                    new_events.append(event)
+                    arrivals.append(received)
+            self.columns.append_logs(logs)
+            self.cursor = to_block
+            self._hashes.extend(hashes)
+            self.blocks_indexed += to_block - from_block + 1
+            self.logs_fetched += len(logs)
+            self._adapt_chunk(len(logs))
+            self._save_checkpoint()
+
+        self.columns.evict_before(head - self.window_blocks + 1)
+        self.last_arrivals = arrivals
+        return new_events
+
+    async def _backfill(self, head: int):
+        """Reload the window's already indexed logs into the columns after a restart; no events are re-emitted"""
+        block = max(head - self.window_blocks + 1, 0)
+        while block <= self.cursor:
+            to_block, logs, _ = await self._fetch_chunk(block, self.cursor, with_headers=False)
+            self.columns.append_logs(logs)
+            self.logs_fetched += len(logs)
+            block = to_block + 1
+        self._backfill_pending = False
+
+    async def _fetch_chunk(
+        self, from_block: int, last_block: int, with_headers: bool = True
+    ) -> Tuple[int, List[Dict], List[Tuple[int, str]]]:
+        """Fetch from from_block up to one chunk, halving the chunk while the provider rejects the range"""
+        while True:
+            to_block = min(last_block, from_block + self.chunk - 1)
+            try:
+                logs, hashes = await self._fetch(from_block, to_block, with_headers)
+                return to_block, logs, hashes
+            except Exception as e:
+                if not is_range_error(e) or self.chunk <= self.min_chunk:
+                    raise
+                self.chunk = max(self.min_chunk, self.chunk // 2)
+
+    async def _fetch(
+        self, from_block: int, to_block: int, with_headers: bool = True
+    ) -> Tuple[List[Dict], List[Tuple[int, str]]]:
+        # Headers of the range's last reorg_depth blocks ride in the same batch, for later reorg checks
+        self.requests += 1
+        numbers = range(max(from_block, to_block - self.reorg_depth + 1), to_block + 1) if with_headers else range(0)
+        logs, *headers = await self.rpc.request_many(
+            [('eth_getLogs', [{'address': self.address, 'fromBlock': hex(from_block), 'toBlock': hex(to_block)}])]
+            + [('eth_getBlockByNumber', [hex(number), False]) for number in numbers]
+        )
+        for result in (logs, *headers):
+            if isinstance(result, Exception):
+                raise result
+        return logs, [(number, header['hash']) for number, header in zip(numbers, headers)]
+
+    def _adapt_chunk(self, log_count: int):
+        if log_count > self.target_logs:
+            self.chunk = max(self.min_chunk, self.chunk // 2)
+        elif log_count < self.target_logs // 4:
+            self.chunk = min(self.max_chunk, self.chunk * 2)
+
+    async def _rollback(self):
+        """Rewind to the newest remembered block still on the canonical chain"""
+        self.reorgs += 1
+        remembered = list(self._hashes)
+        headers = await self.rpc.request_many([
+            ('eth_getBlockByNumber', [hex(number), False]) for number, _ in remembered
+        ])
+        ancestor = None
+        for (number, block_hash), header in zip(reversed(remembered), reversed(headers)):
+            if isinstance(header, dict) and header.get('hash') == block_hash:
+                ancestor = number
+                break
+
+        if ancestor is None:
+            ancestor = max(remembered[0][0] - self.reorg_depth, 0)
+            self._hashes.clear()
+        else:
+            while self._hashes and self._hashes[-1][0] > ancestor:
+                self._hashes.pop()
+        logging.warning(f"Chain reorg detected at block {self.cursor}, rolling back to {ancestor}")
+
+        self.cursor = ancestor
+        self.columns.truncate_after(ancestor)
+
+    def _decode(self, log: Dict) -> Optional[AttributeDict]:
+        topics = [HexBytes(topic) for topic in log['topics']]
+        decoder = self._decoders.get(topics[0]) if topics else None
+        if decoder is None:
+            return None
+        codec, abi = decoder
+        entry = AttributeDict({
+            'address': log['address'],
+            'topics': topics,
+            'data': HexBytes(log['data']),
+            'blockNumber': int(log['blockNumber'], 16),
+            'blockHash': HexBytes(log['blockHash']),
+            'transactionHash': HexBytes(log['transactionHash']),
+            'transactionIndex': int(log['transactionIndex'], 16),
+            'logIndex': int(log['logIndex'], 16)
+        })
+        try:
+            return get_event_data(codec, abi, entry)
+        except Exception as e:
+            logging.error(f"Could not decode log {log['transactionHash']}:{log['logIndex']}: {e}")
+            return None
+
+    def stats(self) -> Dict:
+        return {
+            'cursor': self.cursor,
+            'chunk': self.chunk,
+            'window_events': len(self.columns),
+            'blocks_indexed': self.blocks_indexed,
+            'logs_fetched': self.logs_fetched,
+            'requests': self.requests,
+            'reorgs': self.reorgs
+        }
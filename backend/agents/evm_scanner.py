@@ -0,0 +1,270 @@
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+
+STOP = 0x00
+POP = 0x50
+SSTORE = 0x55
+JUMP = 0x56
+JUMPI = 0x57
+JUMPDEST = 0x5b
+PUSH1 = 0x60
+PUSH32 = 0x7f
+CALL = 0xf1
+CALLCODE = 0xf2
+RETURN = 0xf3
+DELEGATECALL = 0xf4
+STATICCALL = 0xfa
+REVERT = 0xfd
+INVALID = 0xfe
+SELFDESTRUCT = 0xff
+
+
+def _opcode_mask(*opcodes) -> np.ndarray:
+    mask = np.zeros(256, dtype=bool)
+    mask[list(opcodes)] = True
+    return mask
+
+
+# Instructions after which control never reaches the next instruction
+NO_FALLTHROUGH = _opcode_mask(JUMP, STOP, RETURN, REVERT, INVALID, SELFDESTRUCT)
+ENDS_BLOCK = _opcode_mask(JUMP, JUMPI, STOP, RETURN, REVERT, INVALID, SELFDESTRUCT)
+IS_JUMP = _opcode_mask(JUMP, JUMPI)
+STATE_CHANGING_CALL = _opcode_mask(CALL, CALLCODE, DELEGATECALL)
+REENTRANT_CALL = _opcode_mask(CALL, CALLCODE)
+
+# Bytes of immediate data that follow each opcode
+PUSH_LENGTHS = np.array(
+    [op - PUSH1 + 1 if PUSH1 <= op <= PUSH32 else 0 for op in range(256)],
+    dtype=np.int64
+)
+# The sequential decode walks every 2**DECODE_STRIDE_LEVELS-th instruction and fills in the rest vectorised
+DECODE_STRIDE_LEVELS = 5
+
+# Bump when detectors change so cached scan results are recomputed
+SCANNER_VERSION = 1
+
+# How many basic blocks to follow from an external call when looking for a later SSTORE
+MAX_REENTRANCY_DEPTH = 8
+
+
+@dataclass
+class BytecodeScan:
+    code_size: int
+    pcs: np.ndarray  # pc of every instruction
+    ops: np.ndarray  # opcode of every instruction
+    block_starts: np.ndarray  # pc where each basic block starts
+    block_ids: np.ndarray  # basic block of every instruction
+    fallthrough: np.ndarray  # block continues into block + 1
+    jump_targets: np.ndarray  # statically known jump target block, or -1
+    issues: List[Dict]
+
+    @property
+    def instruction_count(self) -> int:
+        return len(self.ops)
+
+    @property
+    def block_count(self) -> int:
+        return len(self.block_starts)
+
+    def successors(self, block: int) -> List[int]:
+        result = []
+        if self.fallthrough[block]:
+            result.append(block + 1)
+        if self.jump_targets[block] >= 0:
+            result.append(int(self.jump_targets[block]))
+        return result
+
+
+def strip_metadata(code: bytes) -> bytes:
+    """Drop the CBOR metadata trailer solc appends, so it is not decoded as instructions"""
+    if len(code) < 2:
+        return code
+    length = int.from_bytes(code[-2:], 'big')
+    # solc metadata starts with a CBOR map header (0xa1-0xa5)
+    if 0 < length < len(code) - 2 and 0xa1 <= code[-2 - length] <= 0xa5:
+        return code[:-2 - length]
+    return code
+
+
+def instruction_pcs(code: np.ndarray) -> np.ndarray:
+    """pc of every instruction, skipping PUSH immediate data"""
+    n = len(code)
+    # next_pc[pc] is where decoding continues if pc starts an instruction; n is the end
+    next_pc = np.append(np.minimum(np.arange(1, n + 1) + PUSH_LENGTHS[code], n), n)
+    stride = 1 << DECODE_STRIDE_LEVELS
+    jump = next_pc
+    for _ in range(DECODE_STRIDE_LEVELS):
+        jump = jump[jump]
+
+    # Whether a byte is data depends on every PUSH before it, so the walk itself is sequential,
+    # but it only visits every stride-th instruction; the ones in between are filled in per row
+    anchors = []
+    pc = 0
+    while pc < n:
+        anchors.append(pc)
+        pc = int(jump[pc])
+    rows = np.empty((stride, len(anchors)), dtype=np.int64)
+    rows[0] = anchors
+    for k in range(1, stride):
+        rows[k] = next_pc[rows[k - 1]]
+    pcs = rows.T.ravel()
+    return pcs[pcs < n]
+
+
+def scan_bytecode(code: bytes) -> BytecodeScan:
+    """Decode runtime bytecode once into basic blocks and a static CFG, then run all detectors"""
+    raw = strip_metadata(bytes(code))
+    code_arr = np.frombuffer(raw, dtype=np.uint8)
+    n = len(code_arr)
+
+    pcs = instruction_pcs(code_arr)
+    ops = code_arr[pcs]
+    count = len(ops)
+
+    if count == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return BytecodeScan(n, empty, ops, empty, empty, np.zeros(0, dtype=bool), empty, [])
+
+    # Blocks start at pc 0, at every JUMPDEST, and after every jump or halting instruction
+    ends_block = ENDS_BLOCK[ops]
+    is_block_start = ops == JUMPDEST
+    is_block_start[0] = True
+    is_block_start[1:] |= ends_block[:-1]
+    block_ids = np.cumsum(is_block_start) - 1
+    first = np.flatnonzero(is_block_start)
+    last = np.append(first[1:] - 1, count - 1)
+
+    fallthrough = ~NO_FALLTHROUGH[ops[last]]
+    fallthrough[-1] = False
+
+    jump_targets = _static_jump_targets(code_arr, pcs, ops, last, block_ids)
+
+    scan = BytecodeScan(n, pcs, ops, pcs[first], block_ids, fallthrough, jump_targets, [])
+    scan.issues = _detect(scan)
+    return scan
+
+
+def _static_jump_targets(code, pcs, ops, last, block_ids) -> np.ndarray:
+    targets = np.full(len(last), -1, dtype=np.int64)
+
+    # Jumps whose destination was pushed by the immediately preceding instruction
+    jumps = np.flatnonzero(IS_JUMP[ops[last]] & (last > 0))
+    if not len(jumps):
+        return targets
+    push_index = last[jumps] - 1
+    push_lengths = PUSH_LENGTHS[ops[push_index]]
+    # Code is capped at 24KB, so real jump destinations fit in 4 bytes
+    static = (push_lengths > 0) & (push_lengths <= 4)
+    jumps, push_index, push_lengths = jumps[static], push_index[static], push_lengths[static]
+
+    values = np.zeros(len(jumps), dtype=np.int64)
+    data_start = pcs[push_index] + 1
+    for offset in range(4):
+        has_byte = push_lengths > offset
+        byte_pos = np.minimum(data_start + offset, len(code) - 1)
+        values = np.where(has_byte, (values << 8) | code[byte_pos].astype(np.int64), values)
+
+    jumpdests = np.flatnonzero(ops == JUMPDEST)
+    if not len(jumpdests):
+        return targets
+    dest_pcs = pcs[jumpdests]
+    slot = np.minimum(np.searchsorted(dest_pcs, values), len(dest_pcs) - 1)
+    valid = dest_pcs[slot] == values
+    targets[jumps[valid]] = block_ids[jumpdests[slot[valid]]]
+    return targets
+
+
+def _detect(scan: BytecodeScan) -> List[Dict]:
+    issues = []
+    ops = scan.ops
+    pcs = scan.pcs
+
+    calls = np.flatnonzero(STATE_CHANGING_CALL[ops])
+    sstores = np.flatnonzero(ops == SSTORE)
+
+    # Latest SSTORE in each block, to tell whether one follows a call in the same block
+    last_sstore = np.full(scan.block_count, -1, dtype=np.int64)
+    np.maximum.at(last_sstore, scan.block_ids[sstores], sstores)
+    has_sstore = last_sstore >= 0
+
+    # The success flag is left on top of the stack; popping it straight away ignores it
+    next_ops = ops[np.minimum(calls + 1, len(ops) - 1)]
+    unchecked = calls[(calls + 1 < len(ops)) & (next_ops == POP)]
+
+    external = calls[REENTRANT_CALL[ops[calls]]]
+    call_blocks = scan.block_ids[external]
+    after_call = _sstore_reachable(scan, has_sstore)
+    reentrant = external[(last_sstore[call_blocks] > external) | after_call[call_blocks]]
+
+    if len(reentrant):
+        issues.append({
+            'type': 'REENTRANCY',
+            'severity': 'HIGH',
+            'description': f'Storage written after external call at pc {_format_pcs(pcs[reentrant])}'
+        })
+
+    if len(unchecked):
+        issues.append({
+            'type': 'UNCHECKED_CALL',
+            'severity': 'MEDIUM',
+            'description': f'External call return value discarded at pc {_format_pcs(pcs[unchecked])}'
+        })
+
+    delegatecalls = np.flatnonzero(ops == DELEGATECALL)
+    if len(delegatecalls):
+        issues.append({
+            'type': 'DELEGATECALL',
+            'severity': 'MEDIUM',
+            'description': f'DELEGATECALL runs external code in this contract\'s storage at pc {_format_pcs(pcs[delegatecalls])}'
+        })
+
+    selfdestructs = np.flatnonzero(ops == SELFDESTRUCT)
+    if len(selfdestructs):
+        issues.append({
+            'type': 'SELFDESTRUCT',
+            'severity': 'HIGH',
+            'description': f'SELFDESTRUCT present at pc {_format_pcs(pcs[selfdestructs])}'
+        })
+
+    return issues
+
+
+def _sstore_reachable(scan: BytecodeScan, has_sstore: np.ndarray) -> np.ndarray:
+    """For every block, whether an SSTORE is reachable in its successors within the depth limit"""
+    block_count = scan.block_count
+    fall = np.flatnonzero(scan.fallthrough)
+    jumps = np.flatnonzero(scan.jump_targets >= 0)
+    jump_targets = scan.jump_targets[jumps]
+
+    # reach[b]: an SSTORE is in b or at most `depth` edges beyond it; grown one edge per round
+    reach = has_sstore.copy()
+    after = np.zeros(block_count, dtype=bool)
+    for _ in range(MAX_REENTRANCY_DEPTH):
+        after[:] = False
+        after[fall] = reach[fall + 1]
+        after[jumps] |= reach[jump_targets]
+        next_reach = has_sstore | after
+        if np.array_equal(next_reach, reach):
+            break
+        reach = next_reach
+
+    after[:] = False
+    after[fall] = reach[fall + 1]
+    after[jumps] |= reach[jump_targets]
+    return after
+
+
+def _format_pcs(pcs, limit: int = 5) -> str:
+    pcs = [int(pc) for pc in pcs]
+    shown = ', '.join(hex(pc) for pc in pcs[:limit])
+    if len(pcs) > limit:
+        shown += f' (+{len(pcs) - limit} more)'
+    return shown
+
+
+def risk_score(issues: List[Dict]) -> int:
+    """Simple 0-100 score from issue severities"""
+    weights = {'HIGH': 40, 'MEDIUM': 20, 'LOW': 10}
+    return min(100, sum(weights.get(issue['severity'], 10) for issue in issues))
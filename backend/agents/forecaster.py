@@ -0,0 +1,170 @@
+import asyncio
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from statsmodels.tsa.arima.model import ARIMA
+
+
+class ARIMAForecaster:
+    """Keeps a fitted ARIMA and extends it with new observations instead of refitting every call"""
+
+    def __init__(
+        self,
+        order: Tuple[int, int, int] = (5, 1, 0),
+        min_observations: int = 30,
+        refit_every: int = 50,
+        drift_threshold: float = 4.0,
+        drift_patience: int = 3,
+        closed_form: bool = False
+    ):
+        self.order = order
+        self.min_observations = min_observations
+        self.refit_every = refit_every
+        # Consecutive one-step errors beyond this many standard deviations trigger a refit
+        self.drift_threshold = drift_threshold
+        self.drift_patience = drift_patience
+
+        self.results = None
+        self.pending: List[float] = []
+        self.observations_since_fit = 0
+        self.fit_count = 0
+        self._drift_streak = 0
+        # In-sample error of the last full fit; extended results only cover the new points
+        self.mse = 0.0
+        self._cached: Optional[Tuple[float, float]] = None
+        self._refit_task: Optional[asyncio.Task] = None
+        # Opt-in for ARIMA(p,1,0): between refits, forecast and check drift with the AR recursion on the
+        # last p + 1 prices instead of the Kalman filter. Same numbers, without statsmodels per tick.
+        self.closed_form = closed_form
+        self._ar_params: Optional[np.ndarray] = None
+        self._sigma = 0.0
+        self._tail = np.zeros(0)
+
+    def observe(self, price: float):
+        """Record a new observation; the model is only updated on the next forecast"""
+        self.pending.append(price)
+        self._cached = None
+
+    def forecast(self, history: Sequence[float]) -> Tuple[float, float]:
+        """One-step forecast and confidence; history is the full window, used for refits"""
+        if self._cached is not None:
+            return self._cached
+
+        if self.results is None or self._needs_refit():
+            self.refit(history)
+        elif self.pending:
+            self._extend()
+            if self._needs_refit():
+                self.refit(history)
+
+        return self._forecast(history)
+
+    async def forecast_offloaded(self, history: Sequence[float], executor) -> Tuple[float, float]:
+        """Like forecast(), but full refits run on a ComputeExecutor instead of the event loop"""
+        if self._cached is not None:
+            return self._cached
+
+        if self.results is None or self._needs_refit():
+            await self._refit_offloaded(history, executor)
+        if self.pending:
+            self._extend()
+            if self._needs_refit():
+                await self._refit_offloaded(history, executor)
+
+        return self._forecast(history)
+
+    async def _refit_offloaded(self, history: Sequence[float], executor):
+        from agents.compute import fit_arima
+
+        if self._refit_task is None:
+            # Observations queued so far are part of this window; later ones are extended afterwards
+            consumed = len(self.pending)
+            window = np.array(history, dtype=float)
+
+            async def refit():
+                try:
+                    self.install(await executor.run(fit_arima, window, self.order), consumed)
+                finally:
+                    self._refit_task = None
+
+            self._refit_task = asyncio.create_task(refit())
+        await asyncio.shield(self._refit_task)
+
+    def _forecast(self, history: Sequence[float]) -> Tuple[float, float]:
+        if self._ar_params is not None:
+            predicted_price = self._ar_forecast()
+        else:
+            predicted_price = float(self.results.forecast(steps=1)[0])
+
+        # Calculate confidence based on model performance
+        confidence = 1 - min(1, self.mse / np.mean(history))
+
+        self._cached = (predicted_price, confidence)
+        return self._cached
+
+    def refit(self, history: Sequence[float]):
+        """Fit from scratch on the full history window"""
+        model = ARIMA(np.array(history, dtype=float), order=self.order)
+        self.install(model.fit())
+
+    def install(self, results, consumed: Optional[int] = None):
+        """Adopt freshly fitted results; consumed is how many pending observations they cover"""
+        self.results = results
+        if consumed is None:
+            self.pending.clear()
+        else:
+            del self.pending[:consumed]
+        self.observations_since_fit = 0
+        self.fit_count += 1
+        self._drift_streak = 0
+        self.mse = float(results.mse)
+        self._cached = None
+
+        self._ar_params = None
+        p, d, q = self.order
+        ar_names = [f'ar.L{i}' for i in range(1, p + 1)]
+        if self.closed_form and d == 1 and q == 0 and list(results.param_names) == ar_names + ['sigma2']:
+            params = np.asarray(results.params, dtype=float)
+            endog = np.asarray(results.model.endog, dtype=float).ravel()
+            self._ar_params = params[:p]
+            self._sigma = float(np.sqrt(params[-1]))
+            self._tail = endog[-(p + 1):].copy()
+            # Observations queued while an offloaded fit ran are applied by the next _extend()
+
+    def _ar_forecast(self) -> float:
+        # Once p + 1 points are filtered the Kalman forecast is exactly the AR recursion on the differences
+        return float(self._tail[-1] + self._ar_params @ np.diff(self._tail)[::-1])
+
+    def needs_refit(self) -> bool:
+        return self.results is None or self._needs_refit()
+
+    def _needs_refit(self) -> bool:
+        return (
+            self.observations_since_fit + len(self.pending) >= self.refit_every
+            or self._drift_streak >= self.drift_patience
+        )
+
+    def _extend(self):
+        new_observations = np.array(self.pending, dtype=float)
+        self.pending.clear()
+        if self._ar_params is not None:
+            self.observations_since_fit += len(new_observations)
+            for value in new_observations.tolist():
+                error = abs(value - self._ar_forecast()) / self._sigma if self._sigma else 0.0
+                self._drift_streak = self._drift_streak + 1 if error > self.drift_threshold else 0
+                self._tail = np.append(self._tail[1:], value)
+            return
+
+        try:
+            # Filters only the new points forward from the fitted state, keeping the parameters
+            self.results = self.results.extend(new_observations)
+        except Exception as e:
+            logging.warning(f"ARIMA extend failed, forcing refit: {e}")
+            self._drift_streak = self.drift_patience
+            return
+
+        self.observations_since_fit += len(new_observations)
+        errors = np.abs(np.asarray(self.results.standardized_forecasts_error).ravel())
+        for error in errors:
+            self._drift_streak = self._drift_streak + 1 if error > self.drift_threshold else 0
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import logging
+import random
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import aiohttp
+
+# Worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HTTPClient:
+    """Shared keep-alive connection pool with per-host limits, timeouts and jittered retries"""
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        timeout: float = 10.0,
+        connect_timeout: float = 3.0,
+        retries: int = 3,
+        backoff: float = 0.2,
+        max_backoff: float = 5.0,
+        keepalive_timeout: float = 60.0
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.keepalive_timeout = keepalive_timeout
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Concurrent identical GETs share one request
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+
+        self.requests = 0
+        self.retried = 0
+        self.failures = 0
+        self.coalesced = 0
+
+    async def session(self) -> aiohttp.ClientSession:
+        """The pooled session, created on first use in the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            if self._session is not None and not self._session.closed:
+                # Left over from a previous loop; aiohttp drops its pooled connections without touching a closed loop
+                await self._session.close()
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            if self._loop is not None and self._loop is not loop:
+                # Requests in flight belong to the old loop and can never complete
+                self._inflight.clear()
+            self._loop = loop
+        return self._session
+
+    async def get_json(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None) -> Any:
+        key = (url, json.dumps(params, sort_keys=True, default=str), json.dumps(headers, sort_keys=True))
+        pending = self._inflight.get(key)
+        if pending is None:
+            # The fetch runs in its own task, so a caller being cancelled never cancels it for the others
+            pending = asyncio.ensure_future(self.request('GET', url, params=params, headers=headers))
+            self._inflight[key] = pending
+            pending.add_done_callback(lambda task: self._finish(key, task))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(pending)
+
+    def _finish(self, key: tuple, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Retrieve the error even if every waiter was cancelled, avoiding "exception never retrieved" noise
+        if not task.cancelled():
+            task.exception()
+
+    async def post_json(self, url: str, payload: Any, headers: Optional[Dict] = None) -> Any:
+        return await self.request('POST', url, json=payload, headers=headers)
+
+    async def request(self, method: str, url: str, **kwargs) -> Any:
+        """Send a request and decode the JSON body, retrying transient failures"""
+        session = await self.session()
+        attempt = 0
+        while True:
+            self.requests += 1
+            try:
+                async with session.request(method, url, **kwargs) as response:
+                    if response.status in RETRY_STATUSES and attempt < self.retries:
+                        retry_after = response.headers.get('Retry-After')
+                        await self._sleep_before_retry(attempt, retry_after)
+                        attempt += 1
+                        continue
+                    response.raise_for_status()
+                    return await response.json(content_type=None)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.retries:
+                    self.failures += 1
+                    raise
+                logging.warning(f"{method} {url} failed ({e!r}), retrying")
+                await self._sleep_before_retry(attempt)
+                attempt += 1
+            except aiohttp.ClientResponseError:
+                self.failures += 1
+                raise
+
+    async def _sleep_before_retry(self, attempt: int, retry_after: Optional[str] = None):
+        self.retried += 1
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        if retry_after and retry_after.isdigit():
+            delay = min(self.max_backoff, max(delay, float(retry_after)))
+        # Full jitter so many agents backing off together do not retry in lockstep
+        await asyncio.sleep(random.uniform(0, delay))
+
+    async def fetch_many(self, urls: Sequence[Union[str, tuple]]) -> List[Any]:
+        """GET several endpoints concurrently; each item is a url or (url, params). Failures come back as exceptions"""
+        requests = [(item, None) if isinstance(item, str) else item for item in urls]
+        return await asyncio.gather(
+            *(self.get_json(url, params=params) for url, params in requests),
+            return_exceptions=True
+        )
+
+    def stats(self) -> Dict:
+        return {
+            'requests': self.requests,
+            'retries': self.retried,
+            'failures': self.failures,
+            'coalesced': self.coalesced
+        }
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_shared_client: Optional[HTTPClient] = None
+
+
+def get_http_client(**options) -> HTTPClient:
+    """Process-wide client shared by all agents; options only apply on first use"""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = HTTPClient(**options)
+    return _shared_client
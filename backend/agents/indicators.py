@@ -0,0 +1,325 @@
+import math
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-size float window; view() returns the values oldest-first without copying"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        # Every value is written twice, so the live window is always one contiguous slice
+        self._data = np.zeros(2 * capacity, dtype=np.float64)
+        self._next = 0
+        self.size = 0
+
+    def append(self, value: float) -> Optional[float]:
+        """Add a value, returning the one that fell out of the window (if any)"""
+        dropped = self._data[self._next] if self.size == self.capacity else None
+        self._data[self._next] = value
+        self._data[self._next + self.capacity] = value
+        self._next = (self._next + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+        return dropped
+
+    def view(self) -> np.ndarray:
+        """Read-only window into the buffer; it changes with later appends, so copy to keep it"""
+        if self.size < self.capacity:
+            window = self._data[:self.size]
+        else:
+            window = self._data[self._next:self._next + self.capacity]
+        window.flags.writeable = False
+        return window
+
+    def last(self, n: int = 1) -> np.ndarray:
+        return self.view()[-n:]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index):
+        return self.view()[index]
+
+    def __iter__(self):
+        return iter(self.view())
+
+
+class WindowedEMA:
+    """pandas ewm(span, adjust=True).mean() over the last `window` values, updated in O(1)"""
+
+    def __init__(self, span: int, window: int):
+        self.alpha = 2.0 / (span + 1.0)
+        self.decay = 1.0 - self.alpha
+        # Weight the oldest value carries once the window is full and it is about to drop out
+        self.tail_weight = self.decay ** window
+        self._numerator = 0.0
+        self._denominator = 0.0
+        self.value = math.nan
+
+    def update(self, value: float, dropped: Optional[float] = None) -> float:
+        self._numerator = self._numerator * self.decay + value
+        if dropped is None:
+            self._denominator = self._denominator * self.decay + 1.0
+        else:
+            # The denominator is constant once the window is full
+            self._numerator -= dropped * self.tail_weight
+        self.value = self._numerator / self._denominator
+        return self.value
+
+    def reset(self, values: Sequence[float]):
+        self._numerator = 0.0
+        self._denominator = 0.0
+        # Works elementwise too: for a (tokens x window) array each column is one tick
+        for value in np.asarray(values).T:
+            self._numerator = self._numerator * self.decay + value
+            self._denominator = self._denominator * self.decay + 1.0
+        self.value = self._numerator / self._denominator if self._denominator else math.nan
+
+
+class RingMatrix:
+    """RingBuffer for many series at once: a (rows x capacity) window sharing one write position"""
+
+    def __init__(self, rows: int, capacity: int):
+        self.rows = rows
+        self.capacity = capacity
+        self._data = np.zeros((rows, 2 * capacity), dtype=np.float64)
+        self._next = 0
+        self.size = 0
+
+    def append(self, values: np.ndarray) -> Optional[np.ndarray]:
+        """Add one column, returning the column that fell out of the window (if any)"""
+        dropped = self._data[:, self._next].copy() if self.size == self.capacity else None
+        self._data[:, self._next] = values
+        self._data[:, self._next + self.capacity] = values
+        self._next = (self._next + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+        return dropped
+
+    def view(self) -> np.ndarray:
+        """Read-only (rows x size) window, oldest column first"""
+        if self.size < self.capacity:
+            window = self._data[:, :self.size]
+        else:
+            window = self._data[:, self._next:self._next + self.capacity]
+        window.flags.writeable = False
+        return window
+
+    def last(self) -> np.ndarray:
+        return self.view()[:, -1]
+
+    def fill_rows(self, rows: np.ndarray, values: np.ndarray):
+        """Overwrite the whole history of some rows with one value each, e.g. to seed a late series"""
+        self._data[rows, :] = np.asarray(values, dtype=np.float64)[:, None]
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class RollingStats:
+    """Mean and population variance of the last `window` values, updated in O(1)"""
+
+    # Rebuild from the raw window this often to stop floating-point drift accumulating
+    RESYNC_EVERY = 1000
+
+    def __init__(self, window: int):
+        self.buffer = RingBuffer(window)
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._updates = 0
+
+    def update(self, value: float):
+        dropped = self.buffer.append(value)
+        n = len(self.buffer)
+        if dropped is None:
+            # Welford's online update while the window is still filling
+            delta = value - self.mean
+            self.mean += delta / n
+            self._m2 += delta * (value - self.mean)
+        else:
+            old_mean = self.mean
+            self.mean += (value - dropped) / n
+            self._m2 += (value - dropped) * (value - self.mean + dropped - old_mean)
+
+        self._updates += 1
+        if self._updates % self.RESYNC_EVERY == 0:
+            self.resync()
+
+    def resync(self):
+        window = self.buffer.view()
+        self.mean = float(window.mean()) if len(window) else 0.0
+        self._m2 = float(((window - self.mean) ** 2).sum()) if len(window) else 0.0
+
+    @property
+    def variance(self) -> float:
+        n = len(self.buffer)
+        return max(self._m2 / n, 0.0) if n else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def full(self) -> bool:
+        return len(self.buffer) == self.buffer.capacity
+
+
+class MultiRollingStats:
+    """RollingStats for every row of a RingMatrix in one vectorised update"""
+
+    RESYNC_EVERY = 1000
+
+    def __init__(self, rows: int, window: int):
+        self.buffer = RingMatrix(rows, window)
+        self.mean = np.zeros(rows)
+        self._m2 = np.zeros(rows)
+        self._updates = 0
+
+    def update(self, values: np.ndarray):
+        dropped = self.buffer.append(values)
+        n = len(self.buffer)
+        if dropped is None:
+            delta = values - self.mean
+            self.mean += delta / n
+            self._m2 += delta * (values - self.mean)
+        else:
+            old_mean = self.mean.copy()
+            self.mean += (values - dropped) / n
+            self._m2 += (values - dropped) * (values - self.mean + dropped - old_mean)
+
+        self._updates += 1
+        if self._updates % self.RESYNC_EVERY == 0:
+            self.resync()
+
+    def resync(self):
+        window = self.buffer.view()
+        if window.shape[1]:
+            self.mean = window.mean(axis=1)
+            self._m2 = ((window - self.mean[:, None]) ** 2).sum(axis=1)
+
+    @property
+    def variance(self) -> np.ndarray:
+        n = len(self.buffer)
+        return np.maximum(self._m2 / n, 0.0) if n else np.zeros_like(self._m2)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.variance)
+
+
+class IndicatorEngine:
+    """Streaming price/volume indicators for AIStrategyEngine, constant time per tick"""
+
+    RESYNC_EVERY = 1000
+
+    def __init__(
+        self,
+        history_size: int = 100,
+        short_span: int = 7,
+        long_span: int = 20,
+        volatility_window: int = 20
+    ):
+        self.prices = RingBuffer(history_size)
+        self.ema_short = WindowedEMA(short_span, history_size)
+        self.ema_long = WindowedEMA(long_span, history_size)
+        self.price_stats = RollingStats(volatility_window)
+        self.volume_stats = RollingStats(history_size)
+        self.volumes = self.volume_stats.buffer
+        self._updates = 0
+        # Refreshed in place every tick rather than rebuilt
+        self._snapshot: Dict = {}
+
+    def update(self, price: float, volume: float) -> Dict:
+        dropped_price = self.prices.append(price)
+        self.ema_short.update(price, dropped_price)
+        self.ema_long.update(price, dropped_price)
+        self.price_stats.update(price)
+        self.volume_stats.update(volume)
+
+        self._updates += 1
+        if self._updates % self.RESYNC_EVERY == 0:
+            window = self.prices.view()
+            self.ema_short.reset(window)
+            self.ema_long.reset(window)
+        return self.snapshot()
+
+    def snapshot(self) -> Dict:
+        """Current indicator values; the same dict is reused, so copy it to keep a tick's values"""
+        snapshot = self._snapshot
+        snapshot['ema_short'] = self.ema_short.value
+        snapshot['ema_long'] = self.ema_long.value
+        snapshot['rolling_mean'] = self.price_stats.mean
+        snapshot['volatility'] = self.price_stats.std
+        snapshot['volume_mean'] = self.volume_stats.mean
+        return snapshot
+
+    @property
+    def volume_mean(self) -> float:
+        return self.volume_stats.mean
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+
+class MultiIndicatorEngine:
+    """IndicatorEngine for many tokens ticking together, one vectorised pass per tick"""
+
+    RESYNC_EVERY = 1000
+
+    def __init__(
+        self,
+        rows: int,
+        history_size: int = 100,
+        short_span: int = 7,
+        long_span: int = 20,
+        volatility_window: int = 20
+    ):
+        self.prices = RingMatrix(rows, history_size)
+        # WindowedEMA arithmetic is elementwise, so the same class tracks a whole column
+        self.ema_short = WindowedEMA(short_span, history_size)
+        self.ema_long = WindowedEMA(long_span, history_size)
+        self.price_stats = MultiRollingStats(rows, volatility_window)
+        self.volume_stats = MultiRollingStats(rows, history_size)
+        self.volumes = self.volume_stats.buffer
+        self._updates = 0
+        self._snapshot: Dict = {}
+
+    def update(self, prices: np.ndarray, volumes: np.ndarray) -> Dict:
+        dropped_prices = self.prices.append(prices)
+        self.ema_short.update(prices, dropped_prices)
+        self.ema_long.update(prices, dropped_prices)
+        self.price_stats.update(prices)
+        self.volume_stats.update(volumes)
+
+        self._updates += 1
+        if self._updates % self.RESYNC_EVERY == 0:
+            window = self.prices.view()
+            self.ema_short.reset(window)
+            self.ema_long.reset(window)
+        return self.snapshot()
+
+    def snapshot(self) -> Dict:
+        """Per-row indicator arrays; the same dict is reused, so copy it to keep a tick's values"""
+        snapshot = self._snapshot
+        snapshot['ema_short'] = self.ema_short.value
+        snapshot['ema_long'] = self.ema_long.value
+        snapshot['rolling_mean'] = self.price_stats.mean
+        snapshot['volatility'] = self.price_stats.std
+        snapshot['volume_mean'] = self.volume_stats.mean
+        return snapshot
+
+    def seed_rows(self, rows: np.ndarray, prices: np.ndarray, volumes: np.ndarray):
+        """Backfill rows that had no data yet with their first real values, then rebuild their statistics"""
+        self.prices.fill_rows(rows, prices)
+        self.price_stats.buffer.fill_rows(rows, prices)
+        self.volume_stats.buffer.fill_rows(rows, volumes)
+        self.price_stats.resync()
+        self.volume_stats.resync()
+        window = self.prices.view()
+        self.ema_short.reset(window)
+        self.ema_long.reset(window)
+
+    def __len__(self) -> int:
+        return len(self.prices)
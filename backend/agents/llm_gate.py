@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# complete(messages, max_tokens) -> (result, {'prompt_tokens': ..., 'completion_tokens': ...})
+CompletionFn = Callable[[List[Dict], int], Awaitable[Tuple[Any, Dict]]]
+
+
+def round_significant(value: float, digits: int) -> float:
+    """Round to a number of significant digits, so nearby market states share a cache key"""
+    if not value:
+        return 0.0
+    return float(f'{value:.{digits}g}')
+
+
+def estimate_tokens(messages: List[Dict]) -> int:
+    # Roughly four characters per token for English prompts
+    return sum(len(message['content']) for message in messages) // 4 + 4 * len(messages)
+
+
+class TokenBucket:
+    """Tokens-per-minute budget; requests wait until their estimated tokens have refilled"""
+
+    def __init__(self, tokens_per_minute: float):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = tokens_per_minute
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waited = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: int) -> float:
+        """Wait for and take the tokens, capped at the bucket size; returns the amount actually charged"""
+        tokens = min(tokens, self.capacity)
+        # Requests are served in arrival order so a large one is not starved by small ones
+        async with self._lock:
+            self._refill()
+            while self.tokens < tokens:
+                delay = (tokens - self.tokens) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)
+                self._refill()
+            self.tokens -= tokens
+        return tokens
+
+    def adjust(self, tokens: int):
+        """Correct an estimate once the real usage is known; positive refunds, negative charges"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + tokens)
+
+
+class LLMGate:
+    """Caches completions by state fingerprint, coalesces duplicates and enforces concurrency and TPM limits"""
+
+    def __init__(
+        self,
+        complete: CompletionFn,
+        cache_ttl: float = 300.0,
+        max_entries: int = 256,
+        max_concurrency: int = 2,
+        tokens_per_minute: float = 40000,
+        prompt_price: float = 0.0,
+        completion_price: float = 0.0,
+        history: int = 1000
+    ):
+        self.complete = complete
+        self.cache_ttl = cache_ttl
+        self.max_entries = max_entries
+        # Prices are per 1000 tokens
+        self.prompt_price = prompt_price
+        self.completion_price = completion_price
+
+        self._cache: OrderedDict = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.bucket = TokenBucket(tokens_per_minute)
+
+        self.requests = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.calls = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies = deque(maxlen=history)
+
+    def _cached(self, fingerprint: str) -> Optional[Any]:
+        entry = self._cache.get(fingerprint)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if time.monotonic() >= expires_at:
+            del self._cache[fingerprint]
+            return None
+        self._cache.move_to_end(fingerprint)
+        return result
+
+    def _store(self, fingerprint: str, result: Any):
+        self._cache[fingerprint] = (time.monotonic() + self.cache_ttl, result)
+        self._cache.move_to_end(fingerprint)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def run(self, fingerprint: str, messages: List[Dict], max_tokens: int) -> Any:
+        """Result for this state: from cache, from an identical call in flight, or from a new completion"""
+        self.requests += 1
+        result = self._cached(fingerprint)
+        if result is not None:
+            self.cache_hits += 1
+            return result
+
+        pending = self._inflight.get(fingerprint)
+        if pending is None:
+            # The completion runs in its own task, so a cancelled caller never cancels it for the others
+            pending = asyncio.ensure_future(self._complete_and_store(fingerprint, messages, max_tokens))
+            self._inflight[fingerprint] = pending
+            pending.add_done_callback(lambda task: self._finish(fingerprint, task))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(pending)
+
+    async def _complete_and_store(self, fingerprint: str, messages: List[Dict], max_tokens: int) -> Any:
+        result = await self._call(messages, max_tokens)
+        if result is not None:
+            self._store(fingerprint, result)
+        return result
+
+    def _finish(self, fingerprint: str, task: asyncio.Future):
+        if self._inflight.get(fingerprint) is task:
+            del self._inflight[fingerprint]
+        if not task.cancelled():
+            task.exception()
+
+    async def _call(self, messages: List[Dict], max_tokens: int) -> Any:
+        estimate = estimate_tokens(messages) + max_tokens
+        async with self._semaphore:
+            charged = await self.bucket.acquire(estimate)
+            started = time.perf_counter()
+            self.calls += 1
+            try:
+                result, usage = await self.complete(messages, max_tokens)
+            except Exception:
+                self.failures += 1
+                raise
+            finally:
+                self.latencies.append(time.perf_counter() - started)
+
+        prompt_tokens = usage.get('prompt_tokens', 0)
+        completion_tokens = usage.get('completion_tokens', 0)
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        if usage:
+            self.bucket.adjust(charged - prompt_tokens - completion_tokens)
+        return result
+
+    @property
+    def cost(self) -> float:
+        return (self.prompt_tokens * self.prompt_price + self.completion_tokens * self.completion_price) / 1000
+
+    def stats(self) -> Dict:
+        latencies = np.array(self.latencies) * 1000
+        return {
+            'requests': self.requests,
+            'completions': self.calls,
+            'failures': self.failures,
+            'cache_hits': self.cache_hits,
+            'coalesced': self.coalesced,
+            'cache_hit_rate': (self.cache_hits + self.coalesced) / self.requests if self.requests else 0.0,
+            'p50_latency_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'p95_latency_ms': float(np.percentile(latencies, 95)) if len(latencies) else None,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'cost': self.cost,
+            'rate_limited_seconds': self.bucket.waited
+        }
+
+
+class Debouncer:
+    """Merges bursts of triggers into one callback run with the latest arguments"""
+
+    def __init__(self, callback: Callable[..., Awaitable], delay: float = 2.0, max_wait: float = 10.0):
+        self.callback = callback
+        # Fire once triggers stop for `delay`, or `max_wait` after the first one at the latest
+        self.delay = delay
+        self.max_wait = max_wait
+        self._args: Optional[tuple] = None
+        self._first = 0.0
+        self._last = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+        self.triggers = 0
+        self.runs = 0
+
+    def trigger(self, *args):
+        now = time.monotonic()
+        if self._args is None:
+            self._first = now
+        self._args = args
+        self._last = now
+        self.triggers += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self._args is not None:
+            now = time.monotonic()
+            fire_at = min(self._last + self.delay, self._first + self.max_wait)
+            if now < fire_at:
+                await asyncio.sleep(fire_at - now)
+                continue
+            args, self._args = self._args, None
+            self.runs += 1
+            try:
+                await self.callback(*args)
+            except Exception as e:
+                logging.error(f"Debounced callback failed: {e}")
+
+    async def stop(self):
+        self._args = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {'triggers': self.triggers, 'runs': self.runs}
@@ -0,0 +1,169 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from agents.price_oracle import BlockNumberCache
+from agents.rpc_batch import BatchRPC
+
+
+def trade_key(trade) -> Optional[Tuple]:
+    """Identity of a trade across fetches: its transaction hash and log position, None without a hash"""
+    tx_hash = getattr(trade, 'hash', None)
+    if tx_hash is None:
+        return None
+    return tx_hash, getattr(trade, 'log_index', None)
+
+
+def keys_unique(keys: List[Optional[Tuple]]) -> bool:
+    return None not in keys and len(set(keys)) == len(keys)
+
+
+class MarketDataAggregator:
+    """Fetches token, pool and trade data concurrently; token metadata is cached forever, pool state per block"""
+
+    def __init__(
+        self,
+        zerepy,
+        rpc: Optional[BatchRPC] = None,
+        block_refresh_interval: float = 1.0,
+        trade_history: int = 100,
+        trade_page: int = 20,
+        max_pool_entries: int = 256
+    ):
+        self.zerepy = zerepy
+        # Without a block source pool state cannot be keyed by block, so it is fetched every time
+        self.blocks = BlockNumberCache(self._get_block_number, block_refresh_interval) if rpc else None
+        self.rpc = rpc
+        self.trade_history = trade_history
+        self.trade_page = trade_page
+        self.max_pool_entries = max_pool_entries
+
+        self._token_info: Dict[str, Any] = {}
+        self._pools: OrderedDict = OrderedDict()
+        # Per token: the last trade_history trades, oldest first, keyed by trade_key.
+        # Tokens whose trades cannot be told apart have no entry and are always fetched in full.
+        self._trades: Dict[str, OrderedDict] = {}
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+
+        self.token_info_hits = 0
+        self.pool_hits = 0
+        self.pool_fetches = 0
+        self.trade_pages = 0
+        self.trade_full_fetches = 0
+
+    async def _get_block_number(self) -> int:
+        return int(await self.rpc.request('eth_blockNumber'), 16)
+
+    async def _once(self, key: Tuple, fetch):
+        """Concurrent callers asking for the same thing share one request"""
+        pending = self._inflight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(fetch())
+            self._inflight[key] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def token_info(self, token_address: str):
+        """Name, symbol, decimals and the like never change, so they are fetched once per token"""
+        info = self._token_info.get(token_address)
+        if info is not None:
+            self.token_info_hits += 1
+            return info
+        info = await self._once(('token', token_address), lambda: self.zerepy.get_token_info(token_address))
+        self._token_info[token_address] = info
+        return info
+
+    async def pool_info(self, token_address: str):
+        """Pool state for the current block, fetched at most once per block"""
+        if self.blocks is None:
+            self.pool_fetches += 1
+            return await self.zerepy.get_pool_info(token_address)
+
+        block = self.blocks.peek()
+        if block is not None:
+            cached = self._pools.get((token_address, block))
+            if cached is not None:
+                self.pool_hits += 1
+                return cached
+            pool = await self._fetch_pool(token_address)
+        else:
+            # The block lookup and the pool fetch overlap, so a stale block number costs no extra round trip
+            block, pool = await asyncio.gather(self.blocks.current(), self._fetch_pool(token_address))
+
+        self._pools[(token_address, block)] = pool
+        self._pools.move_to_end((token_address, block))
+        while len(self._pools) > self.max_pool_entries:
+            self._pools.popitem(last=False)
+        return pool
+
+    async def _fetch_pool(self, token_address: str):
+        self.pool_fetches += 1
+        return await self._once(('pool', token_address), lambda: self.zerepy.get_pool_info(token_address))
+
+    async def recent_trades(self, token_address: str) -> List:
+        """The last trade_history trades; after the first call only a short page of the newest is fetched"""
+        return await self._once(('trades', token_address), lambda: self._update_trades(token_address))
+
+    async def _update_trades(self, token_address: str) -> List:
+        history = self._trades.get(token_address)
+        if history is None:
+            return self._replace_trades(token_address, await self._fetch_all_trades(token_address))
+
+        self.trade_pages += 1
+        page = await self.zerepy.get_recent_trades(token_address, limit=self.trade_page)
+        keys = [trade_key(trade) for trade in page]
+        if not keys_unique(keys) or (len(page) >= self.trade_page and not any(key in history for key in keys)):
+            # Unidentifiable trades cannot be merged, and more new trades than one page holds leave a gap
+            return self._replace_trades(token_address, await self._fetch_all_trades(token_address))
+
+        # Pages come newest first; append the unseen ones oldest first
+        for key, trade in reversed(list(zip(keys, page))):
+            if key not in history:
+                history[key] = trade
+        while len(history) > self.trade_history:
+            history.popitem(last=False)
+        return list(history.values())
+
+    async def _fetch_all_trades(self, token_address: str) -> List:
+        self.trade_full_fetches += 1
+        return await self.zerepy.get_recent_trades(token_address, limit=self.trade_history)
+
+    def _replace_trades(self, token_address: str, trades: List) -> List:
+        trades = list(reversed(trades))
+        keys = [trade_key(trade) for trade in trades]
+        if keys_unique(keys):
+            self._trades[token_address] = OrderedDict(zip(keys, trades))
+        else:
+            self._trades.pop(token_address, None)
+        return trades
+
+    async def snapshot(self, token_address: str, include_token_info: bool = True) -> Dict:
+        """Token info, pool state and recent trades gathered in one round trip of wall time"""
+        requests = [self.pool_info(token_address), self.recent_trades(token_address)]
+        if include_token_info:
+            requests.append(self.token_info(token_address))
+        pool, trades, *token_info = await asyncio.gather(*requests)
+        return {
+            'pool': pool,
+            'trades': trades,
+            'token_info': token_info[0] if token_info else None
+        }
+
+    def invalidate(self, token_address: Optional[str] = None):
+        """Forget pool and trade state, e.g. after a reconnect"""
+        for key in [key for key in self._pools if token_address is None or key[0] == token_address]:
+            del self._pools[key]
+        if token_address is None:
+            self._trades.clear()
+        else:
+            self._trades.pop(token_address, None)
+
+    def stats(self) -> Dict:
+        return {
+            'tokens_cached': len(self._token_info),
+            'token_info_hits': self.token_info_hits,
+            'pool_hits': self.pool_hits,
+            'pool_fetches': self.pool_fetches,
+            'trade_pages': self.trade_pages,
+            'trade_full_fetches': self.trade_full_fetches
+        }
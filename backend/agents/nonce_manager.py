@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+
+from eth_utils import to_checksum_address
+
+from agents.rpc_batch import RPCError
+
+# Node error fragments that mean our local nonce no longer matches the chain
+NONCE_ERRORS = (
+    'nonce too low',
+    'nonce too high',
+    'already known',
+    'known transaction',
+    'replacement transaction underpriced',
+    'invalid nonce'
+)
+
+
+def is_nonce_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(fragment in message for fragment in NONCE_ERRORS)
+
+
+class NonceManager:
+    """Per-account nonces handed out locally, so transactions can be pipelined without a count lookup each"""
+
+    def __init__(self, rpc=None, web3=None):
+        # rpc (BatchRPC) serves allocate(); web3 serves allocate_sync() for the blocking code paths
+        self.rpc = rpc
+        self.web3 = web3
+        self._next: Dict[str, int] = {}
+        self._stale = set()
+        self._lock = threading.Lock()
+        self._sync_locks: Dict[str, asyncio.Lock] = {}
+
+        self.allocated = 0
+        self.resyncs = 0
+
+    async def allocate(self, address: str) -> int:
+        """Reserve the next nonce; only the first call (or one after invalidate) asks the node"""
+        address = to_checksum_address(address)
+        lock = self._sync_locks.setdefault(address, asyncio.Lock())
+        async with lock:
+            if self._needs_sync(address):
+                count = await self.rpc.request('eth_getTransactionCount', [address, 'pending'])
+                self._set(address, int(count, 16))
+            return self._take(address)
+
+    def allocate_sync(self, address: str) -> int:
+        address = to_checksum_address(address)
+        with self._lock:
+            if self._needs_sync(address):
+                self._next[address] = self.web3.eth.get_transaction_count(address, 'pending')
+                self._stale.discard(address)
+                self.resyncs += 1
+            self.allocated += 1
+            nonce = self._next[address]
+            self._next[address] = nonce + 1
+            return nonce
+
+    def _needs_sync(self, address: str) -> bool:
+        return address not in self._next or address in self._stale
+
+    def _set(self, address: str, count: int):
+        with self._lock:
+            self._next[address] = count
+            self._stale.discard(address)
+            self.resyncs += 1
+
+    def _take(self, address: str) -> int:
+        with self._lock:
+            nonce = self._next[address]
+            self._next[address] = nonce + 1
+            self.allocated += 1
+            return nonce
+
+    def release(self, address: str, nonce: int):
+        """Give back a nonce whose transaction was never broadcast"""
+        address = to_checksum_address(address)
+        with self._lock:
+            if self._next.get(address) == nonce + 1:
+                self._next[address] = nonce
+            else:
+                # Later nonces are already out; the gap would stall them, so let the node decide
+                self._stale.add(address)
+
+    def invalidate(self, address: str):
+        """Resync from the node on the next allocation, e.g. after a dropped transaction"""
+        with self._lock:
+            self._stale.add(to_checksum_address(address))
+
+    def handle_error(self, address: str, nonce: Optional[int], error: Exception) -> bool:
+        """Account for a failed send; returns True if the error was nonce related"""
+        if is_nonce_error(error):
+            logging.warning(f"Nonce {nonce} rejected for {address} ({error}), resyncing")
+            self.invalidate(address)
+            return True
+        if nonce is not None:
+            if isinstance(error, RPCError):
+                # The node rejected the transaction, so the nonce was never used
+                self.release(address, nonce)
+            else:
+                # A timeout or dropped connection may still have broadcast it
+                self.invalidate(address)
+        return False
+
+    def stats(self) -> Dict:
+        return {
+            'accounts': len(self._next),
+            'allocated': self.allocated,
+            'resyncs': self.resyncs
+        }
@@ -0,0 +1,212 @@
+import asyncio
+import time
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+PathKey = Tuple[str, ...]
+
+
+class BlockNumberCache:
+    """Caches the latest block number for a short refresh interval"""
+
+    def __init__(self, get_block_number: Callable[[], Awaitable[int]], refresh_interval: float = 1.0):
+        self.get_block_number = get_block_number
+        self.refresh_interval = refresh_interval
+        self._block: Optional[int] = None
+        self._checked_at = 0.0
+        self._inflight: Optional[asyncio.Future] = None
+
+    async def current(self) -> int:
+        """Return the cached block number, refreshing it at most once per interval"""
+        if self._block is not None and time.monotonic() - self._checked_at < self.refresh_interval:
+            return self._block
+
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._refresh())
+        return await asyncio.shield(self._inflight)
+
+    def peek(self) -> Optional[int]:
+        """The cached block number while it is still fresh, without a lookup"""
+        if self._block is not None and time.monotonic() - self._checked_at < self.refresh_interval:
+            return self._block
+        return None
+
+    async def _refresh(self) -> int:
+        try:
+            block = await self.get_block_number()
+            self._block = block
+            self._checked_at = time.monotonic()
+            return block
+        finally:
+            self._inflight = None
+
+
+class PriceOracle:
+    """Shared quote cache keyed by (path, block) with in-flight request coalescing"""
+
+    def __init__(
+        self,
+        fetch_quote: Callable[[List[str]], Awaitable[float]],
+        fetch_quotes: Optional[Callable[[List[List[str]]], Awaitable[List[Any]]]] = None,
+        get_block_number: Optional[Callable[[], Awaitable[int]]] = None,
+        ttl: float = 12.0,
+        block_refresh: float = 1.0,
+        max_entries: int = 10000
+    ):
+        self.fetch_quote = fetch_quote
+        self.fetch_quotes = fetch_quotes
+        self.blocks = BlockNumberCache(get_block_number, block_refresh) if get_block_number else None
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._cache: Dict[Tuple[PathKey, Optional[int]], Tuple[float, float]] = {}
+        self._inflight: Dict[Tuple[PathKey, Optional[int]], asyncio.Future] = {}
+        self._last_block: Optional[int] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_price(self, path: Sequence[str]) -> float:
+        """Return the quote for a swap path, hitting the RPC only on a cache miss"""
+        block = await self._current_block()
+        key = (tuple(path), block)
+
+        entry = self._cache.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self.hits += 1
+            return entry[0]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+        task = asyncio.ensure_future(self._fetch(key, list(path)))
+        self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def get_prices(self, paths: Sequence[Sequence[str]]) -> List[Any]:
+        """Quote many paths, fetching all misses in one batch; failed quotes come back as exceptions"""
+        if self.fetch_quotes is None:
+            return list(await asyncio.gather(
+                *(self.get_price(path) for path in paths),
+                return_exceptions=True
+            ))
+
+        block = await self._current_block()
+        keys = [(tuple(path), block) for path in paths]
+        now = time.monotonic()
+        waiters: Dict[Tuple[PathKey, Optional[int]], Any] = {}
+        missing = []
+
+        for key in dict.fromkeys(keys):
+            entry = self._cache.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self.hits += 1
+                waiters[key] = entry[0]
+            elif key in self._inflight:
+                self.coalesced += 1
+                waiters[key] = self._inflight[key]
+            else:
+                self.misses += 1
+                missing.append(key)
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            for key in missing:
+                waiters[key] = self._inflight[key] = loop.create_future()
+            asyncio.ensure_future(self._fetch_many(missing))
+
+        results = []
+        for key in keys:
+            waiter = waiters[key]
+            if isinstance(waiter, asyncio.Future):
+                try:
+                    results.append(await asyncio.shield(waiter))
+                except Exception as e:
+                    results.append(e)
+            else:
+                results.append(waiter)
+        return results
+
+    def invalidate(self, path: Optional[Sequence[str]] = None):
+        """Drop cached quotes for one path, or all of them"""
+        if path is None:
+            self._cache.clear()
+            return
+        key_path = tuple(path)
+        for key in [k for k in self._cache if k[0] == key_path]:
+            del self._cache[key]
+
+    def stats(self) -> Dict:
+        """Cache hit/miss counters"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            'entries': len(self._cache),
+            'inflight': len(self._inflight)
+        }
+
+    async def _current_block(self) -> Optional[int]:
+        if self.blocks is None:
+            return None
+        try:
+            block = await self.blocks.current()
+        except Exception as e:
+            # Fall back to TTL-only caching on the last known block
+            logging.warning(f"Block number lookup failed, using last known block: {e}")
+            return self._last_block
+
+        if self._last_block is not None and block > self._last_block:
+            self._evict_older_than(block)
+        self._last_block = block
+        return block
+
+    async def _fetch(self, key: Tuple[PathKey, Optional[int]], path: List[str]) -> float:
+        try:
+            price = await self.fetch_quote(path)
+            self._store(key, price)
+            return price
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _fetch_many(self, keys: List[Tuple[PathKey, Optional[int]]]):
+        try:
+            quotes = await self.fetch_quotes([list(key[0]) for key in keys])
+        except Exception as e:
+            quotes = [e] * len(keys)
+        if len(quotes) != len(keys):
+            error = RuntimeError(f"Expected {len(keys)} quotes, got {len(quotes)}")
+            quotes = [error] * len(keys)
+
+        for key, quote in zip(keys, quotes):
+            future = self._inflight.pop(key, None)
+            if isinstance(quote, Exception):
+                if future is not None and not future.done():
+                    future.set_exception(quote)
+                continue
+            self._store(key, quote)
+            if future is not None and not future.done():
+                future.set_result(quote)
+
+    def _store(self, key: Tuple[PathKey, Optional[int]], price: float):
+        if len(self._cache) >= self.max_entries:
+            self._evict_expired()
+            if len(self._cache) >= self.max_entries:
+                # Dicts keep insertion order, so this drops the oldest quote
+                del self._cache[next(iter(self._cache))]
+        self._cache[key] = (price, time.monotonic())
+
+    def _evict_older_than(self, block: int):
+        for key in [k for k in self._cache if k[1] is not None and k[1] < block]:
+            del self._cache[key]
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for key in [k for k, (_, stored_at) in self._cache.items() if now - stored_at >= self.ttl]:
+            del self._cache[key]
@@ -0,0 +1,253 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+ARMED = 'armed'
+TRIGGERED = 'triggered'
+COOLING_DOWN = 'cooling_down'
+
+
+@dataclass
+class PriceAlert:
+    alert_id: str
+    token_address: str
+    target_price: float
+    alert_type: str  # 'above' or 'below'
+    email: Optional[str] = None
+    hysteresis: float = 0.0  # fraction of target_price the price must retreat before re-arming
+    rearm_delay: float = 0.0  # seconds to wait after retreating before the alert can fire again
+    state: str = ARMED
+    rearm_at: float = 0.0
+    fired_count: int = 0
+
+    def is_triggered(self, price: float) -> bool:
+        if self.alert_type == 'above':
+            return price >= self.target_price
+        return price <= self.target_price
+
+    def is_reset(self, price: float) -> bool:
+        band = abs(self.target_price) * self.hysteresis
+        if self.alert_type == 'above':
+            return price < self.target_price - band
+        return price > self.target_price + band
+
+    def update(self, price: float, now: float) -> bool:
+        """Advance the alert state machine; returns True only when the alert should fire"""
+        if self.state == TRIGGERED:
+            if self.is_reset(price):
+                self.state = COOLING_DOWN
+                self.rearm_at = now + self.rearm_delay
+            return False
+
+        if self.state == COOLING_DOWN:
+            if self.is_triggered(price):
+                # Crossed back before re-arming: treat it as the same event
+                self.state = TRIGGERED
+                return False
+            if now < self.rearm_at:
+                return False
+            self.state = ARMED
+
+        if self.is_triggered(price):
+            self.state = TRIGGERED
+            self.fired_count += 1
+            return True
+        return False
+
+
+@dataclass
+class WatchedToken:
+    token_address: str
+    interval: float
+    next_due: float
+    alerts: Dict[str, PriceAlert] = field(default_factory=dict)
+    last_price: Optional[float] = None
+
+
+class PriceMonitorScheduler:
+    """Single scheduler that polls all watched tokens in batches and evaluates their alerts"""
+
+    def __init__(
+        self,
+        fetch_prices: Callable[[List[str]], Awaitable[List[float]]],
+        on_alert: Callable[[PriceAlert, float], Awaitable[None]],
+        default_interval: float = 60.0,
+        max_batch_size: int = 500,
+        coalesce_window: float = 1.0,
+        hysteresis: float = 0.0,
+        rearm_delay: float = 0.0
+    ):
+        self.fetch_prices = fetch_prices
+        self.on_alert = on_alert
+        self.default_interval = default_interval
+        self.max_batch_size = max_batch_size
+        # Tokens due within this many seconds of each other are polled in the same batch
+        self.coalesce_window = coalesce_window
+        self.hysteresis = hysteresis
+        self.rearm_delay = rearm_delay
+
+        self.tokens: Dict[str, WatchedToken] = {}
+        self._queue: List[tuple] = []  # (next_due, seq, token_address)
+        self._seq = itertools.count()
+        self._alert_ids = itertools.count(1)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the scheduler loop if it is not already running"""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the scheduler loop and wait for it to exit"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def add_alert(
+        self,
+        token_address: str,
+        target_price: float,
+        alert_type: str = 'above',
+        email: Optional[str] = None,
+        interval: Optional[float] = None,
+        hysteresis: Optional[float] = None,
+        rearm_delay: Optional[float] = None
+    ) -> PriceAlert:
+        """Register an alert, watching the token if it is not watched yet"""
+        watched = self.watch(token_address, interval)
+        alert = PriceAlert(
+            alert_id=f"alert-{next(self._alert_ids)}",
+            token_address=token_address,
+            target_price=target_price,
+            alert_type=alert_type,
+            email=email,
+            hysteresis=self.hysteresis if hysteresis is None else hysteresis,
+            rearm_delay=self.rearm_delay if rearm_delay is None else rearm_delay
+        )
+        watched.alerts[alert.alert_id] = alert
+        return alert
+
+    def remove_alert(self, token_address: str, alert_id: str) -> bool:
+        """Remove one alert; the token stays watched until unwatch() is called"""
+        watched = self.tokens.get(token_address)
+        if not watched:
+            return False
+        return watched.alerts.pop(alert_id, None) is not None
+
+    def watch(self, token_address: str, interval: Optional[float] = None) -> WatchedToken:
+        """Start watching a token, or update its polling interval"""
+        interval = interval or self.default_interval
+        loop = asyncio.get_running_loop()
+        watched = self.tokens.get(token_address)
+
+        if watched is None:
+            watched = WatchedToken(token_address, interval, loop.time())
+            self.tokens[token_address] = watched
+            self._schedule(watched)
+        elif watched.interval != interval:
+            watched.interval = interval
+            next_due = min(watched.next_due, loop.time() + interval)
+            if next_due != watched.next_due:
+                watched.next_due = next_due
+                self._schedule(watched)
+
+        return watched
+
+    def unwatch(self, token_address: str) -> bool:
+        """Stop watching a token and drop all of its alerts"""
+        # Stale queue entries are skipped lazily when they come due
+        return self.tokens.pop(token_address, None) is not None
+
+    def stats(self) -> Dict:
+        """Watched token and alert state counts"""
+        states = {ARMED: 0, TRIGGERED: 0, COOLING_DOWN: 0}
+        fired = 0
+        for watched in self.tokens.values():
+            for alert in watched.alerts.values():
+                states[alert.state] += 1
+                fired += alert.fired_count
+        return {
+            'tokens': len(self.tokens),
+            'alerts': sum(states.values()),
+            'states': states,
+            'fired': fired
+        }
+
+    def _schedule(self, watched: WatchedToken):
+        heapq.heappush(self._queue, (watched.next_due, next(self._seq), watched.token_address))
+        self._wakeup.set()
+
+    def _pop_due(self, now: float) -> List[WatchedToken]:
+        due = []
+        while self._queue and self._queue[0][0] <= now and len(due) < self.max_batch_size:
+            next_due, _, token_address = heapq.heappop(self._queue)
+            watched = self.tokens.get(token_address)
+            if watched is None or watched.next_due != next_due:
+                continue
+            due.append(watched)
+        return due
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            due = self._pop_due(loop.time() + self.coalesce_window)
+            if due:
+                await self._poll(due)
+                now = loop.time()
+                for watched in due:
+                    if self.tokens.get(watched.token_address) is watched:
+                        watched.next_due = self._next_slot(watched, now)
+                        self._schedule(watched)
+                continue
+
+            timeout = self._queue[0][0] - loop.time() if self._queue else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    @staticmethod
+    def _next_slot(watched: WatchedToken, now: float) -> float:
+        # Keep each token on its original phase so tokens sharing an interval stay batched
+        next_due = watched.next_due + watched.interval
+        if next_due <= now:
+            missed = int((now - next_due) // watched.interval) + 1
+            next_due += missed * watched.interval
+        return next_due
+
+    async def _poll(self, due: List[WatchedToken]):
+        try:
+            prices = await self.fetch_prices([watched.token_address for watched in due])
+        except Exception as e:
+            logging.error(f"Batch price fetch failed for {len(due)} tokens: {e}")
+            return
+
+        for watched, price in zip(due, prices):
+            if price is None:
+                continue
+            watched.last_price = price
+            now = asyncio.get_running_loop().time()
+            for alert in list(watched.alerts.values()):
+                if alert.update(price, now):
+                    await self._fire(alert, price)
+
+    async def _fire(self, alert: PriceAlert, price: float):
+        try:
+            await self.on_alert(alert, price)
+        except Exception as e:
+            logging.error(f"Price alert {alert.alert_id} handler failed: {e}")
@@ -0,0 +1,166 @@
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+COLUMNS = ('timestamp', 'price', 'volume')
+
+
+class PriceSeries:
+    """Append-only (timestamp, price, volume) columns memory-mapped from disk"""
+
+    def __init__(self, path_prefix: str, initial_capacity: int = 65536, sync_every: int = 1):
+        self.path_prefix = path_prefix
+        self.sync_every = sync_every
+        self._unsynced = 0
+        self.dropped = 0
+
+        # The row count lives in its own file and is written last, so a crash mid-append
+        # leaves the previous rows intact and the partial row invisible
+        length_path = f"{path_prefix}.len"
+        if not os.path.exists(length_path):
+            np.zeros(1, dtype=np.int64).tofile(length_path)
+        self._length = np.memmap(length_path, dtype=np.int64, mode='r+', shape=(1,))
+
+        capacity = max(initial_capacity, int(self._length[0]))
+        for name in COLUMNS:
+            path = self._column_path(name)
+            if os.path.exists(path):
+                capacity = max(capacity, os.path.getsize(path) // 8)
+        self.capacity = 0
+        self._columns: Dict[str, np.memmap] = {}
+        self._map(capacity)
+
+    def _column_path(self, name: str) -> str:
+        return f"{self.path_prefix}.{name}.f64"
+
+    def _map(self, capacity: int):
+        for name in COLUMNS:
+            path = self._column_path(name)
+            with open(path, 'ab') as f:
+                if f.tell() < capacity * 8:
+                    f.truncate(capacity * 8)
+            self._columns[name] = np.memmap(path, dtype=np.float64, mode='r+', shape=(capacity,))
+        self.capacity = capacity
+
+    def __len__(self) -> int:
+        return int(self._length[0])
+
+    def append(self, timestamp: float, price: float, volume: float = 0.0) -> bool:
+        """Store one row; a tick older than the last stored row is dropped and False returned"""
+        n = len(self)
+        if n and timestamp < self._columns['timestamp'][n - 1]:
+            # Late ticks (clock steps, slow responses) would break the sorted order searches rely on
+            self.dropped += 1
+            return False
+        if n >= self.capacity:
+            self.flush()
+            self._map(self.capacity * 2)
+
+        self._columns['timestamp'][n] = timestamp
+        self._columns['price'][n] = price
+        self._columns['volume'][n] = volume
+        self._length[0] = n + 1
+
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every:
+            self.flush()
+        return True
+
+    def extend(self, timestamps: np.ndarray, prices: np.ndarray, volumes: Optional[np.ndarray] = None) -> int:
+        """Store many rows, dropping any older than a row before them; returns how many were stored"""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if not len(timestamps):
+            return 0
+        n = len(self)
+        floor = self._columns['timestamp'][n - 1] if n else -np.inf
+        keep = timestamps >= np.maximum.accumulate(np.maximum(timestamps, floor))
+        if not keep.all():
+            self.dropped += int(len(keep) - keep.sum())
+            timestamps = timestamps[keep]
+            prices = np.asarray(prices, dtype=np.float64)[keep]
+            volumes = None if volumes is None else np.asarray(volumes, dtype=np.float64)[keep]
+            if not len(timestamps):
+                return 0
+        end = n + len(timestamps)
+        if end > self.capacity:
+            self.flush()
+            self._map(max(end, self.capacity * 2))
+
+        self._columns['timestamp'][n:end] = timestamps
+        self._columns['price'][n:end] = prices
+        self._columns['volume'][n:end] = 0.0 if volumes is None else volumes
+        self._length[0] = end
+        self.flush()
+        return len(timestamps)
+
+    # Views below are slices of the memory map: no data is read until it is touched
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._columns['timestamp'][:len(self)]
+
+    @property
+    def prices(self) -> np.ndarray:
+        return self._columns['price'][:len(self)]
+
+    @property
+    def volumes(self) -> np.ndarray:
+        return self._columns['volume'][:len(self)]
+
+    def tail(self, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The last n rows as (timestamps, prices, volumes) views"""
+        end = len(self)
+        start = max(0, end - n)
+        return tuple(self._columns[name][start:end] for name in COLUMNS)
+
+    def between(self, start: float, end: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Rows with start <= timestamp < end, located by binary search on the timestamp column"""
+        timestamps = self.timestamps
+        lo = int(np.searchsorted(timestamps, start, side='left'))
+        hi = int(np.searchsorted(timestamps, end, side='left'))
+        return tuple(self._columns[name][lo:hi] for name in COLUMNS)
+
+    def price_at(self, timestamp: float) -> Optional[float]:
+        """Last stored price at or before timestamp"""
+        index = int(np.searchsorted(self.timestamps, timestamp, side='right')) - 1
+        return float(self._columns['price'][index]) if index >= 0 else None
+
+    def flush(self):
+        for column in self._columns.values():
+            column.flush()
+        self._length.flush()
+        self._unsynced = 0
+
+    def close(self):
+        self.flush()
+        self._columns.clear()
+        self._length = None
+
+
+class PriceStore:
+    """Directory of PriceSeries, one per token or feed"""
+
+    def __init__(self, directory: str = 'price_history', initial_capacity: int = 65536, sync_every: int = 1):
+        self.directory = directory
+        self.initial_capacity = initial_capacity
+        self.sync_every = sync_every
+        os.makedirs(directory, exist_ok=True)
+        self._series: Dict[str, PriceSeries] = {}
+
+    def series(self, name: str) -> PriceSeries:
+        key = name.lower()
+        if key not in self._series:
+            filename = re.sub(r'[^a-z0-9_.-]', '_', key)
+            self._series[key] = PriceSeries(
+                os.path.join(self.directory, filename),
+                initial_capacity=self.initial_capacity,
+                sync_every=self.sync_every
+            )
+        return self._series[key]
+
+    def close(self):
+        for series in self._series.values():
+            series.close()
+        self._series.clear()
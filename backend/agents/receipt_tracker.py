@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+
+from agents.price_oracle import BlockNumberCache
+from agents.rpc_batch import BatchRPC
+
+
+class TransactionTimeout(Exception):
+    """No receipt arrived before the deadline"""
+
+
+class TransactionReplaced(Exception):
+    """The sender's nonce was consumed by a different transaction"""
+
+    def __init__(self, tx_hash: str, sender: str, nonce: int):
+        self.tx_hash = tx_hash
+        self.sender = sender
+        self.nonce = nonce
+        super().__init__(f"Transaction {tx_hash} (nonce {nonce} of {sender}) was replaced or dropped")
+
+
+@dataclass
+class PendingTransaction:
+    tx_hash: str
+    future: asyncio.Future
+    deadline: float
+    sender: Optional[str] = None
+    nonce: Optional[int] = None
+    # Consecutive polls where the nonce was mined but this hash had no receipt
+    superseded_polls: int = 0
+
+
+class ReceiptTracker:
+    """One polling loop for every pending transaction: a single batched receipt lookup per new block"""
+
+    def __init__(self, rpc: BatchRPC, poll_interval: float = 1.0, timeout: float = 180.0):
+        self.rpc = rpc
+        self.timeout = timeout
+        self.blocks = BlockNumberCache(self._get_block_number, poll_interval)
+        self.poll_interval = poll_interval
+        self.pending: Dict[str, PendingTransaction] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._last_block: Optional[int] = None
+
+        self.blocks_polled = 0
+        self.receipts = 0
+        self.timeouts = 0
+        self.replaced = 0
+
+    async def _get_block_number(self) -> int:
+        return int(await self.rpc.request('eth_blockNumber'), 16)
+
+    def track(
+        self,
+        tx_hash,
+        sender: Optional[str] = None,
+        nonce: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> asyncio.Future:
+        """Future resolving to the receipt; pass sender and nonce to detect replacement"""
+        tx_hash = HexBytes(tx_hash).to_0x_hex()
+        existing = self.pending.get(tx_hash)
+        if existing is not None:
+            return existing.future
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending[tx_hash] = PendingTransaction(
+            tx_hash=tx_hash,
+            future=future,
+            deadline=time.monotonic() + (timeout or self.timeout),
+            sender=to_checksum_address(sender) if sender else None,
+            nonce=nonce
+        )
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return future
+
+    async def wait(self, tx_hash, sender: Optional[str] = None, nonce: Optional[int] = None,
+                   timeout: Optional[float] = None) -> Dict:
+        return await asyncio.shield(self.track(tx_hash, sender, nonce, timeout))
+
+    async def _run(self):
+        while self.pending:
+            try:
+                block = await self.blocks.current()
+                if block != self._last_block:
+                    self._last_block = block
+                    await self._poll()
+            except Exception as e:
+                logging.error(f"Receipt polling failed: {e}")
+            self._expire()
+            if self.pending:
+                await asyncio.sleep(self.poll_interval)
+
+    async def _poll(self):
+        self.blocks_polled += 1
+        transactions = list(self.pending.values())
+        senders = sorted({tx.sender for tx in transactions if tx.sender and tx.nonce is not None})
+
+        # Receipts for every pending hash plus the mined nonce of every sender, in one batch
+        results = await self.rpc.request_many(
+            [('eth_getTransactionReceipt', [tx.tx_hash]) for tx in transactions]
+            + [('eth_getTransactionCount', [sender, 'latest']) for sender in senders]
+        )
+        receipts = results[:len(transactions)]
+        mined_nonces = {
+            sender: int(count, 16)
+            for sender, count in zip(senders, results[len(transactions):])
+            if not isinstance(count, Exception)
+        }
+
+        for tx, receipt in zip(transactions, receipts):
+            if isinstance(receipt, Exception):
+                continue
+            if receipt:
+                self.receipts += 1
+                self._resolve(tx, result=receipt)
+            elif tx.sender in mined_nonces and mined_nonces[tx.sender] > tx.nonce:
+                # Its nonce is mined but it has no receipt, so another transaction took the slot.
+                # Confirmed on a second block in case the node indexed the receipt late.
+                tx.superseded_polls += 1
+                if tx.superseded_polls >= 2:
+                    self.replaced += 1
+                    self._resolve(tx, error=TransactionReplaced(tx.tx_hash, tx.sender, tx.nonce))
+
+    def _expire(self):
+        now = time.monotonic()
+        for tx in list(self.pending.values()):
+            if now >= tx.deadline:
+                self.timeouts += 1
+                self._resolve(tx, error=TransactionTimeout(f"No receipt for {tx.tx_hash}"))
+
+    def _resolve(self, tx: PendingTransaction, result: Optional[Dict] = None, error: Optional[Exception] = None):
+        self.pending.pop(tx.tx_hash, None)
+        if tx.future.done():
+            return
+        if error is not None:
+            tx.future.set_exception(error)
+        else:
+            tx.future.set_result(result)
+
+    def stats(self) -> Dict:
+        return {
+            'pending': len(self.pending),
+            'blocks_polled': self.blocks_polled,
+            'receipts': self.receipts,
+            'timeouts': self.timeouts,
+            'replaced': self.replaced
+        }
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for tx in list(self.pending.values()):
+            self.pending.pop(tx.tx_hash, None)
+            tx.future.cancel()
@@ -0,0 +1,258 @@
+import asyncio
+import itertools
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import aiohttp
+from eth_abi import decode as abi_decode, encode as abi_encode
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+from eth_utils.abi import get_abi_output_types
+from hexbytes import HexBytes
+
+from agents.http_client import HTTPClient, get_http_client
+
+# Multicall3 is deployed at the same address on Sonic and most EVM chains
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+AGGREGATE3_SELECTOR = function_signature_to_4byte_selector("aggregate3((address,bool,bytes)[])")
+GET_AMOUNTS_OUT_SELECTOR = function_signature_to_4byte_selector("getAmountsOut(uint256,address[])")
+
+
+class RPCError(Exception):
+    """JSON-RPC error returned by the node"""
+
+    def __init__(self, error: Dict):
+        self.code = error.get('code')
+        self.data = error.get('data')
+        super().__init__(error.get('message', str(error)))
+
+
+@dataclass
+class ContractCall:
+    target: str
+    data: bytes
+    decode: Optional[Callable[[bytes], Any]] = None
+    allow_failure: bool = True
+
+
+class BatchRPC:
+    """Packs many JSON-RPC requests into one HTTP round trip"""
+
+    def __init__(
+        self,
+        rpc_url: str,
+        max_batch_size: int = 500,
+        timeout: float = 10.0,
+        session: Optional[aiohttp.ClientSession] = None,
+        http: Optional[HTTPClient] = None,
+        private_pool: bool = False
+    ):
+        self.rpc_url = rpc_url
+        self.max_batch_size = max_batch_size
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = session
+        # Without an explicit session, requests go through the shared keep-alive pool,
+        # or through a pool of this BatchRPC's own, closed with it, when private_pool is set
+        self._owns_http = http is None and private_pool
+        self._http = HTTPClient(timeout=timeout) if self._owns_http else http
+        self._ids = itertools.count(1)
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is not None and not self._session.closed:
+            return self._session
+        return await (self._http or get_http_client()).session()
+
+    async def close(self):
+        # Sessions passed in and the shared pool are owned elsewhere
+        if self._owns_http:
+            await self._http.close()
+
+    async def request(self, method: str, params: Optional[list] = None) -> Any:
+        """Send a single JSON-RPC request"""
+        result = (await self.request_many([(method, params or [])]))[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def request_many(self, requests: Sequence[Tuple[str, list]]) -> List[Any]:
+        """Send many JSON-RPC requests as batches; per-request errors come back as RPCError values"""
+        chunks = [
+            requests[i:i + self.max_batch_size]
+            for i in range(0, len(requests), self.max_batch_size)
+        ]
+        results = await asyncio.gather(*(self._send_batch(chunk) for chunk in chunks))
+        return [item for chunk in results for item in chunk]
+
+    async def _send_batch(self, requests: Sequence[Tuple[str, list]]) -> List[Any]:
+        if not requests:
+            return []
+
+        payload = []
+        for method, params in requests:
+            payload.append({
+                'jsonrpc': '2.0',
+                'id': next(self._ids),
+                'method': method,
+                'params': params
+            })
+
+        session = await self._get_session()
+        async with session.post(self.rpc_url, json=payload, timeout=self.timeout) as response:
+            response.raise_for_status()
+            body = await response.json(content_type=None)
+
+        if isinstance(body, dict):
+            # Some nodes answer a rejected batch with a single error object
+            raise RPCError(body.get('error', {'message': f'Unexpected batch response: {body}'}))
+
+        by_id = {item.get('id'): item for item in body}
+        results = []
+        for request in payload:
+            item = by_id.get(request['id'])
+            if item is None:
+                results.append(RPCError({'message': f"No response for {request['method']}"}))
+            elif 'error' in item:
+                results.append(RPCError(item['error']))
+            else:
+                results.append(item.get('result'))
+        return results
+
+    async def eth_call_many(self, calls: Sequence[ContractCall], block: Any = 'latest') -> List[Any]:
+        """Run many eth_calls as one JSON-RPC batch"""
+        block_tag = hex(block) if isinstance(block, int) else block
+        raw = await self.request_many([
+            ('eth_call', [{'to': call.target, 'data': HexBytes(call.data).to_0x_hex()}, block_tag])
+            for call in calls
+        ])
+        return [_decode_result(call, result) for call, result in zip(calls, raw)]
+
+
+class Multicall:
+    """Aggregates read-only contract calls into a single Multicall3 eth_call"""
+
+    def __init__(self, rpc: BatchRPC, address: str = MULTICALL3_ADDRESS, max_calls: int = 500):
+        self.rpc = rpc
+        self.address = to_checksum_address(address)
+        self.max_calls = max_calls
+
+    async def aggregate(self, calls: Sequence[ContractCall], block: Any = 'latest') -> List[Any]:
+        """Run all calls; failed calls that allow failure come back as exceptions"""
+        chunks = [calls[i:i + self.max_calls] for i in range(0, len(calls), self.max_calls)]
+        payloads = [ContractCall(self.address, _encode_aggregate3(chunk)) for chunk in chunks]
+        # Large call sets still go out in one HTTP request as a batch of aggregate calls
+        raw_results = await self.rpc.eth_call_many(payloads, block)
+
+        results = []
+        for chunk, raw in zip(chunks, raw_results):
+            if isinstance(raw, Exception):
+                results.extend(raw for _ in chunk)
+                continue
+            (decoded,) = abi_decode(['(bool,bytes)[]'], HexBytes(raw))
+            for call, (success, return_data) in zip(chunk, decoded):
+                if not success:
+                    error = RPCError({'message': f'Call to {call.target} reverted'})
+                    if not call.allow_failure:
+                        raise error
+                    results.append(error)
+                else:
+                    results.append(_decode_result(call, return_data))
+        return results
+
+
+class CallBatcher:
+    """Collects calls issued concurrently and flushes them as one multicall"""
+
+    def __init__(self, multicall: Multicall, max_delay: float = 0.005, max_batch_size: int = 500):
+        self.multicall = multicall
+        self.max_delay = max_delay
+        self.max_batch_size = max_batch_size
+        self._pending: List[Tuple[ContractCall, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Flushes in flight; holding the tasks keeps them from being garbage collected mid-call
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def call(self, call: ContractCall) -> Any:
+        """Queue a call and wait for the batch it lands in"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((call, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush_now()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_delay, self._flush_now)
+
+        result = await future
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _flush_now(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if pending:
+            task = asyncio.ensure_future(self._flush(pending))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, pending: List[Tuple[ContractCall, asyncio.Future]]):
+        try:
+            try:
+                results = await self.multicall.aggregate([call for call, _ in pending])
+            except Exception as e:
+                logging.error(f"Batched call of {len(pending)} requests failed: {e}")
+                results = [e] * len(pending)
+
+            for (_, future), result in zip(pending, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            # Cancelled or killed by a BaseException: no caller may be left waiting forever
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(RPCError({'message': 'Batched call was interrupted'}))
+
+
+def contract_call(contract, fn_name: str, *args, allow_failure: bool = True) -> ContractCall:
+    """Build a batched call for a web3 contract function, decoding like .call() does"""
+    fn = contract.get_function_by_name(fn_name)
+    output_types = get_abi_output_types(fn.abi)
+    data = contract.encode_abi(fn_name, args=list(args))
+
+    def decode(return_data: bytes):
+        values = abi_decode(output_types, return_data)
+        return values[0] if len(values) == 1 else list(values)
+
+    return ContractCall(contract.address, HexBytes(data), decode, allow_failure)
+
+
+def get_amounts_out_call(router_address: str, amount_in: int, path: Sequence[str]) -> ContractCall:
+    """Build a batched UniswapV2-style getAmountsOut quote"""
+    data = GET_AMOUNTS_OUT_SELECTOR + abi_encode(
+        ['uint256', 'address[]'],
+        [amount_in, [to_checksum_address(token) for token in path]]
+    )
+    return ContractCall(
+        to_checksum_address(router_address),
+        data,
+        lambda return_data: list(abi_decode(['uint256[]'], return_data)[0])
+    )
+
+
+def _encode_aggregate3(calls: Sequence[ContractCall]) -> bytes:
+    return AGGREGATE3_SELECTOR + abi_encode(
+        ['(address,bool,bytes)[]'],
+        [[(call.target, call.allow_failure, bytes(call.data)) for call in calls]]
+    )
+
+
+def _decode_result(call: ContractCall, result: Any) -> Any:
+    if isinstance(result, Exception) or call.decode is None:
+        return result
+    try:
+        return call.decode(HexBytes(result))
+    except Exception as e:
+        return e
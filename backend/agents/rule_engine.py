@@ -0,0 +1,284 @@
+import math
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+BURST = 'burst'
+CONTRACT_BURST = 'contract_burst'
+VALUE_OUTLIER = 'value_outlier'
+IN_AND_OUT = 'in_and_out'
+NEW_ADDRESS = 'new_address'
+
+# Event names treated as funds entering or leaving the contract when none are configured
+INFLOW_HINTS = ('deposit', 'mint', 'stake', 'supply', 'buy', 'lock')
+OUTFLOW_HINTS = ('withdraw', 'redeem', 'burn', 'unstake', 'sell', 'unlock', 'claim')
+
+
+@dataclass
+class RuleHit:
+    rule: str
+    address: Optional[str]
+    block: int
+    detail: str
+
+
+class SlidingCounter:
+    """Sliding-window count from two fixed buckets: O(1) per update, three numbers of state"""
+
+    __slots__ = ('window', 'start', 'current', 'previous')
+
+    def __init__(self, window: int, block: int):
+        self.window = window
+        self.start = block
+        self.current = 0.0
+        self.previous = 0.0
+
+    def add(self, block: int, amount: float = 1.0) -> float:
+        """Add at block and return the estimated total over the last `window` blocks"""
+        elapsed = block - self.start
+        if elapsed >= self.window:
+            # Roll forward; a gap of two windows or more leaves nothing behind
+            self.previous = self.current if elapsed < 2 * self.window else 0.0
+            self.current = 0.0
+            self.start = block - (elapsed % self.window)
+        self.current += amount
+        weight = 1.0 - (block - self.start) / self.window
+        return self.current + self.previous * weight
+
+
+class AddressState:
+    __slots__ = ('calls', 'last_block', 'inflow_block', 'inflow_value', 'burst_until', 'fresh')
+
+    def __init__(self, window: int, block: int):
+        self.calls = SlidingCounter(window, block)
+        self.last_block = block
+        self.inflow_block = -1
+        self.inflow_value = 0.0
+        self.burst_until = -1
+        self.fresh = False
+
+
+class ContractState:
+    __slots__ = ('calls', 'rate', 'burst_until', 'mean', 'var', 'values')
+
+    def __init__(self, window: int, block: int):
+        self.calls = SlidingCounter(window, block)
+        self.rate: Optional[float] = None  # Baseline events per window, as an EWMA
+        self.burst_until = -1
+        self.mean = 0.0  # EWMA of log value
+        self.var = 0.0
+        self.values = 0
+
+
+class RuleEngine:
+    """Streaming suspicious-activity rules over contract events, with bounded per-address state"""
+
+    def __init__(
+        self,
+        window_blocks: int = 20,
+        burst_threshold: int = 10,
+        contract_burst_factor: float = 5.0,
+        contract_burst_min: int = 50,
+        value_z_threshold: float = 4.0,
+        value_warmup: int = 50,
+        value_alpha: float = 0.02,
+        in_out_blocks: int = 5,
+        in_out_ratio: float = 0.9,
+        fresh_blocks: int = 100,
+        idle_blocks: int = 5000,
+        max_addresses: int = 100000,
+        inflow_events: Optional[Sequence[str]] = None,
+        outflow_events: Optional[Sequence[str]] = None,
+        address_field: str = 'user',
+        value_field: str = 'value',
+        latency_history: int = 1000
+    ):
+        self.window_blocks = window_blocks
+        self.burst_threshold = burst_threshold
+        self.contract_burst_factor = contract_burst_factor
+        self.contract_burst_min = contract_burst_min
+        self.value_z_threshold = value_z_threshold
+        self.value_warmup = value_warmup
+        self.value_alpha = value_alpha
+        self.in_out_blocks = in_out_blocks
+        self.in_out_ratio = in_out_ratio
+        self.fresh_blocks = fresh_blocks
+        self.idle_blocks = idle_blocks
+        self.max_addresses = max_addresses
+        self.inflow_events = set(inflow_events) if inflow_events is not None else None
+        self.outflow_events = set(outflow_events) if outflow_events is not None else None
+        self.address_field = address_field
+        self.value_field = value_field
+
+        # Least recently active first, so idle addresses are evicted from the front
+        self.addresses: 'OrderedDict[str, AddressState]' = OrderedDict()
+        self.contracts: Dict[str, ContractState] = {}
+        self._directions: Dict[str, int] = {}
+
+        self.events = 0
+        self.evicted = 0
+        self.hits = {rule: 0 for rule in (BURST, CONTRACT_BURST, VALUE_OUTLIER, IN_AND_OUT, NEW_ADDRESS)}
+        self.latencies = deque(maxlen=latency_history)
+        self.max_latency = 0.0
+
+    def _direction(self, event_name: str) -> int:
+        """+1 for inflow events, -1 for outflow, 0 otherwise"""
+        direction = self._directions.get(event_name)
+        if direction is None:
+            name = event_name.lower()
+            if self.inflow_events is not None or self.outflow_events is not None:
+                direction = (
+                    1 if event_name in (self.inflow_events or ()) else
+                    -1 if event_name in (self.outflow_events or ()) else 0
+                )
+            elif any(hint in name for hint in OUTFLOW_HINTS):
+                direction = -1
+            elif any(hint in name for hint in INFLOW_HINTS):
+                direction = 1
+            else:
+                direction = 0
+            self._directions[event_name] = direction
+        return direction
+
+    def is_known(self, address: str) -> bool:
+        return address in self.addresses
+
+    def mark_fresh(self, address: str, block: int):
+        """Record that address had no nonce, code or balance shortly before block"""
+        state = self._state(address, block)
+        state.fresh = True
+
+    def _state(self, address: str, block: int) -> AddressState:
+        state = self.addresses.get(address)
+        if state is None:
+            state = AddressState(self.window_blocks, block)
+            self.addresses[address] = state
+        else:
+            self.addresses.move_to_end(address)
+        return state
+
+    def observe(self, event, received_at: Optional[float] = None) -> List[RuleHit]:
+        """Feed one decoded event; received_at (perf_counter) of its log gives the flag latency"""
+        args = event['args']
+        value = args.get(self.value_field)
+        return self.observe_row(
+            event['address'],
+            args.get(self.address_field),
+            float(value) if value is not None else None,
+            event['event'],
+            event['blockNumber'],
+            received_at
+        )
+
+    def observe_row(
+        self,
+        contract: str,
+        address: Optional[str],
+        value: Optional[float],
+        event_name: str,
+        block: int,
+        received_at: Optional[float] = None
+    ) -> List[RuleHit]:
+        self.events += 1
+        hits = []
+
+        contract_state = self.contracts.get(contract)
+        if contract_state is None:
+            contract_state = self.contracts[contract] = ContractState(self.window_blocks, block)
+        self._check_contract(contract_state, contract, value, block, hits)
+
+        if address is not None:
+            state = self._state(address, block)
+            state.last_block = block
+
+            calls = state.calls.add(block)
+            if calls > self.burst_threshold and block > state.burst_until:
+                state.burst_until = block + self.window_blocks
+                hits.append(RuleHit(BURST, address, block, f'{calls:.0f} calls within {self.window_blocks} blocks'))
+
+            if state.fresh:
+                state.fresh = False
+                hits.append(RuleHit(NEW_ADDRESS, address, block, f'address unused {self.fresh_blocks} blocks earlier'))
+
+            direction = self._direction(event_name)
+            if direction > 0 and value is not None:
+                state.inflow_block = block
+                state.inflow_value = value
+            elif direction < 0 and value is not None and state.inflow_block >= 0:
+                if block - state.inflow_block <= self.in_out_blocks and value >= self.in_out_ratio * state.inflow_value:
+                    hits.append(RuleHit(
+                        IN_AND_OUT, address, block,
+                        f'{event_name} of {value:g} {block - state.inflow_block} blocks after an inflow of {state.inflow_value:g}'
+                    ))
+                    state.inflow_block = -1
+
+        self._evict(block)
+
+        if hits:
+            for hit in hits:
+                self.hits[hit.rule] += 1
+            if received_at is not None:
+                latency = time.perf_counter() - received_at
+                self.latencies.append(latency)
+                self.max_latency = max(self.max_latency, latency)
+        return hits
+
+    def _check_contract(self, state: ContractState, contract: str, value: Optional[float], block: int, hits: List[RuleHit]):
+        # Contract-wide rate against its own baseline, updated once per completed window
+        window_start, completed = state.calls.start, state.calls.current
+        calls = state.calls.add(block)
+        if state.calls.start != window_start:
+            state.rate = completed if state.rate is None else 0.8 * state.rate + 0.2 * completed
+        if (
+            state.rate is not None
+            and calls >= self.contract_burst_min
+            and calls > self.contract_burst_factor * max(state.rate, 1.0)
+            and block > state.burst_until
+        ):
+            state.burst_until = block + self.window_blocks
+            hits.append(RuleHit(
+                CONTRACT_BURST, None, block,
+                f'{calls:.0f} events within {self.window_blocks} blocks on {contract}, baseline {state.rate:.1f}'
+            ))
+
+        if value is None or value <= 0:
+            return
+        # Outliers are judged on log value against an exponentially weighted mean and variance
+        x = math.log(value)
+        if state.values >= self.value_warmup and state.var > 0:
+            z = (x - state.mean) / math.sqrt(state.var)
+            if z > self.value_z_threshold:
+                hits.append(RuleHit(VALUE_OUTLIER, None, block, f'value {value:g} is {z:.1f} sigma above normal'))
+        state.values += 1
+        if state.values == 1:
+            state.mean = x
+        else:
+            delta = x - state.mean
+            alpha = max(self.value_alpha, 1.0 / state.values)
+            state.mean += alpha * delta
+            state.var = (1 - alpha) * (state.var + alpha * delta * delta)
+
+    def _evict(self, block: int):
+        addresses = self.addresses
+        while addresses:
+            address, state = next(iter(addresses.items()))
+            if len(addresses) <= self.max_addresses and block - state.last_block <= self.idle_blocks:
+                break
+            del addresses[address]
+            self.evicted += 1
+
+    def stats(self) -> Dict:
+        # No percentiles until something was measured; 0 ms would read as a real, fast sample
+        latencies = np.array(self.latencies) * 1000
+        return {
+            'events': self.events,
+            'tracked_addresses': len(self.addresses),
+            'evicted_addresses': self.evicted,
+            'hits': dict(self.hits),
+            'p50_flag_latency_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'p99_flag_latency_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+            'max_flag_latency_ms': self.max_latency * 1000
+        }
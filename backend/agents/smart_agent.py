@@ -7,6 +7,9 @@ import openai
 from web3 import Web3
 from zerepy import Zerepy, Chain
 from zerepy.utils import parse_token_amount
+from agents.llm_gate import Debouncer, LLMGate, round_significant
+from agents.market_data import MarketDataAggregator
+from agents.rpc_batch import BatchRPC
 
 class SmartAgent:
     def __init__(self, config_path: str):
@@ -15,7 +18,27 @@ class SmartAgent:
             self.config = yaml.safe_load(f)
 
         # Initialize OpenAI
-        openai.api_key = self.config['api']['openai']['api_key']
+        openai_config = self.config['api']['openai']
+        openai.api_key = openai_config['api_key']
+        if openai_config.get('api_base'):
+            # Any OpenAI-compatible server, e.g. a local stub for measuring the analysis path
+            openai.api_base = openai_config['api_base']
+
+        # One analysis per market state: cached by fingerprint, limited by concurrency and tokens per minute
+        self.llm = LLMGate(
+            self._complete,
+            cache_ttl=openai_config.get('cache_ttl', 300),
+            max_concurrency=openai_config.get('max_concurrency', 2),
+            tokens_per_minute=openai_config.get('tokens_per_minute', 40000),
+            prompt_price=openai_config.get('prompt_price_per_1k', 0.0),
+            completion_price=openai_config.get('completion_price_per_1k', 0.0)
+        )
+        # Swap bursts collapse into one analysis once the pool goes quiet
+        self.swap_debouncer = Debouncer(
+            self._analyze_swaps,
+            delay=openai_config.get('debounce_seconds', 2.0),
+            max_wait=openai_config.get('max_wait_seconds', 10.0)
+        )
 
         # Initialize Zerepy
         self.zerepy = Zerepy(
@@ -25,6 +48,8 @@ class SmartAgent:
 
         # Initialize Web3
         self.w3 = Web3(Web3.HTTPProvider(self.config['sonic']['rpc_url']))
+        # Pool and trade data fetched concurrently; pool state is reused within a block
+        self.market_data = MarketDataAggregator(self.zerepy, rpc=BatchRPC(self.config['sonic']['rpc_url']))
         self.trading_enabled = True
         self.last_analysis = None
 
@@ -46,26 +71,46 @@ class SmartAgent:
             5. Key reasons for recommendation
             """
 
-            response = await openai.ChatCompletion.acreate(
-                model=self.config['api']['openai']['model'],
-                messages=[{
-                    "role": "system",
-                    "content": "You are an AI trading expert analyzing Sonic blockchain market data."
-                }, {
-                    "role": "user",
-                    "content": prompt
-                }],
-                temperature=self.config['api']['openai']['temperature'],
-                max_tokens=self.config['api']['openai']['max_tokens']
+            messages = [{
+                "role": "system",
+                "content": "You are an AI trading expert analyzing Sonic blockchain market data."
+            }, {
+                "role": "user",
+                "content": prompt
+            }]
+            return await self.llm.run(
+                self._fingerprint(market_data),
+                messages,
+                self.config['api']['openai']['max_tokens']
             )
 
-            analysis = response.choices[0].message.content
-            return self._parse_gpt_analysis(analysis)
-
         except Exception as e:
             logging.error(f"GPT analysis failed: {e}")
             return None
 
+    def _fingerprint(self, market_data: Dict) -> str:
+        """Market state rounded coarsely enough that small moves reuse the previous analysis"""
+        return '|'.join(str(part) for part in (
+            round_significant(market_data['price'], 3),
+            round_significant(market_data['volume_24h'], 2),
+            round(market_data['price_change_24h'] * 2) / 2,
+            market_data['trades_count'] // 10
+        ))
+
+    async def _complete(self, messages: List[Dict], max_tokens: int):
+        response = await openai.ChatCompletion.acreate(
+            model=self.config['api']['openai']['model'],
+            messages=messages,
+            temperature=self.config['api']['openai']['temperature'],
+            max_tokens=max_tokens
+        )
+        analysis = response.choices[0].message.content
+        usage = response.get('usage') or {}
+        return self._parse_gpt_analysis(analysis), {
+            'prompt_tokens': usage.get('prompt_tokens', 0),
+            'completion_tokens': usage.get('completion_tokens', 0)
+        }
+
     def _parse_gpt_analysis(self, analysis: str) -> Dict:
         """Parse GPT's text response into structured data"""
         try:
@@ -133,16 +178,7 @@ class SmartAgent:
 
             async def handle_swap(event):
                 logging.info(f"Swap detected: {event}")
-                
-                # Get updated market data
-                market_data = await self.get_market_data()
-                
-                # Analyze with GPT
-                analysis = await self.analyze_market_with_gpt(market_data)
-                
-                # Execute strategy if conditions met
-                if analysis and self.trading_enabled:
-                    await self.execute_strategy(analysis)
+                self.swap_debouncer.trigger(event)
 
             await self.zerepy.subscribe_to_pool_events(
                 token_address,
@@ -152,19 +188,33 @@ class SmartAgent:
         except Exception as e:
             logging.error(f"Pool monitoring failed: {e}")
 
+    async def _analyze_swaps(self, event):
+        """One analysis for a burst of swaps, run after the last one"""
+        # Get updated market data
+        market_data = await self.get_market_data()
+        if not market_data:
+            return
+        
+        # Analyze with GPT
+        analysis = await self.analyze_market_with_gpt(market_data)
+        
+        # Execute strategy if conditions met
+        if analysis and self.trading_enabled:
+            await self.execute_strategy(analysis)
+
+    def llm_stats(self) -> Dict:
+        """Analysis latency, token spend, cache hit rate and how many swaps each analysis absorbed"""
+        return {**self.llm.stats(), 'swaps': self.swap_debouncer.stats()}
+
     async def get_market_data(self) -> Dict:
         """Get current market data"""
         try:
             token_address = self.config['zerepy']['token_address']
             
-            # Get token info
-            token_info = await self.zerepy.get_token_info(token_address)
-            
-            # Get pool info
-            pool_info = await self.zerepy.get_pool_info(token_address)
-            
-            # Get recent trades
-            trades = await self.zerepy.get_recent_trades(token_address, limit=100)
+            # Pool info and recent trades in parallel; token info is not needed here
+            snapshot = await self.market_data.snapshot(token_address, include_token_info=False)
+            pool_info = snapshot['pool']
+            trades = snapshot['trades']
             
             return {
                 'price': pool_info.price,
@@ -0,0 +1,204 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Columns stored natively; anything else in a trade record is kept in the `extra` JSON blob
+FIELDS = ('timestamp', 'type', 'token', 'amount', 'price', 'hash', 'gas_used')
+
+
+class TradeJournal:
+    """Append-only trade log in SQLite (WAL, fsync per trade) with time/token/type indexes"""
+
+    def __init__(self, path: str = 'trades.db', default_token: str = 'sonic-token'):
+        self.path = path
+        self.default_token = default_token
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        # FULL makes every commit fsync the WAL, so a recorded trade survives a crash
+        self._db.execute('PRAGMA synchronous=FULL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS trades ('
+            'id INTEGER PRIMARY KEY, '
+            'timestamp REAL NOT NULL, '
+            'type TEXT NOT NULL, '
+            'token TEXT NOT NULL, '
+            'amount REAL NOT NULL, '
+            'price REAL NOT NULL, '
+            'hash TEXT UNIQUE, '
+            'gas_used INTEGER, '
+            'extra TEXT)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS trades_timestamp ON trades (timestamp)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS trades_token ON trades (token, timestamp)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS trades_type ON trades (type, timestamp)')
+        self._db.commit()
+
+    def record(self, trade_info: Dict) -> Optional[int]:
+        """Append one trade; returns its row id, or None if its hash is already journalled"""
+        row = self._row(trade_info)
+        with self._lock:
+            cursor = self._db.execute(
+                'INSERT OR IGNORE INTO trades '
+                '(timestamp, type, token, amount, price, hash, gas_used, extra) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                row
+            )
+            self._db.commit()
+            return cursor.lastrowid if cursor.rowcount else None
+
+    def _row(self, trade_info: Dict) -> tuple:
+        timestamp = trade_info.get('timestamp')
+        if timestamp is None:
+            timestamp = time.time()
+        elif isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp).timestamp()
+        extra = {key: value for key, value in trade_info.items() if key not in FIELDS}
+        return (
+            float(timestamp),
+            trade_info['type'],
+            trade_info.get('token') or self.default_token,
+            float(trade_info['amount']),
+            float(trade_info['price']),
+            trade_info.get('hash'),
+            trade_info.get('gas_used'),
+            json.dumps(extra) if extra else None
+        )
+
+    def _where(
+        self,
+        start: Optional[float],
+        end: Optional[float],
+        token: Optional[str],
+        trade_type: Optional[str]
+    ) -> tuple:
+        clauses, params = [], []
+        if start is not None:
+            clauses.append('timestamp >= ?')
+            params.append(start)
+        if end is not None:
+            clauses.append('timestamp < ?')
+            params.append(end)
+        if token is not None:
+            clauses.append('token = ?')
+            params.append(token)
+        if trade_type is not None:
+            clauses.append('type = ?')
+            params.append(trade_type)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        token: Optional[str] = None,
+        trade_type: Optional[str] = None,
+        limit: Optional[int] = None,
+        newest_first: bool = False
+    ) -> List[Dict]:
+        """Trades matching the filters, served from the indexes"""
+        where, params = self._where(start, end, token, trade_type)
+        sql = (
+            'SELECT timestamp, type, token, amount, price, hash, gas_used, extra FROM trades'
+            + where + ' ORDER BY timestamp ' + ('DESC' if newest_first else 'ASC')
+        )
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        trades = []
+        for timestamp, trade_type_, token_, amount, price, tx_hash, gas_used, extra in rows:
+            trade = {
+                'timestamp': datetime.fromtimestamp(timestamp).isoformat(),
+                'type': trade_type_,
+                'token': token_,
+                'amount': amount,
+                'price': price,
+                'hash': tx_hash,
+                'gas_used': gas_used
+            }
+            if extra:
+                trade.update(json.loads(extra))
+            trades.append(trade)
+        return trades
+
+    def summary(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        token: Optional[str] = None,
+        mark_price: Optional[float] = None
+    ) -> Dict:
+        """Counts, volumes and average-cost PnL, aggregated inside SQLite"""
+        where, params = self._where(start, end, token, None)
+        with self._lock:
+            row = self._db.execute(
+                'SELECT '
+                'COUNT(*), '
+                "COALESCE(SUM(CASE WHEN type = 'buy' THEN 1 ELSE 0 END), 0), "
+                "COALESCE(SUM(CASE WHEN type = 'buy' THEN amount ELSE 0 END), 0), "
+                "COALESCE(SUM(CASE WHEN type = 'buy' THEN amount * price ELSE 0 END), 0), "
+                "COALESCE(SUM(CASE WHEN type = 'sell' THEN 1 ELSE 0 END), 0), "
+                "COALESCE(SUM(CASE WHEN type = 'sell' THEN amount ELSE 0 END), 0), "
+                "COALESCE(SUM(CASE WHEN type = 'sell' THEN amount * price ELSE 0 END), 0), "
+                'COALESCE(SUM(gas_used), 0), '
+                'MIN(timestamp), MAX(timestamp) '
+                'FROM trades' + where,
+                params
+            ).fetchone()
+
+        count, buys, bought, cost, sells, sold, proceeds, gas_used, first, last = row
+        average_cost = cost / bought if bought else 0.0
+        position = bought - sold
+        summary = {
+            'trades': count,
+            'buys': buys,
+            'sells': sells,
+            'bought': bought,
+            'sold': sold,
+            'cost': cost,
+            'proceeds': proceeds,
+            'position': position,
+            'average_cost': average_cost,
+            'realized_pnl': proceeds - sold * average_cost,
+            'gas_used': gas_used,
+            'first_trade': datetime.fromtimestamp(first).isoformat() if first is not None else None,
+            'last_trade': datetime.fromtimestamp(last).isoformat() if last is not None else None
+        }
+        if mark_price is not None:
+            summary['unrealized_pnl'] = position * (mark_price - average_cost)
+        return summary
+
+    def import_json(self, path: str = 'trades.json') -> int:
+        """Load a legacy trades.json once; trades already journalled (same hash) are skipped"""
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path) as f:
+                trades = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.error(f"Could not read legacy trade log {path}: {e}")
+            return 0
+
+        rows = [self._row(trade) for trade in trades]
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                'INSERT OR IGNORE INTO trades '
+                '(timestamp, type, token, amount, price, hash, gas_used, extra) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            self._db.commit()
+            return self._db.total_changes - before
+
+    def close(self):
+        with self._lock:
+            self._db.close()
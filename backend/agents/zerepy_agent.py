@@ -5,6 +5,8 @@ import logging
 from zerepy import Zerepy, Chain
 from zerepy.utils import parse_token_amount
 from web3 import Web3
+from agents.market_data import MarketDataAggregator
+from agents.rpc_batch import BatchRPC
 
 class SonicZerepyAgent:
     def __init__(self, config: Dict):
@@ -14,6 +16,8 @@ class SonicZerepyAgent:
             chain=Chain.SONIC_TESTNET
         )
         self.w3 = Web3(Web3.HTTPProvider(config['rpc_url']))
+        # Token metadata is cached for good, pool state per block, and trades are fetched incrementally
+        self.market_data = MarketDataAggregator(self.zerepy, rpc=BatchRPC(config['rpc_url']))
         self.last_analysis = None
         self.trading_enabled = True
 
@@ -34,14 +38,11 @@ class SonicZerepyAgent:
     async def analyze_token(self, token_address: str):
         """Analyze token using Zerepy's built-in methods"""
         try:
-            # Get token info
-            token_info = await self.zerepy.get_token_info(token_address)
-            
-            # Get price and liquidity data
-            pool_info = await self.zerepy.get_pool_info(token_address)
-            
-            # Get recent trades
-            trades = await self.zerepy.get_recent_trades(token_address, limit=100)
+            # Token info, price and liquidity data, and recent trades, all in parallel
+            snapshot = await self.market_data.snapshot(token_address)
+            token_info = snapshot['token_info']
+            pool_info = snapshot['pool']
+            trades = snapshot['trades']
             
             # Calculate metrics
             metrics = {
@@ -1,3 +1,4 @@
+import asyncio
 import time
 import requests
 from web3 import Web3
@@ -5,8 +6,16 @@ from eth_account import Account
 import json
 import numpy as np
 from datetime import datetime
+from typing import Dict, Optional
 import logging
 from web3.auto import w3 as _w3
+from agents.core_agent import AIStrategyEngine
+from agents.http_client import get_http_client
+from agents.nonce_manager import NonceManager
+from agents.price_store import PriceStore
+from agents.receipt_tracker import ReceiptTracker, TransactionReplaced, TransactionTimeout
+from agents.rpc_batch import BatchRPC
+from agents.trade_journal import TradeJournal
 from agents.zerepy_agent import SonicZerepyAgent
 
 # Configure logging
@@ -33,6 +42,22 @@ SELL_THRESHOLD = 0.55
 TRADE_AMOUNT = 0.1
 GAS_LIMIT = 2000000
 MAX_PRIORITY_FEE = 2  # gwei
+PRICE_STORE_DIR = "price_history"
+BALANCE_REFRESH_INTERVAL = 30  # seconds
+RECEIPT_POLL_INTERVAL = 2  # seconds
+RECEIPT_TIMEOUT = 180  # seconds
+
+PRICE_API_URL = "https://api.coingecko.com/api/v3/simple/price"
+PRICE_API_PARAMS = {
+    "ids": "sonic-token",
+    "vs_currencies": "usd",
+    "include_24hr_change": "true"
+}
+PRICE_API_HEADERS = {
+    "Accept": "application/json",
+    "User-Agent": "Mozilla/5.0"
+}
+TRADE_JOURNAL_PATH = "trades.db"
 
 class PricePredictor:
     def __init__(self, window_size=10):
@@ -44,6 +69,9 @@ class PricePredictor:
         if len(self.price_history) > self.window_size:
             self.price_history.pop(0)
             
+    def load(self, prices):
+        self.price_history = [float(price) for price in prices[-self.window_size:]]
+
     def predict_next(self):
         if len(self.price_history) < self.window_size:
             return self.price_history[-1] if self.price_history else 0
@@ -54,36 +82,39 @@ class PricePredictor:
         return self.price_history[-1] + trend
 
 class PriceTracker:
-    def __init__(self):
+    def __init__(self, price_series=None, journal=None, nonce_manager=None):
         self.price_history = []
         self.last_trade_time = 0
         self.trade_cooldown = 300  # 5 minutes
         self.predictor = PricePredictor()
+        # Prices persist across restarts, so the predictor starts with a full window
+        self.price_series = price_series
+        if price_series is not None:
+            _, prices, _ = price_series.tail(self.predictor.window_size)
+            self.predictor.load(prices)
+        self.journal = journal
+        self.nonce_manager = nonce_manager or NonceManager(web3=w3)
         
     def get_current_price(self):
         try:
-            url = "https://api.coingecko.com/api/v3/simple/price"
-            params = {
-                "ids": "sonic-token",
-                "vs_currencies": "usd",
-                "include_24hr_change": "true"
-            }
-            headers = {
-                "Accept": "application/json",
-                "User-Agent": "Mozilla/5.0"
-            }
-            response = requests.get(url, params=params, headers=headers, timeout=10)
+            response = requests.get(PRICE_API_URL, params=PRICE_API_PARAMS, headers=PRICE_API_HEADERS, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
-                price = float(data.get("sonic-token", {}).get("usd", 0.5))
-                self.predictor.add_price(price)
-                return price
-            return 0.5
+                price = data.get("sonic-token", {}).get("usd")
+                if price is not None:
+                    self.record_price(float(price))
+                    return float(price)
+            return None
                 
         except Exception as e:
             logging.error(f"Price fetch error: {e}")
-            return 0.5
+            return None
+
+    def record_price(self, price):
+        self.predictor.add_price(price)
+        if self.price_series is not None:
+            self.price_series.append(time.time(), price)
 
     def should_trade(self, current_price):
         if time.time() - self.last_trade_time < self.trade_cooldown:
@@ -99,14 +130,15 @@ class PriceTracker:
         return False, None
 
     def execute_trade(self, trade_type, price):
+        nonce = None
         try:
-            nonce = w3.eth.get_transaction_count(USER_ADDRESS)
             amount_wei = w3.to_wei(TRADE_AMOUNT, 'ether')
             gas_price = w3.eth.gas_price
             priority_fee = w3.to_wei(MAX_PRIORITY_FEE, 'gwei')
             max_fee = gas_price + priority_fee
 
             if trade_type == "buy":
+                nonce = self.nonce_manager.allocate_sync(USER_ADDRESS)
                 transaction = contract.functions.buySonic(amount_wei).build_transaction({
                     'chainId': 57054,
                     'gas': GAS_LIMIT,
@@ -122,6 +154,7 @@ class PriceTracker:
 
             signed_txn = w3.eth.account.sign_transaction(transaction, PRIVATE_KEY)
             tx_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
+            nonce = None
             
             logging.info(f"Transaction sent: {tx_hash.hex()}")
             receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=180)
@@ -144,21 +177,17 @@ class PriceTracker:
                 return None
 
         except Exception as e:
+            if nonce is not None:
+                self.nonce_manager.handle_error(USER_ADDRESS, nonce, e)
             logging.error(f"Trade execution error: {str(e)}")
             return None
 
     def _log_trade(self, trade_info):
         try:
-            with open('trades.json', 'a+') as f:
-                f.seek(0)
-                try:
-                    trades = json.load(f)
-                except json.JSONDecodeError:
-                    trades = []
-                trades.append(trade_info)
-                f.seek(0)
-                f.truncate()
-                json.dump(trades, f, indent=2)
+            if self.journal is None:
+                self.journal = TradeJournal(TRADE_JOURNAL_PATH)
+            # One indexed row per trade, fsynced on commit
+            self.journal.record(trade_info)
         except Exception as e:
             logging.error(f"Error logging trade: {e}")
 
@@ -235,50 +264,173 @@ class AIAgent:
                 logging.error(f"Agent error: {e}")
                 await asyncio.sleep(30)
 
-def main():
-    if not verify_setup():
-        return
+class AsyncTradingRunner:
+    """Price polling, balance refresh and trade submission as concurrent tasks; receipts confirm in the background"""
+
+    def __init__(self, tracker: PriceTracker, trade_contract, rpc_url: str = SONIC_TESTNET_RPC):
+        self.tracker = tracker
+        self.contract = trade_contract
+        self.http = get_http_client()
+        self.rpc = BatchRPC(rpc_url, http=self.http)
+        self.nonces = NonceManager(rpc=self.rpc)
+        # Receipts for every pending trade are fetched together, once per block
+        self.receipts = ReceiptTracker(self.rpc, poll_interval=RECEIPT_POLL_INTERVAL, timeout=RECEIPT_TIMEOUT)
+        self.balance_eth = None
+        self.current_price = None
+        # One signal at a time; new signals are dropped while a trade is queued or unconfirmed
+        self.trade_queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self.pending: Dict[str, Dict] = {}
+        self.submitting = False
+        self._confirmations = set()
 
-    logging.info("Starting Sonic AI Trading Agent...")
-    tracker = PriceTracker()
-    
-    while True:
+    async def run(self):
+        logging.info("Starting async trading runner...")
+        try:
+            await asyncio.gather(
+                self.poll_prices(),
+                self.refresh_balance(),
+                self.submit_trades()
+            )
+        finally:
+            for task in self._confirmations:
+                task.cancel()
+            await self.receipts.stop()
+            await self.http.close()
+
+    async def fetch_price(self) -> Optional[float]:
         try:
-            if not w3.is_connected():
-                logging.error("Lost connection to Sonic network. Retrying...")
-                time.sleep(30)
-                continue
+            data = await self.http.get_json(PRICE_API_URL, params=PRICE_API_PARAMS, headers=PRICE_API_HEADERS)
+            price = data.get("sonic-token", {}).get("usd")
+            return float(price) if price is not None else None
+        except Exception as e:
+            logging.error(f"Price fetch error: {e}")
+            return None
 
-            balance = w3.eth.get_balance(USER_ADDRESS)
-            balance_eth = w3.from_wei(balance, 'ether')
-            current_price = tracker.get_current_price()
+    async def poll_prices(self):
+        while True:
+            started = time.monotonic()
+            try:
+                current_price = await self.fetch_price()
+                if current_price is not None:
+                    self.current_price = current_price
+                    self.tracker.record_price(current_price)
+                    balance = f"{self.balance_eth:.4f}" if self.balance_eth is not None else "?"
+                    print(f"\rTime: {datetime.now().strftime('%H:%M:%S')} | "
+                          f"Price: ${current_price:.4f} | "
+                          f"Balance: {balance} S | "
+                          f"Pending: {len(self.pending)} | "
+                          f"Predicted: ${self.tracker.predictor.predict_next():.4f}", end='', flush=True)
+
+                    should_trade, trade_type = self.tracker.should_trade(current_price)
+                    if should_trade and not (self.pending or self.submitting or self.trade_queue.full()):
+                        print(f"\nTrigger detected: {trade_type} at ${current_price}")
+                        self.trade_queue.put_nowait((trade_type, current_price))
+            except Exception as e:
+                logging.error(f"Price poll failed: {e}")
 
-            if current_price is None:
-                continue
+            # Keep a fixed cadence regardless of how long the fetch took
+            await asyncio.sleep(max(0, PRICE_CHECK_INTERVAL - (time.monotonic() - started)))
 
-            print(f"\rTime: {datetime.now().strftime('%H:%M:%S')} | "
-                  f"Price: ${current_price:.4f} | "
-                  f"Balance: {balance_eth:.4f} S | "
-                  f"Predicted: ${tracker.predictor.predict_next():.4f}", end='', flush=True)
+    async def refresh_balance(self):
+        while True:
+            try:
+                balance = await self.rpc.request('eth_getBalance', [USER_ADDRESS, 'latest'])
+                self.balance_eth = float(Web3.from_wei(int(balance, 16), 'ether'))
+            except Exception as e:
+                logging.error(f"Lost connection to Sonic network: {e}")
+            await asyncio.sleep(BALANCE_REFRESH_INTERVAL)
 
-            should_trade, trade_type = tracker.should_trade(current_price)
-            
-            if should_trade:
-                print(f"\nTrigger detected: {trade_type} at ${current_price}")
-                if trade_type == "buy" and balance_eth >= TRADE_AMOUNT:
-                    tracker.execute_trade(trade_type, current_price)
-                elif trade_type == "sell":
-                    tracker.execute_trade(trade_type, current_price)
-
-        except KeyboardInterrupt:
-            logging.info("Stopping AI agent...")
-            break
+    async def submit_trades(self):
+        while True:
+            trade_type, price = await self.trade_queue.get()
+            self.submitting = True
+            try:
+                if trade_type == "sell":
+                    logging.info("Sell functionality not implemented yet")
+                    continue
+                if self.balance_eth is None or self.balance_eth < TRADE_AMOUNT:
+                    logging.info(f"Skipping {trade_type}: balance {self.balance_eth} S below {TRADE_AMOUNT} S")
+                    continue
+                await self.submit_trade(trade_type, price)
+            except Exception as e:
+                logging.error(f"Trade execution error: {str(e)}")
+            finally:
+                self.submitting = False
+                self.trade_queue.task_done()
+
+    async def submit_trade(self, trade_type: str, price: float) -> str:
+        amount_wei = Web3.to_wei(TRADE_AMOUNT, 'ether')
+        gas_price = await self.rpc.request('eth_gasPrice')
+        priority_fee = Web3.to_wei(MAX_PRIORITY_FEE, 'gwei')
+
+        # Every field is filled in locally, so building and signing never touch the sync provider
+        transaction = {
+            'chainId': 57054,
+            'to': self.contract.address,
+            'data': self.contract.encode_abi('buySonic', args=[amount_wei]),
+            'gas': GAS_LIMIT,
+            'maxFeePerGas': int(gas_price, 16) + priority_fee,
+            'maxPriorityFeePerGas': priority_fee,
+            'value': amount_wei
+        }
+        # Allocated locally, so concurrent submissions never collide or wait on a count lookup
+        nonce = await self.nonces.allocate(USER_ADDRESS)
+        transaction['nonce'] = nonce
+        try:
+            signed_txn = Account.sign_transaction(transaction, PRIVATE_KEY)
+            tx_hash = await self.rpc.request('eth_sendRawTransaction', [signed_txn.raw_transaction.to_0x_hex()])
         except Exception as e:
-            logging.error(f"Error in main loop: {e}")
-            time.sleep(30)
-            continue
+            self.nonces.handle_error(USER_ADDRESS, nonce, e)
+            raise
+        logging.info(f"Transaction sent: {tx_hash}")
+
+        self.pending[tx_hash] = {'type': trade_type, 'amount': TRADE_AMOUNT, 'price': price}
+        task = asyncio.create_task(self.confirm(tx_hash, nonce))
+        self._confirmations.add(task)
+        task.add_done_callback(self._confirmations.discard)
+        return tx_hash
+
+    async def confirm(self, tx_hash: str, nonce: int):
+        """Wait for the receipt off the price path, then journal the trade"""
+        try:
+            receipt = await self.receipts.wait(tx_hash, sender=USER_ADDRESS, nonce=nonce)
+            if int(receipt['status'], 16) == 1:
+                trade_info = {
+                    **self.pending[tx_hash],
+                    'hash': tx_hash,
+                    'gas_used': int(receipt['gasUsed'], 16),
+                    'timestamp': datetime.now().isoformat()
+                }
+                # The journal commits with a full fsync, which must not stall the event loop
+                await asyncio.to_thread(self.tracker._log_trade, trade_info)
+                self.tracker.last_trade_time = time.time()
+            else:
+                logging.error(f"Transaction failed: {receipt}")
+        except (TransactionTimeout, TransactionReplaced) as e:
+            logging.error(str(e))
+            # Possibly dropped from the mempool; take the next nonce from the node again
+            self.nonces.invalidate(USER_ADDRESS)
+        finally:
+            self.pending.pop(tx_hash, None)
+
+def main():
+    if not verify_setup():
+        return
 
-        time.sleep(PRICE_CHECK_INTERVAL)
+    logging.info("Starting Sonic AI Trading Agent...")
+    journal = TradeJournal(TRADE_JOURNAL_PATH)
+    imported = journal.import_json('trades.json')
+    if imported:
+        logging.info(f"Imported {imported} trades from trades.json into {TRADE_JOURNAL_PATH}")
+    tracker = PriceTracker(
+        price_series=PriceStore(PRICE_STORE_DIR).series("sonic-token"),
+        journal=journal
+    )
+    
+    try:
+        asyncio.run(AsyncTradingRunner(tracker, contract).run())
+    except KeyboardInterrupt:
+        logging.info("Stopping AI agent...")
 
 if __name__ == "__main__":
     try:
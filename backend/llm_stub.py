@@ -0,0 +1,96 @@
+"""OpenAI-compatible stub model server for measuring the agent's analysis path without real API calls.
+
+    python llm_stub.py --port 8081 --latency 1.5
+    # config.yaml: api.openai.api_base: "http://127.0.0.1:8081/v1"
+
+GET /stats reports how many completions were served and the tokens they would have cost.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from aiohttp import web
+
+CANNED_ANALYSES = (
+    "Market sentiment: bullish\nRisk level: medium\nSuggested action: buy\nConfidence: 78\n"
+    "Key reasons: rising volume with positive momentum",
+    "Market sentiment: neutral\nRisk level: low\nSuggested action: hold\nConfidence: 55\n"
+    "Key reasons: price range-bound, volume flat",
+    "Market sentiment: bearish\nRisk level: high\nSuggested action: sell\nConfidence: 72\n"
+    "Key reasons: falling price on heavy sell volume"
+)
+
+
+class StubModel:
+    def __init__(self, latency: float, jitter: float):
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.started = time.time()
+
+    async def chat_completions(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.requests += 1
+        self.concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        try:
+            await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        finally:
+            self.concurrent -= 1
+
+        content = random.choice(CANNED_ANALYSES)
+        prompt_tokens = sum(len(message.get('content', '')) for message in body.get('messages', [])) // 4
+        completion_tokens = len(content) // 4
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        return web.json_response({
+            'id': f'stub-{self.requests}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        })
+
+    async def stats(self, request: web.Request) -> web.Response:
+        elapsed = time.time() - self.started
+        return web.json_response({
+            'requests': self.requests,
+            'requests_per_minute': self.requests / elapsed * 60 if elapsed else 0.0,
+            'max_concurrent': self.max_concurrent,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve canned chat completions with a configurable delay")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=1.0, help="Seconds per completion")
+    parser.add_argument('--jitter', type=float, default=0.2)
+    args = parser.parse_args()
+
+    model = StubModel(args.latency, args.jitter)
+    app = web.Application()
+    for prefix in ('', '/v1'):
+        app.router.add_post(f'{prefix}/chat/completions', model.chat_completions)
+    app.router.add_get('/stats', model.stats)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Local JSON-RPC node stand-in for exercising BatchRPC and Multicall without a real chain.
+
+    python rpc_stub.py --port 8545 --latency 0.02 --fail-first 2
+    # config.yaml: blockchain.rpc_url: "http://127.0.0.1:8545"
+
+Serves single and batched requests. eth_call runs against registered contracts, and calls to the
+Multicall3 address are unpacked and run the same way. GET /stats reports HTTP requests, batch sizes
+and calls served.
+"""
+import argparse
+import asyncio
+from typing import Callable, Dict, List
+
+from aiohttp import web
+from eth_abi import decode as abi_decode, encode as abi_encode
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+
+from agents.rpc_batch import AGGREGATE3_SELECTOR, GET_AMOUNTS_OUT_SELECTOR, MULTICALL3_ADDRESS
+
+# handler(calldata) -> return data; raising makes the call revert
+ContractHandler = Callable[[bytes], bytes]
+
+
+class Revert(Exception):
+    pass
+
+
+def amounts_out_router(price: float) -> ContractHandler:
+    """UniswapV2-style router quoting every hop at a fixed price"""
+    def handle(data: bytes) -> bytes:
+        if data[:4] != GET_AMOUNTS_OUT_SELECTOR:
+            raise Revert('unknown selector')
+        amount_in, path = abi_decode(['uint256', 'address[]'], data[4:])
+        amounts = [amount_in]
+        for _ in path[1:]:
+            amounts.append(int(amounts[-1] * price))
+        return abi_encode(['uint256[]'], [amounts])
+    return handle
+
+
+class StubNode:
+    def __init__(
+        self,
+        block_number: int = 1000,
+        latency: float = 0.0,
+        fail_first: int = 0,
+        fail_status: int = 503,
+        chain_id: int = 146
+    ):
+        self.block_number = block_number
+        self.latency = latency
+        # The first fail_first HTTP requests are answered with fail_status, to exercise retries
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.chain_id = chain_id
+        self.contracts: Dict[str, ContractHandler] = {}
+        self.code: Dict[str, bytes] = {}
+
+        self.http_requests = 0
+        self.batch_sizes: List[int] = []
+        self.calls = 0
+
+    def add_contract(self, address: str, handler: ContractHandler, code: bytes = b'\x60\x00'):
+        address = to_checksum_address(address)
+        self.contracts[address] = handler
+        self.code[address] = code
+
+    def call(self, target: str, data: bytes) -> bytes:
+        self.calls += 1
+        target = to_checksum_address(target)
+        if target == MULTICALL3_ADDRESS and data[:4] == AGGREGATE3_SELECTOR:
+            return self._aggregate3(data[4:])
+        handler = self.contracts.get(target)
+        if handler is None:
+            raise Revert(f'no contract at {target}')
+        return handler(data)
+
+    def _aggregate3(self, payload: bytes) -> bytes:
+        (calls,) = abi_decode(['(address,bool,bytes)[]'], payload)
+        results = []
+        for target, allow_failure, data in calls:
+            try:
+                results.append((True, self.call(target, data)))
+            except Revert:
+                if not allow_failure:
+                    raise
+                results.append((False, b''))
+        return abi_encode(['(bool,bytes)[]'], [results])
+
+    def handle(self, method: str, params: list):
+        """Result of one JSON-RPC call; raises Revert or KeyError for error responses"""
+        if method == 'eth_blockNumber':
+            return hex(self.block_number)
+        if method == 'eth_chainId':
+            return hex(self.chain_id)
+        if method == 'eth_call':
+            return HexBytes(self.call(params[0]['to'], HexBytes(params[0].get('data', '0x')))).to_0x_hex()
+        if method == 'eth_getCode':
+            return HexBytes(self.code.get(to_checksum_address(params[0]), b'')).to_0x_hex()
+        if method in ('eth_getBalance', 'eth_getTransactionCount'):
+            return '0x0'
+        if method == 'eth_getBlockByNumber':
+            number = self.block_number if params[0] == 'latest' else int(params[0], 16)
+            return {'number': hex(number), 'hash': '0x%064x' % number}
+        raise KeyError(method)
+
+    def respond(self, request: Dict) -> Dict:
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+        try:
+            response['result'] = self.handle(request['method'], request.get('params') or [])
+        except Revert as e:
+            response['error'] = {'code': 3, 'message': f'execution reverted: {e}'}
+        except KeyError:
+            response['error'] = {'code': -32601, 'message': f"Method {request.get('method')} not found"}
+        return response
+
+    async def rpc(self, request: web.Request) -> web.Response:
+        self.http_requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.http_requests <= self.fail_first:
+            return web.Response(status=self.fail_status, text='stub node unavailable')
+
+        body = await request.json()
+        if isinstance(body, list):
+            self.batch_sizes.append(len(body))
+            return web.json_response([self.respond(item) for item in body])
+        self.batch_sizes.append(1)
+        return web.json_response(self.respond(body))
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            'http_requests': self.http_requests,
+            'batches': len(self.batch_sizes),
+            'max_batch': max(self.batch_sizes, default=0),
+            'calls': self.calls
+        })
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/', self.rpc)
+        app.router.add_get('/stats', self.stats)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a minimal JSON-RPC node with Multicall3 support")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8545)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds per HTTP request")
+    parser.add_argument('--fail-first', type=int, default=0, help="Answer this many requests with HTTP 503")
+    parser.add_argument('--block', type=int, default=1000)
+    parser.add_argument('--router', help="Address to serve getAmountsOut quotes from")
+    parser.add_argument('--price', type=float, default=1.0, help="Quote rate of the router per hop")
+    args = parser.parse_args()
+
+    node = StubNode(block_number=args.block, latency=args.latency, fail_first=args.fail_first)
+    if args.router:
+        node.add_contract(args.router, amounts_out_router(args.price))
+    web.run_app(node.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Local SMTP sink for exercising AlertDispatcher without a real mail server.
+
+    python smtp_stub.py --port 8025 --fail-first 2
+    # config.yaml: smtp.server: "127.0.0.1", smtp.port: 8025, smtp.use_tls: false
+
+Accepts any AUTH PLAIN login and keeps every message in memory, printing a summary of each. It can
+answer the first messages with a temporary failure, to exercise retries. STARTTLS is not offered.
+"""
+import argparse
+import asyncio
+import email
+import logging
+from dataclasses import dataclass
+from email.message import Message
+from typing import List
+
+
+@dataclass
+class ReceivedMessage:
+    sender: str
+    recipients: List[str]
+    message: Message
+
+
+class StubSMTPServer:
+    def __init__(self, fail_first: int = 0, fail_code: int = 451, verbose: bool = False):
+        # The first fail_first messages are rejected with fail_code after DATA
+        self.fail_first = fail_first
+        self.fail_code = fail_code
+        self.verbose = verbose
+        self.messages: List[ReceivedMessage] = []
+        self.connections = 0
+        self.attempts = 0
+        self._server = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> int:
+        """Listen on host:port (0 picks a free port) and return the bound port"""
+        self._server = await asyncio.start_server(self._session, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+
+        def reply(line: str):
+            writer.write(f"{line}\r\n".encode())
+
+        sender = ''
+        recipients: List[str] = []
+        reply('220 stub ESMTP ready')
+        try:
+            while True:
+                await writer.drain()
+                line = await reader.readline()
+                if not line:
+                    break
+                command, _, argument = line.decode(errors='replace').strip().partition(' ')
+                command = command.upper()
+
+                if command == 'EHLO':
+                    reply('250-stub')
+                    reply('250-AUTH PLAIN')
+                    reply('250 SIZE 10485760')
+                elif command == 'HELO':
+                    reply('250 stub')
+                elif command == 'AUTH':
+                    if argument.upper() == 'PLAIN':
+                        reply('334 ')
+                        await writer.drain()
+                        await reader.readline()
+                    reply('235 Authentication successful')
+                elif command == 'MAIL':
+                    sender = argument.split(':', 1)[-1].split()[0].strip('<>') if ':' in argument else ''
+                    recipients = []
+                    reply('250 OK')
+                elif command == 'RCPT':
+                    recipients.append(argument.split(':', 1)[-1].strip().strip('<>'))
+                    reply('250 OK')
+                elif command == 'DATA':
+                    reply('354 End data with <CR><LF>.<CR><LF>')
+                    await writer.drain()
+                    reply(self._receive(sender, recipients, await self._read_data(reader)))
+                    sender, recipients = '', []
+                elif command in ('RSET', 'NOOP'):
+                    reply('250 OK')
+                elif command == 'QUIT':
+                    reply('221 Bye')
+                    break
+                else:
+                    reply(f'502 {command} not implemented')
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_data(self, reader: asyncio.StreamReader) -> bytes:
+        lines = []
+        while True:
+            line = await reader.readline()
+            if not line or line in (b'.\r\n', b'.\n'):
+                break
+            # Undo dot-stuffing
+            lines.append(line[1:] if line.startswith(b'.') else line)
+        return b''.join(lines)
+
+    def _receive(self, sender: str, recipients: List[str], data: bytes) -> str:
+        self.attempts += 1
+        if self.attempts <= self.fail_first:
+            return f'{self.fail_code} Temporary failure, try again later'
+        message = email.message_from_bytes(data)
+        self.messages.append(ReceivedMessage(sender, recipients, message))
+        if self.verbose:
+            logging.info(f"Message {len(self.messages)} to {', '.join(recipients)}: {message['Subject']}")
+        return '250 OK: queued'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accept and keep SMTP messages locally")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--fail-first', type=int, default=0, help="Reject this many messages with a 451")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    server = StubSMTPServer(fail_first=args.fail_first, verbose=True)
+
+    async def serve():
+        port = await server.start(args.host, args.port)
+        logging.info(f"SMTP stub listening on {args.host}:{port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
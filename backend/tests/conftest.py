@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules import each other as `agents.x` from the backend directory, as when the agents are run
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,117 @@
+import asyncio
+
+from agents.alert_dispatcher import AlertDispatcher
+from smtp_stub import StubSMTPServer
+
+
+def run_with_server(server: StubSMTPServer, scenario, **options):
+    """Run scenario(dispatcher) against the stub server on a free local port"""
+    async def main():
+        port = await server.start()
+        dispatcher = AlertDispatcher(
+            '127.0.0.1',
+            port,
+            username='agent@example.com',
+            password='secret',
+            use_tls=False,
+            backoff=0.01,
+            **options
+        )
+        try:
+            await scenario(dispatcher)
+            return dispatcher.stats()
+        finally:
+            await dispatcher.stop(flush=False)
+            await server.stop()
+    return asyncio.run(main())
+
+
+def test_alerts_share_one_connection():
+    server = StubSMTPServer()
+
+    async def scenario(dispatcher):
+        for i in range(3):
+            assert dispatcher.submit('ops@example.com', f'Alert {i}', f'body {i}')
+        await dispatcher.stop()
+
+    stats = run_with_server(server, scenario)
+    assert stats['sent'] == 3
+    assert [received.message['Subject'] for received in server.messages] == ['Alert 0', 'Alert 1', 'Alert 2']
+    assert server.messages[0].sender == 'agent@example.com'
+    assert server.messages[0].recipients == ['ops@example.com']
+    assert server.connections == 1
+
+
+def test_transient_failures_are_retried():
+    server = StubSMTPServer(fail_first=2)
+
+    async def scenario(dispatcher):
+        dispatcher.submit('ops@example.com', 'Reentrancy', 'details')
+        await dispatcher.stop()
+
+    stats = run_with_server(server, scenario, max_retries=3)
+    assert stats['sent'] == 1
+    assert stats['failed'] == 0
+    assert server.attempts == 3
+    assert len(server.messages) == 1
+
+
+def test_gives_up_after_max_retries():
+    server = StubSMTPServer(fail_first=10)
+
+    async def scenario(dispatcher):
+        dispatcher.submit('ops@example.com', 'Reentrancy', 'details')
+        await dispatcher.stop()
+
+    stats = run_with_server(server, scenario, max_retries=1)
+    assert stats['sent'] == 0
+    assert stats['failed'] == 1
+    assert server.attempts == 2
+    assert not server.messages
+
+
+def test_alerts_within_the_window_become_one_digest():
+    server = StubSMTPServer()
+
+    async def scenario(dispatcher):
+        for i in range(3):
+            dispatcher.submit('ops@example.com', f'Alert {i}', f'body {i}')
+        dispatcher.submit('security@example.com', 'Single', 'only one')
+        await asyncio.sleep(0.3)
+
+    stats = run_with_server(server, scenario, digest_window=0.1)
+    assert stats['digests_sent'] == 1
+    assert stats['pending_digests'] == 0
+    by_recipient = {received.recipients[0]: received.message for received in server.messages}
+    assert set(by_recipient) == {'ops@example.com', 'security@example.com'}
+    digest = by_recipient['ops@example.com']
+    assert digest['Subject'] == 'Alert Digest: 3 alerts'
+    body = digest.get_payload()[0].get_payload()
+    assert all(f'=== Alert {i}' in body for i in range(3))
+    assert by_recipient['security@example.com']['Subject'] == 'Single'
+
+
+def test_stop_flushes_open_digests():
+    server = StubSMTPServer()
+
+    async def scenario(dispatcher):
+        dispatcher.submit('ops@example.com', 'First', 'a')
+        dispatcher.submit('ops@example.com', 'Second', 'b')
+        await dispatcher.stop()
+
+    stats = run_with_server(server, scenario, digest_window=60)
+    assert stats['digests_sent'] == 1
+    assert len(server.messages) == 1
+
+
+def test_full_queue_drops_alerts():
+    server = StubSMTPServer()
+
+    async def scenario(dispatcher):
+        assert dispatcher.submit('ops@example.com', 'First', 'a')
+        assert not dispatcher.submit('ops@example.com', 'Second', 'b')
+        await dispatcher.stop()
+
+    stats = run_with_server(server, scenario, queue_size=1)
+    assert stats['dropped'] == 1
+    assert stats['sent'] == 1
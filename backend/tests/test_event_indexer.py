@@ -0,0 +1,160 @@
+import asyncio
+import json
+
+from eth_utils.abi import event_abi_to_log_topic
+from hexbytes import HexBytes
+from web3 import Web3
+
+from agents.event_indexer import EventIndexer
+from agents.rpc_batch import RPCError
+
+ABI = [{
+    'anonymous': False,
+    'inputs': [
+        {'indexed': True, 'name': 'user', 'type': 'address'},
+        {'indexed': False, 'name': 'value', 'type': 'uint256'}
+    ],
+    'name': 'Deposit',
+    'type': 'event'
+}]
+TOPIC = HexBytes(event_abi_to_log_topic(ABI[0])).to_0x_hex()
+CONTRACT = Web3().eth.contract(address='0x' + '11' * 20, abi=ABI)
+
+
+class FakeChain:
+    """One Deposit every third block; blocks after fork_block get new hashes once forked"""
+
+    def __init__(self, head: int = 5000, max_range: int = 100000):
+        self.head = head
+        self.max_range = max_range
+        self.fork_block = None
+        self.log_requests = []
+        self.served_ranges = []
+        self.range_errors = 0
+        self.fail_log_request = None
+
+    def block_hash(self, number: int) -> str:
+        forked = self.fork_block is not None and number > self.fork_block
+        return '0x%064x' % (number * 7 + (1 if forked else 0))
+
+    def logs(self, from_block: int, to_block: int):
+        return [{
+            'address': CONTRACT.address,
+            'topics': [TOPIC, '0x' + '00' * 12 + '%040x' % (number % 50 + 1)],
+            'data': '0x' + number.to_bytes(32, 'big').hex(),
+            'blockNumber': hex(number),
+            'blockHash': self.block_hash(number),
+            'transactionHash': '0x%064x' % number,
+            'transactionIndex': '0x0',
+            'logIndex': '0x0',
+            'removed': False
+        } for number in range(from_block, to_block + 1) if number % 3 == 0]
+
+    async def request_many(self, requests):
+        results = []
+        for method, params in requests:
+            if method == 'eth_blockNumber':
+                results.append(hex(self.head))
+            elif method == 'eth_getBlockByNumber':
+                results.append({'hash': self.block_hash(int(params[0], 16))})
+            elif method == 'eth_getLogs':
+                from_block, to_block = int(params[0]['fromBlock'], 16), int(params[0]['toBlock'], 16)
+                self.log_requests.append((from_block, to_block))
+                if len(self.log_requests) == self.fail_log_request:
+                    raise ConnectionError('node went away')
+                if to_block - from_block >= self.max_range:
+                    self.range_errors += 1
+                    results.append(RPCError({'message': 'query returned more than 10000 results'}))
+                else:
+                    self.served_ranges.append((from_block, to_block))
+                    results.append(self.logs(from_block, to_block))
+        return results
+
+
+def event_blocks(events):
+    return [event['blockNumber'] for event in events]
+
+
+def deposits(from_block: int, to_block: int):
+    return [number for number in range(from_block, to_block + 1) if number % 3 == 0]
+
+
+def test_reorg_past_the_checkpoint_rolls_back_and_reemits(tmp_path):
+    checkpoint = str(tmp_path / 'events.json')
+    chain = FakeChain()
+
+    async def main():
+        first = EventIndexer(chain, CONTRACT, checkpoint_path=checkpoint, start_block=4000)
+        assert event_blocks(await first.sync()) == deposits(4000, 5000)
+
+        # Restarted indexer; meanwhile everything after block 4990 was replaced
+        chain.fork_block = 4990
+        chain.head = 5006
+        second = EventIndexer(chain, CONTRACT, checkpoint_path=checkpoint)
+        events = await second.sync()
+        return second, events
+
+    indexer, events = asyncio.run(main())
+    assert indexer.reorgs == 1
+    assert indexer.cursor == 5006
+    # Everything since the common ancestor is emitted again, from the new chain
+    assert event_blocks(events) == deposits(4991, 5006)
+    assert all(event['blockHash'] == HexBytes(chain.block_hash(event['blockNumber'])) for event in events)
+    # The window holds each block's event once, not the orphaned copy as well
+    blocks = indexer.columns.window()['block']
+    assert sorted(set(blocks.tolist())) == blocks.tolist()
+    assert json.load(open(checkpoint))['hashes'][-1] == [5006, chain.block_hash(5006)]
+
+
+def test_restart_backfills_the_window_without_reemitting(tmp_path):
+    checkpoint = str(tmp_path / 'events.json')
+    chain = FakeChain()
+
+    async def main():
+        first = EventIndexer(chain, CONTRACT, checkpoint_path=checkpoint, start_block=0, window_blocks=1000)
+        await first.sync()
+        chain.head += 30
+        second = EventIndexer(chain, CONTRACT, checkpoint_path=checkpoint, window_blocks=1000)
+        assert len(second.columns) == 0
+        return second, await second.sync()
+
+    indexer, events = asyncio.run(main())
+    assert event_blocks(events) == deposits(5001, 5030)
+    assert indexer.columns.window()['block'].tolist() == deposits(5030 - 999, 5030)
+
+
+def test_range_errors_halve_the_chunk():
+    chain = FakeChain(max_range=1500)
+
+    async def main():
+        indexer = EventIndexer(chain, CONTRACT, start_block=0, initial_chunk=8000)
+        return await indexer.sync()
+
+    events = asyncio.run(main())
+    # 8000 -> 4000 -> 2000 are rejected before 1000 is accepted
+    assert chain.log_requests[:4] == [(0, 5000), (0, 3999), (0, 1999), (0, 999)]
+    assert chain.served_ranges[0] == (0, 999)
+    assert event_blocks(events) == deposits(0, 5000)
+    # Growing the chunk back later is rejected and halved again, never skipping or repeating blocks
+    assert all(a == prev + 1 for (a, _), (_, prev) in zip(chain.served_ranges[1:], chain.served_ranges))
+    assert all(b - a < 1500 for a, b in chain.served_ranges)
+    assert chain.served_ranges[-1][1] == 5000
+
+
+def test_failure_after_a_chunk_keeps_its_events_and_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / 'events.json')
+    chain = FakeChain()
+    chain.fail_log_request = 3
+
+    async def main():
+        indexer = EventIndexer(chain, CONTRACT, checkpoint_path=checkpoint, start_block=0, initial_chunk=1000)
+        # Blocks 0-999 and then a doubled chunk of 1000-2999 succeed, the third request fails
+        partial = await indexer.sync()
+        assert indexer.cursor == 2999
+        assert json.load(open(checkpoint))['block'] == 2999
+        rest = await indexer.sync()
+        return partial, rest
+
+    partial, rest = asyncio.run(main())
+    assert event_blocks(partial) == deposits(0, 2999)
+    assert event_blocks(rest) == deposits(3000, 5000)
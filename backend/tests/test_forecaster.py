@@ -0,0 +1,45 @@
+import warnings
+
+import numpy as np
+import pytest
+from statsmodels.tools.sm_exceptions import ConvergenceWarning
+
+from agents.forecaster import ARIMAForecaster
+
+
+def replay(forecaster: ARIMAForecaster, prices: np.ndarray, window: int = 100):
+    forecasts = []
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', ConvergenceWarning)
+        warnings.simplefilter('ignore', UserWarning)
+        for i, price in enumerate(prices.tolist()):
+            forecaster.observe(price)
+            history = prices[max(0, i + 1 - window):i + 1]
+            if i + 1 >= forecaster.min_observations:
+                forecasts.append(forecaster.forecast(history))
+    return forecasts
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_closed_form_matches_kalman_forecasts(seed):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.002, 400)
+    # A few jumps exercise the drift-triggered refits as well as the scheduled ones
+    returns[[150, 151, 152, 300]] += 0.05
+    prices = 100 * np.exp(np.cumsum(returns))
+
+    kalman = ARIMAForecaster(refit_every=50)
+    closed_form = ARIMAForecaster(refit_every=50, closed_form=True)
+    expected = replay(kalman, prices)
+    actual = replay(closed_form, prices)
+
+    assert closed_form.fit_count == kalman.fit_count
+    np.testing.assert_allclose(np.array(actual), np.array(expected), rtol=1e-8)
+
+
+def test_closed_form_is_ignored_for_other_orders():
+    rng = np.random.default_rng(2)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, 80)))
+    forecaster = ARIMAForecaster(order=(1, 1, 1), closed_form=True)
+    replay(forecaster, prices)
+    assert forecaster._ar_params is None
@@ -0,0 +1,33 @@
+import asyncio
+
+from aiohttp import web
+
+from agents.http_client import HTTPClient
+from rpc_stub import StubNode
+
+
+def test_new_event_loop_closes_the_previous_session():
+    node = StubNode(block_number=77)
+    client = HTTPClient()
+
+    async def call():
+        runner = web.AppRunner(node.app())
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            payload = {'jsonrpc': '2.0', 'id': 1, 'method': 'eth_blockNumber', 'params': []}
+            assert (await client.post_json(f'http://127.0.0.1:{port}/', payload))['result'] == hex(77)
+            return client._session
+        finally:
+            await runner.cleanup()
+
+    first = asyncio.run(call())
+    connector = first.connector
+    second = asyncio.run(call())
+    asyncio.run(client.close())
+
+    assert second is not first
+    assert first.closed and connector.closed
+    assert second.closed
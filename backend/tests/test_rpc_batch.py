@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from eth_abi import decode as abi_decode
+
+from agents.http_client import HTTPClient
+from agents.rpc_batch import BatchRPC, CallBatcher, ContractCall, Multicall, RPCError, get_amounts_out_call
+from rpc_stub import StubNode, amounts_out_router
+
+ROUTER = '0x' + '22' * 20
+TOKEN_A = '0x' + '0a' * 20
+TOKEN_B = '0x' + '0b' * 20
+
+
+def run_with_node(node: StubNode, scenario):
+    """Serve node on a free local port and run scenario(url) against it"""
+    async def main():
+        runner = web.AppRunner(node.app())
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        http = HTTPClient(retries=3, backoff=0.01)
+        try:
+            return await scenario(f'http://127.0.0.1:{port}/', http)
+        finally:
+            await http.close()
+            await runner.cleanup()
+    return asyncio.run(main())
+
+
+def make_node(**options) -> StubNode:
+    node = StubNode(**options)
+    node.add_contract(ROUTER, amounts_out_router(2.0))
+    return node
+
+
+def test_request_many_splits_into_batches_and_keeps_order():
+    node = make_node(block_number=1234)
+
+    async def scenario(url, http):
+        rpc = BatchRPC(url, max_batch_size=2, http=http)
+        return await rpc.request_many([
+            ('eth_blockNumber', []),
+            ('eth_chainId', []),
+            ('eth_getCode', [ROUTER, 'latest']),
+            ('eth_unsupported', []),
+            ('eth_blockNumber', [])
+        ])
+
+    results = run_with_node(node, scenario)
+    assert results[0] == hex(1234)
+    assert results[1] == hex(146)
+    assert results[2] == '0x6000'
+    assert isinstance(results[3], RPCError) and results[3].code == -32601
+    assert results[4] == hex(1234)
+    assert node.batch_sizes == [2, 2, 1]
+
+
+def test_single_request_raises_rpc_error():
+    node = make_node()
+
+    async def scenario(url, http):
+        with pytest.raises(RPCError):
+            await BatchRPC(url, http=http).request('eth_call', [{'to': TOKEN_A, 'data': '0x'}, 'latest'])
+
+    run_with_node(node, scenario)
+
+
+def test_multicall_decodes_results_and_failures():
+    node = make_node()
+    quote = get_amounts_out_call(ROUTER, 10 ** 18, [TOKEN_A, TOKEN_B])
+    missing = ContractCall(TOKEN_A, b'\x12\x34\x56\x78')
+
+    async def scenario(url, http):
+        multicall = Multicall(BatchRPC(url, http=http), max_calls=2)
+        return await multicall.aggregate([quote, missing, quote])
+
+    results = run_with_node(node, scenario)
+    assert results[0] == [10 ** 18, 2 * 10 ** 18]
+    assert isinstance(results[1], RPCError)
+    assert results[2] == results[0]
+    # Three calls at two per aggregate go out as one HTTP batch of two eth_calls
+    assert node.http_requests == 1
+    assert node.batch_sizes == [2]
+
+
+def test_multicall_raises_when_failure_is_not_allowed():
+    node = make_node()
+    strict = ContractCall(TOKEN_A, b'\x12\x34\x56\x78', allow_failure=False)
+
+    async def scenario(url, http):
+        multicall = Multicall(BatchRPC(url, http=http))
+        return await multicall.aggregate([strict])
+
+    results = run_with_node(node, scenario)
+    # Multicall3 reverts the whole aggregate, which comes back as the call's error
+    assert isinstance(results[0], RPCError)
+
+
+def test_call_batcher_merges_concurrent_calls():
+    node = make_node()
+
+    async def scenario(url, http):
+        batcher = CallBatcher(Multicall(BatchRPC(url, http=http)), max_delay=0.01)
+        return await asyncio.gather(*(
+            batcher.call(get_amounts_out_call(ROUTER, amount, [TOKEN_A, TOKEN_B]))
+            for amount in range(1, 51)
+        ))
+
+    results = run_with_node(node, scenario)
+    assert [amounts[1] for amounts in results] == [2 * amount for amount in range(1, 51)]
+    assert node.http_requests == 1
+
+
+def test_http_client_retries_transient_failures():
+    node = make_node(fail_first=2)
+
+    async def scenario(url, http):
+        return await http.post_json(url, {'jsonrpc': '2.0', 'id': 1, 'method': 'eth_blockNumber', 'params': []})
+
+    response = run_with_node(node, scenario)
+    assert response['result'] == hex(node.block_number)
+    assert node.http_requests == 3
+
+
+def test_batch_rpc_surfaces_http_errors():
+    node = make_node(fail_first=1)
+
+    async def scenario(url, http):
+        rpc = BatchRPC(url, http=http)
+        with pytest.raises(Exception):
+            await rpc.request('eth_blockNumber')
+        return await rpc.request('eth_blockNumber')
+
+    assert run_with_node(node, scenario) == hex(node.block_number)
+
+
+def test_amounts_out_router_quotes_each_hop():
+    data = get_amounts_out_call(ROUTER, 1000, [TOKEN_A, TOKEN_B, TOKEN_A]).data
+    (amounts,) = abi_decode(['uint256[]'], amounts_out_router(0.5)(bytes(data)))
+    assert list(amounts) == [1000, 500, 250]
+
+
+def test_call_batcher_fails_waiters_when_the_flush_is_cancelled():
+    class StalledMulticall:
+        async def aggregate(self, calls):
+            await asyncio.sleep(3600)
+
+    async def main():
+        batcher = CallBatcher(StalledMulticall(), max_delay=0.001)
+        waiters = [asyncio.ensure_future(batcher.call(ContractCall(TOKEN_A, b''))) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert len(batcher._flushes) == 1
+        for task in list(batcher._flushes):
+            task.cancel()
+        results = await asyncio.wait_for(asyncio.gather(*waiters, return_exceptions=True), 1)
+        assert all(isinstance(result, RPCError) for result in results)
+        assert not batcher._flushes
+
+    asyncio.run(main())
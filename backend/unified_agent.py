@@ -3,17 +3,31 @@ import json
 import yaml
 import logging
 import asyncio
+import time
 import aiohttp
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 from web3 import Web3
 from eth_account import Account
 from eth_typing import Address
 from datetime import datetime
+from hexbytes import HexBytes
 from zerepy import Zerepy, Chain
 from zerepy.utils import parse_token_amount
+from agents.alert_dispatcher import AlertDispatcher
+from agents.analysis_cache import AnalysisCache, code_hash
+from agents.evm_scanner import SCANNER_VERSION, risk_score as calculate_risk_score, scan_bytecode
+from agents.http_client import get_http_client
+from agents.price_oracle import PriceOracle
+from agents.price_scheduler import PriceAlert, PriceMonitorScheduler
+from agents.receipt_tracker import ReceiptTracker
+from agents.rpc_batch import (
+    MULTICALL3_ADDRESS,
+    BatchRPC,
+    CallBatcher,
+    Multicall,
+    contract_call,
+    get_amounts_out_call
+)
 
 # Configure logging
 logging.basicConfig(
@@ -27,6 +41,21 @@ class UnifiedAgent:
     def __init__(self, config_path: str = "config.yaml"):
         self.config = self._load_config(config_path)
         self.w3 = Web3(Web3.HTTPProvider(self.config['blockchain']['rpc_url']))
+        
+        # Batched read path: many eth_calls per HTTP request, many calls per eth_call
+        self.rpc = BatchRPC(self.config['blockchain']['rpc_url'])
+        self.multicall = Multicall(
+            self.rpc,
+            address=self.config['blockchain'].get('multicall_address', MULTICALL3_ADDRESS)
+        )
+        self.call_batcher = CallBatcher(self.multicall)
+        # Every pending transaction's receipt is fetched in one batch per block
+        self.receipts = ReceiptTracker(
+            self.rpc,
+            timeout=self.config['blockchain'].get('receipt_timeout', 180.0)
+        )
+        self.router_address = self.config['blockchain'].get('router_address')
+        
         self.agent_factory = self._load_contract('AgentFactory')
         self.sonic_token = self._load_contract('SonicToken')
         
@@ -42,10 +71,51 @@ class UnifiedAgent:
         self.smtp_port = self.smtp_config.get('port')
         self.smtp_username = self.smtp_config.get('username')
         self.smtp_password = self.smtp_config.get('password')
+        self.alert_dispatcher = None
+        if self.smtp_server:
+            self.alert_dispatcher = AlertDispatcher(
+                self.smtp_server,
+                self.smtp_port or 587,
+                username=self.smtp_username,
+                password=self.smtp_password,
+                use_tls=self.smtp_config.get('use_tls', True),
+                queue_size=self.smtp_config.get('queue_size', 1000),
+                max_retries=self.smtp_config.get('max_retries', 3),
+                digest_window=self.smtp_config.get('digest_window', 0.0)
+            )
+        
+        # Security scans are cached by code hash, so clones and proxies are analysed once
+        security_config = self.config.get('security', {})
+        self.analysis_cache = AnalysisCache(
+            path=security_config.get('cache_path', 'security_scans.db'),
+            max_entries=security_config.get('cache_size', 4096),
+            version=SCANNER_VERSION
+        )
+        self.scan_concurrency = security_config.get('scan_concurrency', 8)
+        self.scan_batch_size = security_config.get('scan_batch_size', 100)
+        self.last_scan_stats: Dict = {}
+        
+        # Shared price oracle so monitors and trades reuse quotes within a block
+        oracle_config = self.config.get('price_oracle', {})
+        self.price_oracle = PriceOracle(
+            fetch_quote=self._quote_path,
+            fetch_quotes=self._quote_paths,
+            get_block_number=self._get_block_number,
+            ttl=oracle_config.get('ttl', 12.0),
+            block_refresh=oracle_config.get('block_refresh', 1.0),
+            max_entries=oracle_config.get('max_entries', 10000)
+        )
         
-        # Price monitoring state
-        self.price_alerts = {}
-        self.monitoring_tasks = {}
+        # Price monitoring state: one scheduler polls every watched token
+        monitor_config = self.config.get('price_monitor', {})
+        self.price_monitor = PriceMonitorScheduler(
+            fetch_prices=self._get_token_prices,
+            on_alert=self._handle_price_alert,
+            default_interval=monitor_config.get('interval', 60.0),
+            max_batch_size=monitor_config.get('max_batch_size', 500),
+            hysteresis=monitor_config.get('hysteresis', 0.01),
+            rearm_delay=monitor_config.get('rearm_delay', 300.0)
+        )
 
     def _load_config(self, config_path: str) -> Dict:
         try:
@@ -125,16 +195,24 @@ class UnifiedAgent:
                     })
             
             # Deploy agent on blockchain
-            tx_hash = await self.agent_factory.functions.createAgent(
-                name,
-                codename,
-                ipfs_hash,
-                trading_params,
-                security_params
-            ).transact()
+            tx_hash = await asyncio.to_thread(
+                self.agent_factory.functions.createAgent(
+                    name,
+                    codename,
+                    ipfs_hash,
+                    trading_params,
+                    security_params
+                ).transact
+            )
             
-            receipt = await self.w3.eth.wait_for_transaction_receipt(tx_hash)
-            agent_id = receipt['logs'][0]['topics'][1]  # Extract agent ID from event
+            receipt = await self.receipts.wait(tx_hash)
+            if int(receipt['status'], 16) != 1:
+                return {
+                    'success': False,
+                    'error': f"Agent creation reverted in transaction {HexBytes(tx_hash).to_0x_hex()}"
+                }
+            # Raw JSON-RPC receipts carry hex strings; keep returning HexBytes as the web3 receipt did
+            agent_id = HexBytes(receipt['logs'][0]['topics'][1])  # Extract agent ID from event
             
             # Start monitoring if price monitor function is included
             if any(f['type'] == 'monitor' for f in functions):
@@ -156,8 +234,10 @@ class UnifiedAgent:
     async def execute_function(self, agent_id: int, function_id: str, params: Dict) -> Dict:
         """Execute a specific function for an agent"""
         try:
-            # Get agent status
-            agent = await self.agent_factory.functions.getAgent(agent_id).call()
+            # Get agent status; concurrent requests share one multicall
+            agent = await self.call_batcher.call(
+                contract_call(self.agent_factory, 'getAgent', agent_id)
+            )
             if not agent[4]:  # isActive check
                 raise Exception("Agent is not active")
             
@@ -181,34 +261,23 @@ class UnifiedAgent:
     async def _execute_security_function(self, params: Dict) -> Dict:
         """Execute security analysis on smart contracts"""
         try:
+            contract_addresses = params.get('contract_addresses')
+            if contract_addresses:
+                results = [result async for result in self.scan_contracts(contract_addresses)]
+                return {
+                    'success': True,
+                    'results': results,
+                    'stats': self.last_scan_stats
+                }
+            
             contract_address = params.get('contract_address')
             if not contract_address:
                 raise ValueError("Contract address is required")
             
             # Fetch contract code
-            contract_code = await self.w3.eth.get_code(contract_address)
-            
-            # Basic security checks
-            security_issues = []
-            
-            # Check for reentrancy vulnerabilities
-            if b'CALL' in contract_code and b'SSTORE' in contract_code:
-                security_issues.append({
-                    'type': 'REENTRANCY',
-                    'severity': 'HIGH',
-                    'description': 'Potential reentrancy vulnerability detected'
-                })
-            
-            # Check for unchecked external calls
-            if b'CALL' in contract_code and b'ISZERO' not in contract_code:
-                security_issues.append({
-                    'type': 'UNCHECKED_CALL',
-                    'severity': 'MEDIUM',
-                    'description': 'Unchecked external call detected'
-                })
-            
-            # Calculate risk score
-            risk_score = len(security_issues) * 20  # Simple scoring
+            contract_code = HexBytes(await self.rpc.request('eth_getCode', [contract_address, 'latest']))
+            analysis = self._analyze_code(contract_code)
+            security_issues = analysis['issues']
             
             # Send email alert if issues found
             if security_issues and self.smtp_server:
@@ -217,8 +286,7 @@ class UnifiedAgent:
             return {
                 'success': True,
                 'contract_address': contract_address,
-                'risk_score': risk_score,
-                'issues': security_issues
+                **analysis
             }
             
         except Exception as e:
@@ -228,6 +296,104 @@ class UnifiedAgent:
                 'error': str(e)
             }
 
+    async def scan_contracts(
+        self,
+        addresses: List[str],
+        concurrency: Optional[int] = None,
+        send_alerts: bool = True
+    ) -> AsyncIterator[Dict]:
+        """Scan many contracts, yielding each result as soon as its code is fetched and analysed"""
+        concurrency = concurrency or self.scan_concurrency
+        unique = list(dict.fromkeys(address.lower() for address in addresses))
+        batches = [
+            unique[i:i + self.scan_batch_size]
+            for i in range(0, len(unique), self.scan_batch_size)
+        ]
+        semaphore = asyncio.Semaphore(concurrency)
+        started = time.perf_counter()
+        stats = {
+            'requested': len(addresses),
+            'unique_addresses': len(unique),
+            'unique_code': 0,
+            'scanned': 0,
+            'failed': 0
+        }
+        seen_hashes = set()
+        
+        async def fetch(batch: List[str]):
+            async with semaphore:
+                try:
+                    codes = await self.rpc.request_many([
+                        ('eth_getCode', [address, 'latest']) for address in batch
+                    ])
+                except Exception as e:
+                    # The whole batch failed; report it against every address in it
+                    logger.error(f"Bulk code fetch failed: {e}")
+                    codes = [e] * len(batch)
+                return batch, codes
+        
+        tasks = [asyncio.create_task(fetch(batch)) for batch in batches]
+        try:
+            for next_batch in asyncio.as_completed(tasks):
+                batch, codes = await next_batch
+                
+                for address, code in zip(batch, codes):
+                    if isinstance(code, Exception):
+                        stats['failed'] += 1
+                        yield {
+                            'success': False,
+                            'contract_address': address,
+                            'error': str(code)
+                        }
+                        continue
+                    
+                    # Identical bytecode is analysed once, then served from the code-hash cache
+                    analysis = self._analyze_code(HexBytes(code))
+                    seen_hashes.add(analysis['code_hash'])
+                    stats['scanned'] += 1
+                    
+                    if send_alerts and analysis['issues'] and self.smtp_server:
+                        await self._send_security_alert(address, analysis['issues'])
+                    
+                    yield {
+                        'success': True,
+                        'contract_address': address,
+                        **analysis
+                    }
+        finally:
+            for task in tasks:
+                task.cancel()
+            
+            elapsed = time.perf_counter() - started
+            stats['unique_code'] = len(seen_hashes)
+            stats['elapsed'] = elapsed
+            stats['contracts_per_second'] = stats['scanned'] / elapsed if elapsed > 0 else 0.0
+            self.last_scan_stats = stats
+            logger.info(
+                f"Scanned {stats['scanned']} contracts ({stats['unique_code']} unique bytecodes) "
+                f"in {elapsed:.2f}s: {stats['contracts_per_second']:.0f} contracts/s"
+            )
+
+    def _analyze_code(self, contract_code: bytes) -> Dict:
+        """Scan runtime bytecode, reusing any earlier result for identical code"""
+        key = code_hash(contract_code)
+        cached = self.analysis_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        # Decode the bytecode once and run every detector over it
+        scan = scan_bytecode(contract_code)
+        analysis = {
+            'code_hash': key,
+            'risk_score': calculate_risk_score(scan.issues),
+            'issues': scan.issues,
+            'code_size': scan.code_size,
+            'instruction_count': scan.instruction_count,
+            'block_count': scan.block_count
+        }
+        self.analysis_cache.put(key, analysis)
+        return analysis
+
     async def _execute_trading_function(self, params: Dict) -> Dict:
         """Execute trading operation based on parameters"""
         try:
@@ -288,20 +454,20 @@ class UnifiedAgent:
             if not all([token_address, target_price]):
                 raise ValueError("Missing required parameters")
             
-            # Update price alert settings
-            self.price_alerts[token_address] = {
-                'target_price': target_price,
-                'alert_type': alert_type,
-                'email': params.get('email')
-            }
-            
-            # Start monitoring if not already running
-            if token_address not in self.monitoring_tasks:
-                task = asyncio.create_task(self._monitor_price(token_address))
-                self.monitoring_tasks[token_address] = task
+            alert = self.price_monitor.add_alert(
+                token_address,
+                target_price,
+                alert_type=alert_type,
+                email=params.get('email'),
+                interval=params.get('interval'),
+                hysteresis=params.get('hysteresis'),
+                rearm_delay=params.get('rearm_delay')
+            )
+            self.price_monitor.start()
             
             return {
                 'success': True,
+                'alert_id': alert.alert_id,
                 'message': f'Price monitoring active for {token_address}'
             }
             
@@ -312,60 +478,101 @@ class UnifiedAgent:
                 'error': str(e)
             }
 
-    async def _monitor_price(self, token_address: str):
-        """Continuous price monitoring loop"""
-        while True:
-            try:
-                current_price = await self._get_token_price(token_address)
-                alert_config = self.price_alerts.get(token_address)
-                
-                if alert_config:
-                    target_price = alert_config['target_price']
-                    alert_type = alert_config['alert_type']
-                    
-                    should_alert = (
-                        (alert_type == 'above' and current_price >= target_price) or
-                        (alert_type == 'below' and current_price <= target_price)
-                    )
-                    
-                    if should_alert and alert_config.get('email'):
-                        await self._send_price_alert(
-                            token_address,
-                            current_price,
-                            target_price,
-                            alert_config['email']
-                        )
-                
-                await asyncio.sleep(60)  # Check every minute
-                
-            except Exception as e:
-                logger.error(f"Price monitoring error: {e}")
-                await asyncio.sleep(60)  # Continue monitoring despite errors
+    async def stop_price_monitoring(self, token_address: str, alert_id: Optional[str] = None) -> Dict:
+        """Remove one price alert, or stop watching a token entirely"""
+        if alert_id:
+            removed = self.price_monitor.remove_alert(token_address, alert_id)
+        else:
+            removed = self.price_monitor.unwatch(token_address)
+        
+        if not self.price_monitor.tokens:
+            await self.price_monitor.stop()
+        
+        return {
+            'success': removed,
+            'message': f'Price monitoring updated for {token_address}'
+        }
+
+    async def _handle_price_alert(self, alert: PriceAlert, current_price: float):
+        """Notify the alert owner that a price target was reached"""
+        if alert.email:
+            await self._send_price_alert(
+                alert.token_address,
+                current_price,
+                alert.target_price,
+                alert.email
+            )
+
+    async def _get_token_prices(self, token_addresses: List[str]) -> List[Optional[float]]:
+        """Get prices for many tokens in one batch; failed quotes come back as None"""
+        paths = [[self.sonic_token.address, token_address] for token_address in token_addresses]
+        results = await self.price_oracle.get_prices(paths)
+        
+        prices = []
+        for token_address, result in zip(token_addresses, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to get token price for {token_address}: {result}")
+                prices.append(None)
+            else:
+                prices.append(result)
+        return prices
 
     async def _get_token_price(self, token_address: str) -> float:
         """Get current token price from DEX"""
         try:
-            # Use 1 SONIC as input amount for price check
-            one_sonic = parse_token_amount("1", 18)
-            
             path = [self.sonic_token.address, token_address]
-            amounts = await self.zerepy.get_amounts_out(one_sonic, path)
-            
-            return float(amounts[1]) / float(one_sonic)
+            return await self.price_oracle.get_price(path)
         except Exception as e:
             logger.error(f"Failed to get token price: {e}")
             raise
 
+    async def _quote_path(self, path: List[str]) -> float:
+        """Quote 1 SONIC along a swap path"""
+        # Use 1 SONIC as input amount for price check
+        one_sonic = parse_token_amount("1", 18)
+        
+        if self.router_address:
+            # Concurrent single quotes are merged into one multicall
+            amounts = await self.call_batcher.call(
+                get_amounts_out_call(self.router_address, one_sonic, path)
+            )
+        else:
+            amounts = await self.zerepy.get_amounts_out(one_sonic, path)
+        
+        return float(amounts[-1]) / float(one_sonic)
+
+    async def _quote_paths(self, paths: List[List[str]]) -> List:
+        """Quote many swap paths in one round trip; failed quotes come back as exceptions"""
+        if not self.router_address:
+            return await asyncio.gather(
+                *(self._quote_path(path) for path in paths),
+                return_exceptions=True
+            )
+        
+        one_sonic = parse_token_amount("1", 18)
+        results = await self.multicall.aggregate([
+            get_amounts_out_call(self.router_address, one_sonic, path) for path in paths
+        ])
+        return [
+            result if isinstance(result, Exception) else float(result[-1]) / float(one_sonic)
+            for result in results
+        ]
+
+    async def _get_block_number(self) -> int:
+        """Fetch the latest block number without blocking the event loop"""
+        return int(await self.rpc.request('eth_blockNumber'), 16)
+
+    def get_price_oracle_stats(self) -> Dict:
+        """Get price oracle cache hit/miss counters"""
+        return self.price_oracle.stats()
+
     async def _send_security_alert(self, contract_address: str, issues: List[Dict]):
-        """Send security alert email"""
-        if not self.smtp_server:
+        """Queue a security alert email"""
+        if not self.alert_dispatcher:
             return
         
         try:
-            msg = MIMEMultipart()
-            msg['Subject'] = f'Security Alert: Issues Found in Contract {contract_address}'
-            msg['From'] = self.smtp_username
-            msg['To'] = self.config['alerts']['email']
+            subject = f'Security Alert: Issues Found in Contract {contract_address}'
             
             body = "Security Issues Found:\n\n"
             for issue in issues:
@@ -373,26 +580,18 @@ class UnifiedAgent:
                 body += f"Severity: {issue['severity']}\n"
                 body += f"Description: {issue['description']}\n\n"
             
-            msg.attach(MIMEText(body, 'plain'))
-            
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
+            self.alert_dispatcher.submit(self.config['alerts']['email'], subject, body)
                 
         except Exception as e:
             logger.error(f"Failed to send security alert: {e}")
 
     async def _send_price_alert(self, token_address: str, current_price: float, target_price: float, email: str):
-        """Send price alert email"""
-        if not self.smtp_server:
+        """Queue a price alert email"""
+        if not self.alert_dispatcher:
             return
         
         try:
-            msg = MIMEMultipart()
-            msg['Subject'] = f'Price Alert: Target Price Reached for {token_address}'
-            msg['From'] = self.smtp_username
-            msg['To'] = email
+            subject = f'Price Alert: Target Price Reached for {token_address}'
             
             body = f"Price Alert:\n\n"
             body += f"Token: {token_address}\n"
@@ -400,33 +599,26 @@ class UnifiedAgent:
             body += f"Target Price: {target_price}\n"
             body += f"Time: {datetime.utcnow().isoformat()}\n"
             
-            msg.attach(MIMEText(body, 'plain'))
-            
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
+            self.alert_dispatcher.submit(email, subject, body)
                 
         except Exception as e:
             logger.error(f"Failed to send price alert: {e}")
 
+    async def close(self):
+        """Stop background services and flush queued alerts"""
+        await self.price_monitor.stop()
+        await self.receipts.stop()
+        if self.alert_dispatcher:
+            await self.alert_dispatcher.stop()
+        await self.rpc.close()
+        await get_http_client().close()
+        self.analysis_cache.close()
+
     def get_agent_status(self, agent_id: int) -> Dict:
         """Get current status of an agent"""
         try:
             agent = self.agent_factory.functions.getAgent(agent_id).call()
-            
-            return {
-                'success': True,
-                'name': agent[0],
-                'codename': agent[1],
-                'owner': agent[2],
-                'created_at': agent[3],
-                'is_active': agent[4],
-                'metadata': agent[5],
-                'trading_params': agent[6],
-                'security_params': agent[7],
-                'balance': agent[8]
-            }
+            return self._format_agent_status(agent)
         except Exception as e:
             logger.error(f"Failed to get agent status: {e}")
             return {
@@ -434,6 +626,41 @@ class UnifiedAgent:
                 'error': str(e)
             }
 
+    async def get_agent_statuses(self, agent_ids: List[int]) -> Dict[int, Dict]:
+        """Get the status of many agents in one multicall"""
+        try:
+            results = await self.multicall.aggregate([
+                contract_call(self.agent_factory, 'getAgent', agent_id) for agent_id in agent_ids
+            ])
+        except Exception as e:
+            logger.error(f"Failed to get agent statuses: {e}")
+            results = [e] * len(agent_ids)
+        
+        statuses = {}
+        for agent_id, agent in zip(agent_ids, results):
+            if isinstance(agent, Exception):
+                statuses[agent_id] = {
+                    'success': False,
+                    'error': str(agent)
+                }
+            else:
+                statuses[agent_id] = self._format_agent_status(agent)
+        return statuses
+
+    def _format_agent_status(self, agent) -> Dict:
+        return {
+            'success': True,
+            'name': agent[0],
+            'codename': agent[1],
+            'owner': agent[2],
+            'created_at': agent[3],
+            'is_active': agent[4],
+            'metadata': agent[5],
+            'trading_params': agent[6],
+            'security_params': agent[7],
+            'balance': agent[8]
+        }
+
 if __name__ == "__main__":
     agent = UnifiedAgent()
     # Add test code here